@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+여러 원격 동시 업로드 벤치마크
+로컬 폴더 여러 개를 원격으로 두고, 원격마다 rclone sync를 차례로 실행하는 방식과
+upload --mirror(한 번 스캔, 원격별 동시 전송)를 비교한다.
+
+- sequential: 원격마다 rclone sync (원격마다 로컬/원격 트리를 다시 읽고 비교)
+- fanout:     fanout_upload (처음은 전체 sync, 이후는 바뀐 파일만)
+
+첫 업로드와 일부 파일을 바꾼 뒤의 업로드를 각각 잰다. rclone이 필요하다. (--rclone으로 경로 지정)
+--bwlimit로 rclone 실행마다 속도를 제한하면 느린 원격(NAS, 다른 계정)을 흉내 낼 수 있다.
+
+사용법: python3 benchmarks/bench_fanout.py --targets 3 --small 2000 --large 2 --large-mb 64 [--bwlimit 20M]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from yunisync.fanout import Target, fanout_upload  # noqa: E402
+from yunisync.rclone import Rclone, exclude_flags, transfer_flags  # noqa: E402
+
+
+def make_tree(root, small, large, large_mb, seed=1):
+    """합성 트리 생성. 전체 바이트 수 반환"""
+    rng = random.Random(seed)
+    total = 0
+    for i in range(small):
+        folder = os.path.join(root, "world", "playerdata", f"d{i % 64}")
+        os.makedirs(folder, exist_ok=True)
+        size = rng.randint(200, 16 * 1024)
+        with open(os.path.join(folder, f"p{i}.dat"), "wb") as f:
+            f.write(os.urandom(size))
+        total += size
+    block = os.urandom(1024 * 1024)
+    os.makedirs(os.path.join(root, "world", "region"), exist_ok=True)
+    for i in range(large):
+        with open(os.path.join(root, "world", "region", f"r.{i}.0.mca"), "wb") as f:
+            for _ in range(large_mb):
+                f.write(block)
+        total += large_mb * 1024 * 1024
+    return total
+
+
+def touch_some(root, ratio, seed=2):
+    """작은 파일 일부를 새 내용으로 바꿈. 바꾼 개수 반환"""
+    rng = random.Random(seed)
+    folder = os.path.join(root, "world", "playerdata")
+    paths = [os.path.join(d, name) for d, _, names in os.walk(folder) for name in names]
+    chosen = rng.sample(paths, max(1, int(len(paths) * ratio)))
+    for path in chosen:
+        with open(path, "wb") as f:
+            f.write(os.urandom(rng.randint(200, 16 * 1024)))
+    return len(chosen)
+
+
+def sequential(rclone, root, dests):
+    for dest in dests:
+        rclone.transfer("sync", root, dest, transfer_flags(progress=False) + exclude_flags(), capture=True)
+
+
+def measure(name, func):
+    started = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - started
+    print(f"{name:>22}: {seconds:.2f}초")
+    return {"mode": name, "seconds": round(seconds, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="여러 원격 동시 업로드 벤치마크")
+    parser.add_argument("--targets", type=int, default=3, help="원격(로컬 폴더) 수 (기본: 3)")
+    parser.add_argument("--small", type=int, default=2000, help="작은 파일 개수 (기본: 2000)")
+    parser.add_argument("--large", type=int, default=2, help="큰 파일 개수 (기본: 2)")
+    parser.add_argument("--large-mb", type=int, default=64, help="큰 파일 크기 MB (기본: 64)")
+    parser.add_argument("--change", type=float, default=0.1, help="두 번째 업로드 전에 바꿀 작은 파일 비율 (기본: 0.1)")
+    parser.add_argument("--bwlimit", help="모든 rclone 실행의 대역폭 제한 (예: 20M)")
+    parser.add_argument("--rclone", default="rclone", help="rclone 실행 파일 (기본: rclone)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    extra = [f"--bwlimit={args.bwlimit}"] if args.bwlimit else []
+    rclone = Rclone(args.rclone, extra_args=extra)
+    work = tempfile.mkdtemp(prefix="yunisync-fanoutbench-")
+    try:
+        root = os.path.join(work, "yuniserver")
+        total = make_tree(root, args.small, args.large, args.large_mb)
+        print(f"트리: 작은 파일 {args.small}개, 큰 파일 {args.large}개 ({total / 1024 / 1024:.1f} MB), "
+              f"원격 {args.targets}곳")
+        seq_dests = [os.path.join(work, f"seq{i}") for i in range(args.targets)]
+        fan_dests = [os.path.join(work, f"fan{i}") for i in range(args.targets)]
+
+        def fanout():
+            targets = [Target(dest) for dest in fan_dests]
+            failed = fanout_upload(targets, root, binary=args.rclone, extra_args=extra)
+            if failed:
+                raise SystemExit(f"실패: {', '.join(t.describe() for t in failed)}")
+
+        results = [
+            measure("sequential (처음)", lambda: sequential(rclone, root, seq_dests)),
+            measure("fanout (처음)", fanout),
+        ]
+        changed = touch_some(root, args.change)
+        print(f"작은 파일 {changed}개 변경")
+        results += [
+            measure("sequential (변경 후)", lambda: sequential(rclone, root, seq_dests)),
+            measure("fanout (변경 후)", fanout),
+        ]
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"total_bytes": total, "targets": args.targets, "results": results}, f, indent=2)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+GUI 로그 버퍼 벤치마크
+작업 스레드가 rclone 출력처럼 로그를 쏟아낼 때 초당 처리 줄 수와 화면 갱신 지연을 측정한다.
+
+- sink:   LogSink에 쌓고 메인 루프가 100ms마다 묶음으로 반영 (현재 GUI 방식)
+- direct: 줄마다 insert + see + update_idletasks (이전 GUI 방식, Tk 화면이 있을 때만)
+
+Tk 화면(DISPLAY)이 없으면 sink 방식만 화면 없이 측정한다. (drain 시간 = 메인 루프가 막히는 시간)
+
+사용법: python3 benchmarks/bench_log_sink.py --lines 200000 [--threads 2] [--json 결과.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from yunisync.logsink import LogSink  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+FLUSH_MS = 100
+
+
+def make_line(i):
+    return f"INFO  : servers/s{i % 8}/playerdata/p{i}.dat: Copied (new)"
+
+
+def produce(sink, lines, threads):
+    """여러 스레드에서 lines줄을 기록하고 걸린 시간 반환"""
+    per_thread = lines // threads
+
+    def worker(offset):
+        for i in range(offset, offset + per_thread):
+            sink.write(make_line(i))
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(t * per_thread,)) for t in range(threads)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return time.perf_counter() - started, per_thread * threads
+
+
+def peak_rss_mb():
+    if resource is None:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def bench_sink_headless(lines, threads, log_path):
+    """화면 없이 메인 루프 타이머만 흉내: drain 한 번에 걸리는 시간이 곧 UI 지연"""
+    sink = LogSink(log_path)
+    shown = []
+    stop = threading.Event()
+    worst = [0.0]
+
+    def main_loop():
+        while not stop.is_set():
+            time.sleep(FLUSH_MS / 1000.0)
+            started = time.perf_counter()
+            batch, dropped = sink.drain()
+            shown.extend(batch)
+            del shown[:-sink.max_lines]
+            worst[0] = max(worst[0], time.perf_counter() - started)
+
+    loop = threading.Thread(target=main_loop)
+    loop.start()
+    seconds, count = produce(sink, lines, threads)
+    stop.set()
+    loop.join()
+    sink.close()
+    return {"mode": "sink", "lines": count, "seconds": round(seconds, 3),
+            "lines_per_sec": round(count / seconds), "max_ui_block_ms": round(worst[0] * 1000, 1),
+            "shown_lines": len(shown)}
+
+
+def bench_tk(mode, lines, threads, log_path):
+    """실제 Tk 창으로 측정. 10ms 하트비트가 늦어진 최대 시간을 UI 지연으로 기록"""
+    import tkinter as tk
+    from tkinter import scrolledtext
+
+    root = tk.Tk()
+    text = scrolledtext.ScrolledText(root, height=12, width=70)
+    text.pack()
+    result = {"mode": mode}
+    lag = [0.0]
+    last = [time.perf_counter()]
+
+    def heartbeat():
+        now = time.perf_counter()
+        lag[0] = max(lag[0], now - last[0] - 0.01)
+        last[0] = now
+        root.after(10, heartbeat)
+
+    if mode == "direct":
+        def run():
+            started = time.perf_counter()
+            for i in range(lines):
+                text.insert(tk.END, make_line(i) + "\n")
+                text.see(tk.END)
+                root.update_idletasks()
+            seconds = time.perf_counter() - started
+            result.update(lines=lines, seconds=round(seconds, 3), lines_per_sec=round(lines / seconds),
+                          max_ui_block_ms=round(seconds * 1000, 1))
+            root.quit()
+        root.after(0, run)
+    else:
+        sink = LogSink(log_path)
+        done = threading.Event()
+
+        def flush():
+            batch, dropped = sink.drain()
+            if batch:
+                text.insert(tk.END, "".join(batch))
+                count = int(text.index("end-1c").split(".")[0])
+                if count > sink.max_lines:
+                    text.delete("1.0", f"{count - sink.max_lines + 1}.0")
+                text.see(tk.END)
+            if done.is_set() and not batch:
+                root.quit()
+                return
+            root.after(FLUSH_MS, flush)
+
+        def producer():
+            seconds, count = produce(sink, lines, threads)
+            result.update(lines=count, seconds=round(seconds, 3), lines_per_sec=round(count / seconds))
+            done.set()
+
+        threading.Thread(target=producer, daemon=True).start()
+        root.after(FLUSH_MS, flush)
+        root.after(10, heartbeat)
+
+    root.mainloop()
+    if mode != "direct":
+        result["max_ui_block_ms"] = round(lag[0] * 1000, 1)
+        sink.close()
+    result["shown_lines"] = int(text.index("end-1c").split(".")[0])
+    root.destroy()
+    return result
+
+
+def has_display():
+    if os.name == "nt":
+        return True
+    return bool(os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GUI 로그 버퍼 벤치마크")
+    parser.add_argument("--lines", type=int, default=200000, help="기록할 줄 수 (기본: 200000)")
+    parser.add_argument("--threads", type=int, default=2, help="기록 스레드 수 (기본: 2)")
+    parser.add_argument("--direct-lines", type=int, default=20000,
+                        help="이전 방식 측정 줄 수 (느리므로 따로 지정, 기본: 20000)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="yunisync-logbench-")
+    log_path = os.path.join(work, "gui.log")
+    results = []
+    if has_display():
+        results.append(bench_tk("sink", args.lines, args.threads, log_path))
+        results.append(bench_tk("direct", args.direct_lines, 1, log_path))
+    else:
+        print("Tk 화면이 없어 sink 방식만 화면 없이 측정합니다.")
+        results.append(bench_sink_headless(args.lines, args.threads, log_path))
+
+    log_files = [n for n in os.listdir(work) if n.startswith("gui.log")]
+    for r in results:
+        print(f"{r['mode']:>6}: {r['lines']}줄, {r['seconds']:.2f}초, {r['lines_per_sec']}줄/s, "
+              f"최대 UI 지연 {r['max_ui_block_ms']}ms, 화면 {r['shown_lines']}줄")
+    print(f"로그 파일: {len(log_files)}개 (순환), 최대 RSS {peak_rss_mb():.1f} MB")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"results": results, "peak_rss_mb": round(peak_rss_mb(), 1)}, f, indent=2)
+    for name in log_files:
+        os.remove(os.path.join(work, name))
+    os.rmdir(work)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+묶음 전송 벤치마크
+작은 파일이 많은 합성 yuniserver 트리를 만들고, 일반 rclone sync와 묶음 모드(pack-push/pack-pull)의
+files/sec, MB/s를 비교한다. 로컬 폴더를 원격으로 사용하므로 Google Drive 없이 실행된다.
+--tpslimit으로 초당 요청 수를 제한하면 Drive의 파일당 비용을 흉내낼 수 있다.
+
+사용법: python3 benchmarks/bench_pack.py --files 20000 [--tpslimit 10] [--json 결과.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from yunisync import console, packs  # noqa: E402
+from yunisync.rclone import Rclone, transfer_flags  # noqa: E402
+
+
+def make_tree(root, files, seed=1):
+    """작은 파일(200B~16KB) 위주의 합성 트리 생성. 전체 바이트 수 반환"""
+    rng = random.Random(seed)
+    total = 0
+    for i in range(files):
+        folder = os.path.join(root, "servers", f"s{i % 8}", "playerdata", f"d{i % 97}")
+        os.makedirs(folder, exist_ok=True)
+        size = rng.randint(200, 16 * 1024)
+        with open(os.path.join(folder, f"p{i}.dat"), "wb") as f:
+            f.write(rng.getrandbits(8 * size).to_bytes(size, "little") if size else b"")
+        total += size
+    return total
+
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="묶음 전송 벤치마크")
+    parser.add_argument("--files", type=int, default=5000, help="작은 파일 개수 (기본: 5000)")
+    parser.add_argument("--tpslimit", type=float, help="rclone --tpslimit (Drive 요청 제한 흉내)")
+    parser.add_argument("--workers", type=int, help="묶음 프로세스 수")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    extra = [f"--tpslimit={args.tpslimit}"] if args.tpslimit else []
+    rclone = Rclone(extra_args=extra)
+    console.set_sink(lambda message: None)
+
+    work = tempfile.mkdtemp(prefix="yunisync-bench-")
+    try:
+        source = os.path.join(work, "src", "yuniserver")
+        total = make_tree(source, args.files)
+        results = {}
+
+        remote = os.path.join(work, "remote_sync")
+        results["sync_upload"] = timed(lambda: rclone.transfer(
+            "sync", source, remote, transfer_flags(progress=False)))
+        restore = os.path.join(work, "dst_sync", "yuniserver")
+        results["sync_download"] = timed(lambda: rclone.transfer(
+            "sync", remote, restore, transfer_flags(progress=False)))
+
+        remote = os.path.join(work, "remote_pack")
+        results["pack_upload"] = timed(lambda: packs.push(rclone, source, remote, workers=args.workers))
+        restore = os.path.join(work, "dst_pack", "yuniserver")
+        results["pack_download"] = timed(lambda: packs.pull(rclone, restore, remote, workers=args.workers))
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    rows = []
+    for name, seconds in results.items():
+        rows.append({
+            "mode": name,
+            "seconds": round(seconds, 3),
+            "files_per_sec": round(args.files / seconds, 1),
+            "mb_per_sec": round(total / 1024 / 1024 / seconds, 2),
+        })
+
+    print(f"파일 {args.files}개, {total / 1024 / 1024:.1f} MB")
+    print(f"{'mode':<15}{'seconds':>10}{'files/s':>12}{'MB/s':>10}")
+    for row in rows:
+        print(f"{row['mode']:<15}{row['seconds']:>10}{row['files_per_sec']:>12}{row['mb_per_sec']:>10}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"files": args.files, "bytes": total, "results": rows}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
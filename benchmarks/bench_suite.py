@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+오프라인 전송 벤치마크 모음
+합성 yuniserver 트리를 만들고, 로컬 폴더를 원격으로 사용해 업로드/다운로드 경로를 모드별로 측정한다.
+Google Drive 없이 실행되며 결과는 JSON으로 저장해 회귀 비교에 쓸 수 있다.
+
+트리 종류
+- small:   작은 파일(200B~16KB)이 아주 많은 트리 (플레이어 데이터, 설정 파일)
+- huge:    큰 지역(region) 파일 몇 개
+- mixed:   위 둘 + 중간 크기 파일
+- mutated: mixed를 올린 뒤 파일 1%를 바꾸고 다시 업로드 / 이전 복사본에 다시 다운로드
+
+모드: sync(일반 rclone sync), incremental(증분 업로드 + 스트리밍 다운로드), snapshot(청크), pack(묶음)
+
+측정값: 경과 시간, 파일/초, MB/s, 최대 RSS(yunisync와 하위 프로세스 중 최대), 생성한 하위 프로세스 수
+Drive 흉내: --bwlimit(대역폭), --tpslimit(초당 요청 수 = 요청당 지연). rclone 환경 변수로 모든 실행에 적용된다.
+
+사용법:
+  python3 benchmarks/bench_suite.py [--trees small,mixed] [--modes sync,pack] [--scale 0.5]
+                                    [--bwlimit 20M] [--tpslimit 10] [--json 결과.json]
+                                    [--baseline 이전결과.json --tolerance 0.2]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+from yunisync.backup import clone_tree  # noqa: E402
+
+MiB = 1024 * 1024
+
+TREES = ("small", "huge", "mixed", "mutated")
+
+# 모드 -> (업로드 명령, 다운로드 명령)
+MODES = {
+    "sync": (["sync", "up"], ["sync", "down"]),
+    "incremental": (["upload"], ["download"]),
+    "snapshot": (["snapshot-push"], ["snapshot-pull"]),
+    "pack": (["pack-push"], ["pack-pull"]),
+}
+
+MUTATE_RATIO = 0.01
+
+
+def write_random(path, size, rng):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        remaining = size
+        while remaining > 0:
+            n = min(remaining, 4 * MiB)
+            f.write(rng.getrandbits(8 * n).to_bytes(n, "little"))
+            remaining -= n
+
+
+def add_small(root, count, rng):
+    for i in range(count):
+        folder = os.path.join(root, "servers", f"s{i % 8}", "playerdata", f"d{i % 97}")
+        write_random(os.path.join(folder, f"p{i}.dat"), rng.randint(200, 16 * 1024), rng)
+
+
+def add_medium(root, count, rng):
+    for i in range(count):
+        write_random(os.path.join(root, "plugins", f"plugin{i}.jar"), rng.randint(100 * 1024, MiB), rng)
+
+
+def add_huge(root, count, size, rng):
+    for i in range(count):
+        write_random(os.path.join(root, "world", "region", f"r.{i}.0.mca"), size, rng)
+
+
+def make_tree(kind, root, scale, seed=1):
+    """합성 트리 생성"""
+    rng = random.Random(seed)
+    if kind == "small":
+        add_small(root, int(20000 * scale), rng)
+    elif kind == "huge":
+        add_huge(root, 4, int(128 * MiB * scale), rng)
+    else:
+        add_small(root, int(5000 * scale), rng)
+        add_medium(root, int(200 * scale), rng)
+        add_huge(root, 2, int(64 * MiB * scale), rng)
+
+
+def mutate(root, ratio=MUTATE_RATIO, seed=2):
+    """파일 ratio 비율을 바꿈 (일부는 제자리 수정, 일부는 뒤에 추가). 바꾼 파일 수 반환
+    하드링크로 복제한 폴더에 영향이 없도록 새 파일을 써서 교체한다."""
+    rng = random.Random(seed)
+    paths = sorted(os.path.join(d, n) for d, _, names in os.walk(root) for n in names)
+    chosen = rng.sample(paths, max(1, int(len(paths) * ratio)))
+    for path in chosen:
+        with open(path, "rb") as f:
+            data = bytearray(f.read())
+        if data and rng.random() < 0.5:
+            offset = rng.randrange(len(data))
+            data[offset:offset + 64] = os.urandom(min(64, len(data) - offset))
+        else:
+            data += os.urandom(rng.randint(16, 4096))
+        tmp = path + ".new"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return len(chosen)
+
+
+def tree_size(root):
+    files = total = 0
+    for d, _, names in os.walk(root):
+        for n in names:
+            files += 1
+            total += os.path.getsize(os.path.join(d, n))
+    return files, total
+
+
+def run_child(args):
+    """측정 대상 프로세스: yunisync 명령 하나를 실행하고 자원 사용량을 JSON으로 출력"""
+    import resource
+
+    spawned = [0]
+    original = subprocess.Popen.__init__
+
+    def counting_init(self, *a, **kw):
+        spawned[0] += 1
+        original(self, *a, **kw)
+
+    subprocess.Popen.__init__ = counting_init
+
+    from yunisync import cli, console
+    console.set_sink(lambda message: None)
+    started = time.perf_counter()
+    code = cli.main(args)
+    seconds = time.perf_counter() - started
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    print(json.dumps({"code": code, "seconds": seconds, "peak_rss_kb": max(own, children),
+                      "subprocesses": spawned[0]}))
+
+
+def measure(workdir, remote, command, env):
+    """하위 파이썬 프로세스에서 yunisync 명령 실행"""
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", "--"] + command + [
+        "--source", "yuniserver", "--remote", remote]
+    child_env = dict(env, PYTHONPATH=os.path.abspath(ROOT), YUNISYNC_METRICS="")
+    started = time.perf_counter()
+    result = subprocess.run(cmd, cwd=workdir, env=child_env, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    wall = time.perf_counter() - started
+    try:
+        report = json.loads(result.stdout.decode("utf-8").strip().splitlines()[-1])
+    except (ValueError, IndexError):
+        raise RuntimeError(f"{' '.join(command)} 실행 실패:\n{result.stderr.decode('utf-8', 'replace')}")
+    if report["code"] != 0:
+        raise RuntimeError(f"{' '.join(command)} 실패 (종료 코드 {report['code']})")
+    return wall, report
+
+
+def row(tree, mode, phase, wall, report, files, total):
+    return {
+        "tree": tree,
+        "mode": mode,
+        "phase": phase,
+        "wall_seconds": round(wall, 3),
+        "files": files,
+        "bytes": total,
+        "files_per_sec": round(files / wall, 1),
+        "mb_per_sec": round(total / MiB / wall, 2),
+        "peak_rss_mb": round(report["peak_rss_kb"] / 1024, 1),
+        "subprocesses": report["subprocesses"],
+    }
+
+
+def bench_tree(tree, modes, work, scale, env):
+    rows = []
+    base = os.path.join(work, f"tree_{tree}")
+    make_tree("mixed" if tree == "mutated" else tree, base, scale)
+    files, total = tree_size(base)
+    print(f"[{tree}] 파일 {files}개, {total / MiB:.1f} MB")
+    for mode in modes:
+        up, down = MODES[mode]
+        case = os.path.join(work, f"{tree}_{mode}")
+        upload_dir = os.path.join(case, "up")
+        download_dir = os.path.join(case, "down")
+        remote = os.path.join(case, "remote")
+        os.makedirs(upload_dir)
+        os.makedirs(download_dir)
+        clone_tree(base, os.path.join(upload_dir, "yuniserver"), "hardlink")
+
+        wall, report = measure(upload_dir, remote, up, env)
+        if tree != "mutated":
+            rows.append(row(tree, mode, "upload", wall, report, files, total))
+            wall, report = measure(download_dir, remote, down, env)
+            rows.append(row(tree, mode, "download", wall, report, files, total))
+            continue
+
+        # 변경 전 상태를 다운로드 쪽에 받아두고, 1% 변경 후 다시 업로드/다운로드
+        measure(download_dir, remote, down, env)
+        changed = mutate(os.path.join(upload_dir, "yuniserver"))
+        wall, report = measure(upload_dir, remote, up, env)
+        rows.append(dict(row(tree, mode, "upload", wall, report, files, total), changed=changed))
+        wall, report = measure(download_dir, remote, down, env)
+        rows.append(dict(row(tree, mode, "download", wall, report, files, total), changed=changed))
+    return rows
+
+
+def compare(rows, baseline_path, tolerance):
+    """이전 결과보다 tolerance 비율 이상 느려진 항목 목록"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = {(r["tree"], r["mode"], r["phase"]): r for r in json.load(f)["results"]}
+    slower = []
+    for r in rows:
+        old = baseline.get((r["tree"], r["mode"], r["phase"]))
+        if old and r["wall_seconds"] > old["wall_seconds"] * (1 + tolerance):
+            slower.append((r, old))
+    return slower
+
+
+def main():
+    if "--child" in sys.argv:
+        run_child(sys.argv[sys.argv.index("--") + 1:])
+        return 0
+
+    parser = argparse.ArgumentParser(description="오프라인 전송 벤치마크 모음")
+    parser.add_argument("--trees", default=",".join(TREES), help=f"측정할 트리 (기본: {','.join(TREES)})")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"측정할 모드 (기본: {','.join(MODES)})")
+    parser.add_argument("--scale", type=float, default=1.0, help="트리 크기 배율 (기본: 1.0)")
+    parser.add_argument("--bwlimit", help="rclone 대역폭 제한 (예: 20M)")
+    parser.add_argument("--tpslimit", type=float, help="rclone 초당 요청 수 제한 (Drive 요청 지연 흉내)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용 느려짐 비율 (기본: 0.2)")
+    parser.add_argument("--keep", action="store_true", help="작업 폴더를 지우지 않음")
+    args = parser.parse_args()
+
+    trees = [t for t in args.trees.split(",") if t]
+    modes = [m for m in args.modes.split(",") if m]
+    for name in trees:
+        if name not in TREES:
+            parser.error(f"알 수 없는 트리: {name}")
+    for name in modes:
+        if name not in MODES:
+            parser.error(f"알 수 없는 모드: {name}")
+
+    env = dict(os.environ)
+    if args.bwlimit:
+        env["RCLONE_BWLIMIT"] = args.bwlimit
+    if args.tpslimit:
+        env["RCLONE_TPSLIMIT"] = str(args.tpslimit)
+
+    work = tempfile.mkdtemp(prefix="yunisync-suite-")
+    rows = []
+    try:
+        for tree in trees:
+            rows.extend(bench_tree(tree, modes, work, args.scale, env))
+    finally:
+        if args.keep:
+            print(f"작업 폴더: {work}")
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+    print(f"{'tree':<9}{'mode':<13}{'phase':<10}{'seconds':>9}{'files/s':>10}{'MB/s':>9}{'RSS MB':>9}{'procs':>7}")
+    for r in rows:
+        print(f"{r['tree']:<9}{r['mode']:<13}{r['phase']:<10}{r['wall_seconds']:>9}{r['files_per_sec']:>10}"
+              f"{r['mb_per_sec']:>9}{r['peak_rss_mb']:>9}{r['subprocesses']:>7}")
+
+    if args.json:
+        shaping = {"bwlimit": args.bwlimit, "tpslimit": args.tpslimit, "scale": args.scale}
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": shaping, "results": rows}, f, indent=2)
+
+    if args.baseline:
+        slower = compare(rows, args.baseline, args.tolerance)
+        for r, old in slower:
+            print(f"❌ 느려짐: {r['tree']}/{r['mode']}/{r['phase']} "
+                  f"{old['wall_seconds']}초 -> {r['wall_seconds']}초")
+        if slower:
+            return 1
+        print("✓ 이전 결과 대비 느려진 항목 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
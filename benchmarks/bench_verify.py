@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+무결성 검증 벤치마크
+작은 파일(플레이어 데이터)과 큰 지역 파일이 섞인 합성 트리를 만들고 MD5 계산 속도를 비교한다.
+
+- scan:      기존 단일 프로세스 스캔 (1MB 읽기)
+- verify-1:  verify의 해시 방식 (큰 버퍼/mmap), 프로세스 1개
+- verify-N:  프로세스 N개 (기본: CPU 수)
+- cached:    바뀐 파일이 없을 때 (stat만 비교)
+
+같은 파일을 반복해서 읽으므로 첫 측정 이후는 페이지 캐시에서 읽는다. 디스크 속도를 재려면 --drop-caches (root 필요)
+
+사용법: python3 benchmarks/bench_verify.py --small 5000 --large 4 --large-mb 128 [--workers 8] [--json 결과.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from yunisync.manifest import scan  # noqa: E402
+from yunisync.verify import hash_tree  # noqa: E402
+
+
+def make_tree(root, small, large, large_mb, seed=1):
+    """합성 트리 생성. 전체 바이트 수 반환"""
+    rng = random.Random(seed)
+    total = 0
+    for i in range(small):
+        folder = os.path.join(root, "world", "playerdata", f"d{i % 64}")
+        os.makedirs(folder, exist_ok=True)
+        size = rng.randint(200, 16 * 1024)
+        with open(os.path.join(folder, f"p{i}.dat"), "wb") as f:
+            f.write(os.urandom(size))
+        total += size
+    block = os.urandom(1024 * 1024)
+    os.makedirs(os.path.join(root, "world", "region"), exist_ok=True)
+    for i in range(large):
+        with open(os.path.join(root, "world", "region", f"r.{i}.0.mca"), "wb") as f:
+            for _ in range(large_mb):
+                f.write(block)
+        total += large_mb * 1024 * 1024
+    return total
+
+
+def drop_caches():
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def measure(name, func, total, cold):
+    if cold and not drop_caches():
+        print("페이지 캐시를 비우지 못했습니다. (root 권한 필요)")
+    started = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - started
+    result = {"mode": name, "seconds": round(seconds, 3), "mb_per_sec": round(total / seconds / 1024 / 1024, 1)}
+    print(f"{name:>10}: {seconds:.2f}초, {result['mb_per_sec']} MB/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="무결성 검증 벤치마크")
+    parser.add_argument("--small", type=int, default=5000, help="작은 파일 개수 (기본: 5000)")
+    parser.add_argument("--large", type=int, default=4, help="큰 파일 개수 (기본: 4)")
+    parser.add_argument("--large-mb", type=int, default=128, help="큰 파일 크기 MB (기본: 128)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="프로세스 수 (기본: CPU 수)")
+    parser.add_argument("--drop-caches", action="store_true", help="측정마다 페이지 캐시 비우기 (root 필요)")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    work = tempfile.mkdtemp(prefix="yunisync-verifybench-")
+    try:
+        root = os.path.join(work, "yuniserver")
+        total = make_tree(root, args.small, args.large, args.large_mb)
+        print(f"트리: 작은 파일 {args.small}개, 큰 파일 {args.large}개 ({total / 1024 / 1024:.1f} MB), "
+              f"CPU {os.cpu_count()}개")
+        results = [
+            measure("scan", lambda: scan(root), total, args.drop_caches),
+            measure("verify-1", lambda: hash_tree(root, workers=1), total, args.drop_caches),
+            measure(f"verify-{args.workers}", lambda: hash_tree(root, workers=args.workers), total,
+                    args.drop_caches),
+        ]
+        manifest, stats = hash_tree(root, workers=args.workers)
+        # 기록 직후의 파일은 수정 시각이 가까워 다시 해시하므로 기록 시각을 뒤로 미룸
+        manifest.created_ns = time.time_ns() + 10 * 1000 * 1000 * 1000
+        results.append(measure("cached", lambda: hash_tree(root, manifest, workers=args.workers), total, False))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"total_bytes": total, "cpus": os.cpu_count(), "results": results}, f, indent=2)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
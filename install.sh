@@ -28,6 +28,40 @@ GITHUB_BASE="https://raw.githubusercontent.com/yunicoding/yuniserver/main"
 # 공통 파일 다운로드
 curl -s "$GITHUB_BASE/rclone.conf.template" -o "yuniscripts/rclone.conf.template"
 
+# yunisync 모듈 다운로드 (증분 업로드 등 고급 기능)
+YUNISYNC_FILES=(
+    __init__.py
+    __main__.py
+    backup.py
+    chunks.py
+    cli.py
+    config.py
+    console.py
+    fanout.py
+    freeze.py
+    journal.py
+    jobs.py
+    logsink.py
+    manifest.py
+    packs.py
+    pipeline.py
+    progress.py
+    rcd.py
+    rclone.py
+    restore.py
+    scheduler.py
+    snapshot.py
+    trace.py
+    tuning.py
+    upload.py
+    verify.py
+    watch.py
+)
+mkdir -p yuniscripts/yunisync
+for file in "${YUNISYNC_FILES[@]}"; do
+    curl -s "$GITHUB_BASE/yunisync/$file" -o "yuniscripts/yunisync/$file"
+done
+
 if [[ "$OS" == "linux" ]]; then
     # Linux 스크립트 다운로드
     mkdir -p yuniscripts/linux
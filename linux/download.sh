@@ -29,6 +29,123 @@ log_warning() {
     echo -e "${YELLOW}⚠️  $1${NC}"
 }
 
+# yunisync 모듈 실행 (yuniscripts/yunisync)
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+yunisync() {
+    PYTHONPATH="$SCRIPT_DIR/..${PYTHONPATH:+:$PYTHONPATH}" python3 -m yunisync "$@"
+}
+
+# 옵션 처리 (python3가 있으면 스트리밍 복원이 기본)
+if command -v python3 &> /dev/null; then
+    DOWNLOAD_MODE="stream"
+else
+    DOWNLOAD_MODE="sync"
+fi
+BACKUP_KEEP=3
+METRICS_FILE=""
+TRACE_FILE=""
+SYNC_ARGS=()
+PULL_ARGS=()
+RESTORE_PATTERNS=()
+VERIFY=0
+while [[ $# -gt 0 ]]; do
+    case $1 in
+        --snapshot)
+            DOWNLOAD_MODE="snapshot"
+            ;;
+        --pack)
+            DOWNLOAD_MODE="pack"
+            ;;
+        --plain)
+            DOWNLOAD_MODE="sync"
+            ;;
+        --follow)
+            DOWNLOAD_MODE="follow"
+            ;;
+        --resume)
+            DOWNLOAD_MODE="resume"
+            ;;
+        --once)
+            PULL_ARGS+=("--once")
+            ;;
+        --verify)
+            VERIFY=1
+            ;;
+        --restore)
+            if [ -z "$2" ]; then
+                log_error "--restore 옵션에 복원할 경로(패턴)를 지정해주세요."
+                exit 1
+            fi
+            DOWNLOAD_MODE="restore"
+            RESTORE_PATTERNS+=("$2")
+            shift
+            ;;
+        --keep)
+            if [[ ! "$2" =~ ^[1-9][0-9]*$ ]]; then
+                log_error "--keep 옵션에 남길 백업 개수(1 이상의 정수)를 지정해주세요."
+                exit 1
+            fi
+            BACKUP_KEEP="$2"
+            shift
+            ;;
+        --auto-tune)
+            # 크기별 단계 sync 후 권한 설정
+            DOWNLOAD_MODE="sync"
+            SYNC_ARGS+=("--auto-tune")
+            ;;
+        --metrics)
+            if [ -z "$2" ]; then
+                log_error "--metrics 옵션에 파일 경로를 지정해주세요."
+                exit 1
+            fi
+            METRICS_FILE="$2"
+            shift
+            ;;
+        --trace)
+            if [ -z "$2" ]; then
+                log_error "--trace 옵션에 파일 경로를 지정해주세요."
+                exit 1
+            fi
+            TRACE_FILE="$2"
+            shift
+            ;;
+        -h|--help)
+            echo "사용법: ./download.sh [--snapshot | --pack | --plain | --follow [--once] | --restore 경로... | --resume] [--keep N] [--auto-tune] [--verify] [--metrics 파일] [--trace 파일]"
+            echo "  --snapshot  최신 청크 스냅샷으로 복원 (로컬에 없는 청크만 다운로드)"
+            echo "  --pack      압축 묶음을 받아 병렬로 복원 (큰 파일은 직접 전송)"
+            echo "  --plain     rclone sync 후 권한 설정 (python3 없이 동작)"
+            echo "  --follow    원본의 ./upload.sh --watch가 올리는 변경을 계속 받아 적용 (Ctrl+C로 종료)"
+            echo "  --once      --follow와 함께: 밀린 변경만 적용하고 종료 (서버 이전 마지막 단계)"
+            echo "  --restore 경로  경로/패턴에 맞는 파일만 복원 (여러 번 지정 가능, 예: world/playerdata, 'plugins/*.yml')"
+            echo "  --resume    끊긴 다운로드를 작업 기록(.yunisync/yuniserver/journal)에서 이어서 실행 (백업/확인 없이 남은 파일만)"
+            echo "  --keep N    남길 백업 개수 (기본: 3)"
+            echo "  --auto-tune 파일 크기 분포/이전 측정값으로 동시성을 정해 작은/큰 파일을 나눠 sync"
+            echo "  --verify    다운로드 후 모든 파일의 MD5를 병렬로 계산해 업로드 때 기록과 비교"
+            echo "  --metrics 파일  진행률/처리량(바이트/초, 파일/초 등)을 JSONL 파일에 기록"
+            echo "  --trace 파일    단계별 소요 시간(목록 조회/검사/전송/후처리/검증)을 Chrome 추적 형식으로 기록"
+            echo "  (기본)      python3가 있으면 받는 즉시 권한 설정/검증하는 스트리밍 복원"
+            exit 0
+            ;;
+        *)
+            log_error "알 수 없는 옵션: $1"
+            exit 1
+            ;;
+    esac
+    shift
+done
+
+if [ -n "$METRICS_FILE" ]; then
+    # yunisync가 측정값을 기록할 파일 (절대 경로)
+    export YUNISYNC_METRICS="$(cd "$(dirname "$METRICS_FILE")" && pwd)/$(basename "$METRICS_FILE")"
+fi
+
+if [ -n "$TRACE_FILE" ]; then
+    # 이번 실행의 yunisync 명령(백업, 전송, 검증 등)이 한 파일에 이어서 기록
+    mkdir -p "$(dirname "$TRACE_FILE")"
+    export YUNISYNC_TRACE="$(cd "$(dirname "$TRACE_FILE")" && pwd)/$(basename "$TRACE_FILE")"
+    rm -f "$YUNISYNC_TRACE"
+fi
+
 # rclone 설정 확인
 log_info "rclone 설정 확인 중..."
 if ! command -v rclone &> /dev/null; then
@@ -43,36 +160,103 @@ if ! rclone listremotes | grep -q "googledrive:"; then
     exit 1
 fi
 
+if [[ "$DOWNLOAD_MODE" == "snapshot" || "$DOWNLOAD_MODE" == "pack" || "$DOWNLOAD_MODE" == "follow" || "$DOWNLOAD_MODE" == "restore" || "$DOWNLOAD_MODE" == "resume" ]] && ! command -v python3 &> /dev/null; then
+    log_error "--$DOWNLOAD_MODE 모드에는 python3가 필요합니다."
+    exit 1
+fi
+
+if { [ -n "$METRICS_FILE" ] || [ -n "$TRACE_FILE" ]; } && ! command -v python3 &> /dev/null; then
+    log_error "--metrics / --trace 옵션에는 python3가 필요합니다."
+    exit 1
+fi
+
+if [ ${#SYNC_ARGS[@]} -gt 0 ] && ! command -v python3 &> /dev/null; then
+    log_error "--auto-tune 옵션에는 python3가 필요합니다."
+    exit 1
+fi
+
+if [ "$VERIFY" = "1" ] && ! command -v python3 &> /dev/null; then
+    log_error "--verify 옵션에는 python3가 필요합니다."
+    exit 1
+fi
+
+if [ "$DOWNLOAD_MODE" = "resume" ]; then
+    # 받던 폴더를 그대로 이어서 채우므로 백업/확인 단계를 건너뜀
+    log_info "중단된 다운로드 이어하기..."
+    yunisync resume --direction down --source yuniserver --remote googledrive:yuniserver
+    EXIT_CODE=$?
+    if [ $EXIT_CODE -eq 0 ]; then
+        log_success "다운로드 완료!"
+        exit 0
+    fi
+    log_error "이어하기 실패 (종료 코드: $EXIT_CODE)"
+    exit $EXIT_CODE
+fi
+
 # Google Drive 폴더 존재 확인
+# 업로드 때 올린 원격 매니페스트가 있으면 그 파일 하나로 확인 (Drive 목록 조회 생략)
 log_info "Google Drive 폴더 확인 중..."
-if ! rclone lsf googledrive: | grep -q "yuniserver/"; then
+REMOTE_INFO=""
+if command -v python3 &> /dev/null; then
+    REMOTE_INFO=$(yunisync remote-info --remote googledrive:yuniserver --list 10 2>/dev/null) || REMOTE_INFO=""
+fi
+if [ -z "$REMOTE_INFO" ] && ! rclone lsf googledrive: | grep -q "yuniserver/"; then
     log_error "Google Drive에 yuniserver 폴더가 존재하지 않습니다."
     log_info "먼저 업로드를 진행해주세요."
     exit 1
 fi
 
+# 업로드 방식 확인: 청크 스냅샷/묶음은 데이터가 .yunisync/ 아래에 있어
+# 일반 sync로 받으면 로컬 파일이 지워지거나 옛 파일이 남음
+if [ -n "$REMOTE_INFO" ]; then
+    REMOTE_LAYOUT=$(echo "$REMOTE_INFO" | sed -n 's/.*(방식: \([a-z]*\)).*/\1/p' | head -n 1)
+else
+    REMOTE_LAYOUT=$(rclone cat googledrive:yuniserver/.yunisync/manifest.json.gz 2>/dev/null | gzip -dc 2>/dev/null \
+        | grep -o '"layout": *"[a-z]*"' | head -n 1 | sed 's/.*"\([a-z]*\)"$/\1/')
+fi
+if [[ "$REMOTE_LAYOUT" == "snapshot" || "$REMOTE_LAYOUT" == "pack" ]]; then
+    if [[ "$DOWNLOAD_MODE" == "stream" || "$DOWNLOAD_MODE" == "sync" ]]; then
+        if ! command -v python3 &> /dev/null; then
+            log_error "원격이 $REMOTE_LAYOUT 방식으로 업로드되어 있어 python3가 필요합니다."
+            exit 1
+        fi
+        log_info "원격이 $REMOTE_LAYOUT 방식으로 업로드되어 있어 --$REMOTE_LAYOUT 모드로 받습니다."
+        DOWNLOAD_MODE="$REMOTE_LAYOUT"
+    elif [ "$DOWNLOAD_MODE" = "follow" ]; then
+        log_error "원격이 $REMOTE_LAYOUT 방식으로 업로드되어 있어 --follow를 사용할 수 없습니다. --$REMOTE_LAYOUT 모드로 받아주세요."
+        exit 1
+    fi
+fi
+
 # 기존 폴더 백업 확인
 if [ -d "yuniserver" ]; then
     log_warning "기존 yuniserver 폴더가 존재합니다."
     echo
     echo "선택 옵션:"
-    echo "1. 기존 폴더 삭제 후 다운로드"
-    echo "2. 백업 후 다운로드"
+    echo "1. 기존 폴더를 최신 상태로 덮어쓰기 (변경된 파일만 다운로드)"
+    echo "2. 백업 후 다운로드 (최근 ${BACKUP_KEEP}개 백업 유지)"
     echo "3. 취소"
     echo
     read -p "선택 (1-3): " choice
     
     case $choice in
         1)
-            log_info "기존 폴더 삭제 중..."
-            rm -rf yuniserver
-            log_success "삭제 완료"
+            # 삭제하지 않고 기존 폴더에 동기화하므로 바뀐 파일만 전송됨
+            log_info "기존 폴더에 변경분만 동기화합니다."
             ;;
         2)
             log_info "백업 생성 중..."
-            backup_name="yuniserver_backup_$(date +%Y%m%d_%H%M%S)"
-            mv yuniserver "$backup_name"
-            log_success "백업 완료: $backup_name"
+            if command -v python3 &> /dev/null; then
+                # reflink 백업 (지원하지 않으면 일반 복사): 바뀌지 않은 파일은 디스크 공간을 공유
+                if ! yunisync backup --source yuniserver --keep "$BACKUP_KEEP"; then
+                    log_error "백업 실패"
+                    exit 1
+                fi
+            else
+                backup_name="yuniserver_backup_$(date +%Y%m%d_%H%M%S)"
+                mv yuniserver "$backup_name"
+                log_success "백업 완료: $backup_name"
+            fi
             ;;
         3)
             log_info "취소되었습니다."
@@ -91,20 +275,36 @@ log_info "소스: Google Drive"
 log_info "대상: yuniserver"
 echo
 
-# Google Drive 폴더 크기 확인 (근사치)
-log_info "Google Drive 폴더 확인 중..."
-FILE_LIST=$(rclone lsf googledrive:yuniserver -R | head -n 10)
-FILE_COUNT=$(rclone lsf googledrive:yuniserver -R | wc -l)
-
-if [ $FILE_COUNT -gt 0 ]; then
-    log_info "파일 개수: $FILE_COUNT개"
-    echo
-    log_info "최근 파일 목록 (최대 10개):"
-    echo "$FILE_LIST" | while read -r file; do
-        echo "  - $file"
-    done
+if [ "$DOWNLOAD_MODE" = "restore" ]; then
+    # 받을 파일 목록 미리 보기 (원격 매니페스트 기준)
+    yunisync restore --remote googledrive:yuniserver --dry-run "${RESTORE_PATTERNS[@]}" | head -n 20
+elif [ "$DOWNLOAD_MODE" = "pack" ]; then
+    log_info "묶음 모드: 원격 묶음 목록을 기준으로 복원합니다."
+elif [ "$DOWNLOAD_MODE" = "snapshot" ]; then
+    # 스냅샷 목록 확인
+    log_info "Google Drive 스냅샷 확인 중..."
+    yunisync snapshot-list --remote googledrive:yuniserver
+elif [ -n "$REMOTE_INFO" ]; then
+    # 원격 매니페스트 기준 파일 개수/크기
+    echo "$REMOTE_INFO"
 else
-    log_warning "Google Drive 폴더가 비어있습니다."
+    # Google Drive 폴더 크기 확인 (근사치)
+    log_info "Google Drive 폴더 확인 중..."
+    # 목록은 한 번만 조회
+    REMOTE_FILES=$(rclone lsf googledrive:yuniserver -R --files-only --exclude="/.yunisync/**")
+    FILE_LIST=$(echo "$REMOTE_FILES" | head -n 10)
+    FILE_COUNT=$(echo -n "$REMOTE_FILES" | grep -c '^' || true)
+
+    if [ $FILE_COUNT -gt 0 ]; then
+        log_info "파일 개수: $FILE_COUNT개"
+        echo
+        log_info "최근 파일 목록 (최대 10개):"
+        echo "$FILE_LIST" | while read -r file; do
+            echo "  - $file"
+        done
+    else
+        log_warning "Google Drive 폴더가 비어있습니다."
+    fi
 fi
 
 echo
@@ -123,17 +323,62 @@ START_TIME=$(date +%s)
 echo "시작 시간: $(date)"
 echo
 
-# rclone sync 명령 실행 (진행률 표시)
-log_info "rclone sync 명령 실행 중..."
-rclone sync googledrive:yuniserver yuniserver \
-    --progress \
-    --stats=1s \
-    --transfers=4 \
-    --checkers=8 \
-    --stats-one-line
+if [ "$DOWNLOAD_MODE" = "snapshot" ]; then
+    # 레시피에 따라 바뀐 파일만 청크로 재구성
+    log_info "청크 스냅샷 복원 중..."
+    yunisync snapshot-pull --source yuniserver --remote googledrive:yuniserver
+    EXIT_CODE=$?
+elif [ "$DOWNLOAD_MODE" = "pack" ]; then
+    # 묶음을 받아 병렬로 풀고 큰 파일은 rclone sync로 전송
+    log_info "묶음 다운로드 실행 중..."
+    yunisync pack-pull --source yuniserver --remote googledrive:yuniserver
+    EXIT_CODE=$?
+elif [ "$DOWNLOAD_MODE" = "restore" ]; then
+    # 원격 매니페스트에서 패턴에 맞는 파일만 골라 받음 (다른 로컬 파일은 그대로)
+    log_info "선택 복원 중..."
+    yunisync restore --source yuniserver --remote googledrive:yuniserver "${RESTORE_PATTERNS[@]}"
+    EXIT_CODE=$?
+elif [ "$DOWNLOAD_MODE" = "follow" ]; then
+    # 마지막으로 적용한 변경 기록 이후의 파일만 받음 (처음이면 전체 동기화부터)
+    log_info "변경 기록 적용 중..."
+    yunisync pull --source yuniserver --remote googledrive:yuniserver "${PULL_ARGS[@]}"
+    EXIT_CODE=$?
+elif [ "$DOWNLOAD_MODE" = "stream" ]; then
+    # 파일이 도착하는 즉시 실행 권한 부여 및 검증
+    log_info "rclone sync 스트리밍 복원 중..."
+    if [ "$VERIFY" = "1" ]; then
+        # 받는 중에는 권한만 처리하고 끝난 뒤 트리 전체를 병렬 검증
+        yunisync download --source yuniserver --remote googledrive:yuniserver --verify
+    else
+        yunisync download --source yuniserver --remote googledrive:yuniserver
+    fi
+    EXIT_CODE=$?
+elif [ -n "$METRICS_FILE" ] || [ -n "$TRACE_FILE" ] || [ ${#SYNC_ARGS[@]} -gt 0 ]; then
+    # rclone sync와 동일하되 JSON 통계로 진행률/처리량/단계별 시간 기록, --auto-tune이면 동시성 자동 조정
+    log_info "rclone sync 명령 실행 중 (yunisync)..."
+    yunisync sync down --source yuniserver --remote googledrive:yuniserver "${SYNC_ARGS[@]}"
+    EXIT_CODE=$?
+else
+    # rclone sync 명령 실행 (진행률 표시)
+    log_info "rclone sync 명령 실행 중..."
+    rclone sync googledrive:yuniserver yuniserver \
+        --progress \
+        --stats=1s \
+        --transfers=4 \
+        --checkers=8 \
+        --stats-one-line \
+        --exclude="/.yunisync/**"
+    EXIT_CODE=$?
+fi
+
+# 무결성 검증 (스트리밍 복원은 위에서 이미 처리, 선택 복원은 일부만 받으므로 제외)
+if [ $EXIT_CODE -eq 0 ] && [ "$VERIFY" = "1" ] && [ "$DOWNLOAD_MODE" != "stream" ] && [ "$DOWNLOAD_MODE" != "restore" ]; then
+    log_info "무결성 검증 중 (업로드 때 기록한 MD5와 비교)..."
+    yunisync verify --source yuniserver --remote googledrive:yuniserver
+    EXIT_CODE=$?
+fi
 
 # 결과 확인
-EXIT_CODE=$?
 END_TIME=$(date +%s)
 DURATION=$((END_TIME - START_TIME))
 
@@ -167,12 +412,13 @@ if [ $EXIT_CODE -eq 0 ]; then
     echo "- 소요 시간: ${DURATION}초"
     echo "- 완료 시간: $(date)"
     
-    # 권한 설정
-    log_info "권한 설정 중..."
-    find yuniserver -name "*.sh" -exec chmod +x {} \; 2>/dev/null || true
-    find yuniserver -name "*.jar" -exec chmod +x {} \; 2>/dev/null || true
-    find yuniserver -name "*.exe" -exec chmod +x {} \; 2>/dev/null || true
-    log_success "권한 설정 완료"
+    # 권한 설정 (다른 모드는 복원 중에 이미 처리됨)
+    if [ "$DOWNLOAD_MODE" = "sync" ]; then
+        log_info "권한 설정 중..."
+        find yuniserver -type f \( -name "*.sh" -o -name "*.jar" -o -name "*.exe" \) \
+            ! -perm -u+x -exec chmod +x {} + 2>/dev/null || true
+        log_success "권한 설정 완료"
+    fi
     
 else
     log_error "다운로드 실패 (종료 코드: $EXIT_CODE)"
@@ -29,6 +29,140 @@ log_warning() {
     echo -e "${YELLOW}⚠️  $1${NC}"
 }
 
+# yunisync 모듈 실행 (yuniscripts/yunisync)
+SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+yunisync() {
+    PYTHONPATH="$SCRIPT_DIR/..${PYTHONPATH:+:$PYTHONPATH}" python3 -m yunisync "$@"
+}
+
+# 옵션 처리
+UPLOAD_MODE="sync"
+YUNISYNC_ARGS=()
+MIRRORS=()
+FREEZE_ARGS=()
+METRICS_FILE=""
+TRACE_FILE=""
+THROTTLE=""
+SCHEDULE=""
+SYNC_ARGS=()
+while [ $# -gt 0 ]; do
+    arg="$1"
+    case $arg in
+        --incremental)
+            UPLOAD_MODE="incremental"
+            ;;
+        --snapshot)
+            UPLOAD_MODE="snapshot"
+            ;;
+        --pack)
+            UPLOAD_MODE="pack"
+            ;;
+        --watch)
+            UPLOAD_MODE="watch"
+            ;;
+        --resume)
+            UPLOAD_MODE="resume"
+            ;;
+        --full)
+            YUNISYNC_ARGS+=("--full")
+            ;;
+        --mirror)
+            if [ -z "$2" ]; then
+                log_error "--mirror 옵션에 원격 경로를 지정해주세요. (예: nas:/backup/yuniserver)"
+                exit 1
+            fi
+            YUNISYNC_ARGS+=("--mirror" "$2")
+            MIRRORS+=("$2")
+            shift
+            ;;
+        --auto-tune)
+            SYNC_ARGS+=("--auto-tune")
+            ;;
+        --freeze)
+            SYNC_ARGS+=("--freeze")
+            FREEZE_ARGS=("--freeze")
+            ;;
+        --metrics)
+            if [ -z "$2" ]; then
+                log_error "--metrics 옵션에 파일 경로를 지정해주세요."
+                exit 1
+            fi
+            METRICS_FILE="$2"
+            shift
+            ;;
+        --trace)
+            if [ -z "$2" ]; then
+                log_error "--trace 옵션에 파일 경로를 지정해주세요."
+                exit 1
+            fi
+            TRACE_FILE="$2"
+            shift
+            ;;
+        --throttle)
+            THROTTLE=1
+            ;;
+        --schedule)
+            if [ -z "$2" ]; then
+                log_error "--schedule 옵션에 시간표를 지정해주세요. (예: \"08:00,1M 02:00,off\")"
+                exit 1
+            fi
+            SCHEDULE="$2"
+            shift
+            ;;
+        -h|--help)
+            echo "사용법: ./upload.sh [--incremental [--full] [--mirror 원격]... | --snapshot | --pack | --auto-tune | --watch | --resume] [--freeze] [--throttle] [--schedule 시간표] [--metrics 파일] [--trace 파일]"
+            echo "  --incremental  로컬 매니페스트로 변경된 파일만 업로드 (원격 비교 생략)"
+            echo "  --full         증분 기준 상태를 무시하고 전체 sync 후 기준 상태 재기록"
+            echo "  --mirror 원격  Google Drive와 함께 동시에 올릴 원격 (여러 번 지정 가능, 원격@N으로 동시 전송 수 지정)"
+            echo "                 스캔/해시는 한 번만 하고, 한 원격이 실패해도 나머지는 계속 진행 (증분 업로드로 실행)"
+            echo "  --snapshot     청크 스냅샷으로 업로드 (바뀐 청크만 전송)"
+            echo "  --pack         작은 파일을 압축 묶음으로 업로드 (큰 파일은 직접 전송)"
+            echo "  --auto-tune    파일 크기 분포/이전 측정값으로 동시성을 정해 작은/큰 파일을 나눠 sync"
+            echo "  --watch        변경을 감시해 몇 초 단위로 계속 업로드 (서버 이전 준비, Ctrl+C로 종료)"
+            echo "  --resume       끊긴 업로드를 작업 기록(.yunisync/yuniserver/journal)에서 이어서 실행 (남은 파일만 전송)"
+            echo "  --freeze       서버를 멈추지 않고 시점 고정 복사본에서 업로드"
+            echo "                 (YUNISYNC_PRE_HOOK/YUNISYNC_POST_HOOK로 저장 중지/재개 명령 지정)"
+            echo "  --throttle     CPU/iowait/서버 틱 시간을 보며 대역폭을 조절하고 낮은 우선순위로 실행"
+            echo "                 (YUNISYNC_TICK_COMMAND로 틱 시간(ms)을 출력하는 명령 지정)"
+            echo "  --schedule 시간표 시간대별 대역폭 상한 (예: \"08:00,1M 18:00,512k 02:00,off\")"
+            echo "  --metrics 파일 진행률/처리량(바이트/초, 파일/초 등)을 JSONL 파일에 기록"
+            echo "  --trace 파일   단계별 소요 시간(스캔/목록 조회/검사/전송/후처리/검증)을 Chrome 추적 형식으로 기록"
+            exit 0
+            ;;
+        *)
+            log_error "알 수 없는 옵션: $arg"
+            exit 1
+            ;;
+    esac
+    shift
+done
+
+if [ ${#FREEZE_ARGS[@]} -gt 0 ] && [[ "$UPLOAD_MODE" == "watch" || "$UPLOAD_MODE" == "resume" ]]; then
+    # 감시 모드는 실행 중인 폴더를 계속 따라가고, 이어하기는 기록된 파일을 원래 폴더에서 보냄
+    log_error "--freeze는 --$UPLOAD_MODE 모드와 함께 사용할 수 없습니다."
+    exit 1
+fi
+
+if [ -n "$METRICS_FILE" ]; then
+    # yunisync가 측정값을 기록할 파일 (절대 경로)
+    export YUNISYNC_METRICS="$(cd "$(dirname "$METRICS_FILE")" && pwd)/$(basename "$METRICS_FILE")"
+fi
+
+if [ -n "$TRACE_FILE" ]; then
+    # 이번 실행의 yunisync 명령(백업, 전송, 검증 등)이 한 파일에 이어서 기록
+    mkdir -p "$(dirname "$TRACE_FILE")"
+    export YUNISYNC_TRACE="$(cd "$(dirname "$TRACE_FILE")" && pwd)/$(basename "$TRACE_FILE")"
+    rm -f "$YUNISYNC_TRACE"
+fi
+
+# 부하 조절/시간대 일정은 모든 yunisync 전송에 적용 (환경 변수로 전달)
+if [ -n "$THROTTLE" ]; then
+    export YUNISYNC_THROTTLE=1
+fi
+if [ -n "$SCHEDULE" ]; then
+    export YUNISYNC_BWLIMIT_SCHEDULE="$SCHEDULE"
+fi
+
 # yuniserver 폴더 존재 확인
 if [ ! -d "yuniserver" ]; then
     log_error "yuniserver 폴더가 존재하지 않습니다."
@@ -50,9 +184,37 @@ if ! rclone listremotes | grep -q "googledrive:"; then
     exit 1
 fi
 
+if [ ${#MIRRORS[@]} -gt 0 ]; then
+    # 여러 원격 동시 업로드는 증분 업로드로만 실행
+    if [ "$UPLOAD_MODE" = "sync" ]; then
+        UPLOAD_MODE="incremental"
+    elif [ "$UPLOAD_MODE" != "incremental" ]; then
+        log_error "--mirror는 --$UPLOAD_MODE 모드와 함께 사용할 수 없습니다."
+        exit 1
+    fi
+fi
+
+if [ "$UPLOAD_MODE" != "sync" ] && ! command -v python3 &> /dev/null; then
+    log_error "--$UPLOAD_MODE 모드에는 python3가 필요합니다."
+    exit 1
+fi
+
+if { [ -n "$METRICS_FILE" ] || [ -n "$TRACE_FILE" ]; } && ! command -v python3 &> /dev/null; then
+    log_error "--metrics / --trace 옵션에는 python3가 필요합니다."
+    exit 1
+fi
+
+if { [ ${#SYNC_ARGS[@]} -gt 0 ] || [ -n "$THROTTLE" ] || [ -n "$SCHEDULE" ]; } && ! command -v python3 &> /dev/null; then
+    log_error "--auto-tune / --freeze / --throttle / --schedule 옵션에는 python3가 필요합니다."
+    exit 1
+fi
+
 # 업로드 전 확인
 log_info "업로드할 폴더: yuniserver"
 log_info "대상: Google Drive"
+for mirror in "${MIRRORS[@]}"; do
+    log_info "추가 대상: $mirror"
+done
 echo
 
 # 폴더 크기 확인
@@ -83,20 +245,58 @@ START_TIME=$(date +%s)
 echo "시작 시간: $(date)"
 echo
 
-# rclone sync 명령 실행 (진행률 표시)
-log_info "rclone sync 명령 실행 중..."
-rclone sync yuniserver googledrive:yuniserver \
-    --progress \
-    --stats=1s \
-    --transfers=4 \
-    --checkers=8 \
-    --stats-one-line \
-    --exclude="*.tmp" \
-    --exclude="*.lock" \
-    --exclude="*.log"
+if [ "$UPLOAD_MODE" = "incremental" ]; then
+    # 변경된 파일만 전송 (원격 목록 조회/비교 생략)
+    log_info "증분 업로드 실행 중..."
+    yunisync upload --source yuniserver --remote googledrive:yuniserver "${YUNISYNC_ARGS[@]}" "${FREEZE_ARGS[@]}"
+    EXIT_CODE=$?
+elif [ "$UPLOAD_MODE" = "snapshot" ]; then
+    # 내용 기반 청크로 나눠 원격에 없는 청크만 전송
+    log_info "청크 스냅샷 업로드 실행 중..."
+    yunisync snapshot-push --source yuniserver --remote googledrive:yuniserver "${FREEZE_ARGS[@]}"
+    EXIT_CODE=$?
+elif [ "$UPLOAD_MODE" = "pack" ]; then
+    # 작은 파일은 압축 묶음으로, 큰 파일은 rclone sync로 전송
+    log_info "묶음 업로드 실행 중..."
+    yunisync pack-push --source yuniserver --remote googledrive:yuniserver "${FREEZE_ARGS[@]}"
+    EXIT_CODE=$?
+elif [ "$UPLOAD_MODE" = "resume" ]; then
+    # 끝난 파일 기록과 원격 매니페스트로 남은 파일만 전송 (원격 목록 조회 없음)
+    log_info "중단된 업로드 이어하기..."
+    yunisync resume --direction up --source yuniserver --remote googledrive:yuniserver
+    EXIT_CODE=$?
+elif [ "$UPLOAD_MODE" = "watch" ]; then
+    # 밀린 변경을 올린 뒤 바뀐 파일을 묶어 계속 전송 (대상 서버는 ./download.sh --follow)
+    log_info "감시 모드 실행 중 (Ctrl+C로 종료하면 남은 변경을 올리고 끝냄)..."
+    yunisync watch --source yuniserver --remote googledrive:yuniserver
+    EXIT_CODE=$?
+elif command -v python3 &> /dev/null; then
+    # rclone sync와 동일하되 끝난 파일을 기록 (끊기면 ./upload.sh --resume으로 이어서 실행)
+    # JSON 통계로 진행률/처리량 기록, --auto-tune이면 동시성 자동 조정, --throttle/--schedule이면 대역폭 조절
+    log_info "rclone sync 명령 실행 중 (yunisync)..."
+    yunisync sync up --source yuniserver --remote googledrive:yuniserver "${SYNC_ARGS[@]}"
+    EXIT_CODE=$?
+else
+    # rclone sync 명령 실행 (진행률 표시)
+    log_info "rclone sync 명령 실행 중..."
+    rclone sync yuniserver googledrive:yuniserver \
+        --progress \
+        --stats=1s \
+        --transfers=4 \
+        --checkers=8 \
+        --stats-one-line \
+        --exclude="*.tmp" \
+        --exclude="*.lock" \
+        --exclude="*.log" \
+        --exclude="/.yunisync/**"
+    EXIT_CODE=$?
+    if [ $EXIT_CODE -eq 0 ]; then
+        # python3 없이 올렸으므로 이전 원격 매니페스트는 맞지 않음 (다운로드 쪽 사전 확인/검증에서 쓰지 않도록 삭제)
+        rclone deletefile googledrive:yuniserver/.yunisync/manifest.json.gz 2>/dev/null || true
+    fi
+fi
 
 # 결과 확인
-EXIT_CODE=$?
 END_TIME=$(date +%s)
 DURATION=$((END_TIME - START_TIME))
 
@@ -60,8 +60,40 @@ echo 소스: Google Drive
 echo 대상: yuniserver
 echo.
 
-REM rclone sync 명령 실행 (진행률 표시)
-rclone sync googledrive:yuniserver yuniserver --progress --stats=1s --transfers=4 --checkers=8
+if /i "%~1"=="--snapshot" (
+    REM 레시피에 따라 바뀐 파일만 청크로 재구성
+    echo 📥 청크 스냅샷 복원 중...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync snapshot-pull --source yuniserver --remote googledrive:yuniserver
+) else if /i "%~1"=="--pack" (
+    REM 묶음을 받아 병렬로 풀고 큰 파일은 rclone sync로 전송
+    echo 📥 묶음 다운로드 실행 중...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync pack-pull --source yuniserver --remote googledrive:yuniserver
+) else if /i "%~1"=="--follow" (
+    REM 원본의 감시 모드가 올린 변경 기록을 따라 받음 (%2에 --once를 주면 밀린 변경만 적용)
+    echo 📥 변경 기록 적용 중...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync pull --source yuniserver --remote googledrive:yuniserver %2
+) else if /i "%~1"=="--restore" (
+    REM 경로/패턴에 맞는 파일만 복원 (예: download.bat --restore world/playerdata)
+    echo 📥 선택 복원 중...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync restore --source yuniserver --remote googledrive:yuniserver %2
+) else if /i "%~1"=="--resume" (
+    REM 끊긴 다운로드를 작업 기록에서 이어서 실행 (기존 폴더는 1번 덮어쓰기 선택)
+    echo 📥 중단된 다운로드 이어하기...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync resume --direction down --source yuniserver --remote googledrive:yuniserver
+) else if /i "%~1"=="--verify" (
+    REM 받는 즉시 권한 처리, 끝난 뒤 모든 파일의 MD5를 병렬로 계산해 업로드 때 기록과 비교
+    echo 📥 다운로드 후 무결성 검증...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync download --verify --source yuniserver --remote googledrive:yuniserver
+) else (
+    REM rclone sync 명령 실행 (진행률 표시)
+    rclone sync googledrive:yuniserver yuniserver --progress --stats=1s --transfers=4 --checkers=8 --exclude "/.yunisync/**"
+)
 
 if %errorLevel% neq 0 (
     echo ❌ 다운로드 실패
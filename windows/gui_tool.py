@@ -6,15 +6,30 @@ Windows용 rclone 업로드/다운로드 GUI 프로그램
 """
 
 import os
+import queue
 import sys
 import subprocess
 import threading
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext, simpledialog, filedialog
-from datetime import datetime
 import time
 import json
 
+# yunisync 모듈 (yuniscripts/yunisync)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from yunisync import config, console, trace
+from yunisync.jobs import CANCELLED, DONE, KINDS, MAX_JOBS, QUEUED, RUNNING, STATE_NAMES, JobEngine
+from yunisync.journal import pending
+from yunisync.logsink import LogSink
+from yunisync.manifest import state_dir
+from yunisync.progress import format_bytes
+from yunisync.rcd import DaemonTransport, SubprocessTransport, open_transport
+from yunisync.rclone import Rclone, RcloneError, join
+from yunisync.restore import remote_tree
+
+# 로그 창 갱신 주기 (밀리초)
+LOG_FLUSH_MS = 100
+
 class ServiceAccountDialog:
     def __init__(self, parent):
         self.result = None
@@ -138,19 +153,129 @@ class ServiceAccountDialog:
         self.result = None
         self.window.destroy()
 
+class RestoreDialog:
+    """원격 폴더 트리에서 복원할 항목 선택 (폴더를 펼칠 때 한 단계씩 불러옴)"""
+    
+    LOADING = "\0loading"
+    
+    def __init__(self, app):
+        self.app = app
+        self.source = None
+        self.loaded = set()
+        self.window = tk.Toplevel(app.root)
+        self.window.title("선택 복원")
+        self.window.geometry("560x480")
+        self.window.transient(app.root)
+        
+        main_frame = ttk.Frame(self.window, padding="10")
+        main_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.status = tk.StringVar(value="원격 목록 불러오는 중...")
+        ttk.Label(main_frame, textvariable=self.status).pack(anchor=tk.W, pady=(0, 5))
+        
+        tree_frame = ttk.Frame(main_frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.tree = ttk.Treeview(tree_frame, columns=("size",), selectmode="extended")
+        self.tree.heading("#0", text="경로")
+        self.tree.heading("size", text="크기")
+        self.tree.column("size", width=90, anchor=tk.E, stretch=False)
+        scrollbar = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind("<<TreeviewOpen>>", self.on_open)
+        
+        button_frame = ttk.Frame(main_frame)
+        button_frame.pack(fill=tk.X, pady=(10, 0))
+        ttk.Button(button_frame, text="닫기", command=self.window.destroy).pack(side=tk.RIGHT, padx=(5, 0))
+        ttk.Button(button_frame, text="선택 항목 복원", command=self.restore_selected).pack(side=tk.RIGHT)
+        
+        threading.Thread(target=self.load_root, daemon=True).start()
+    
+    def load_root(self):
+        """원격 매니페스트가 있으면 그것으로, 없으면 폴더마다 rclone 목록 조회 (작업 스레드)"""
+        try:
+            transport = self.app.get_transport()
+            self.source = remote_tree(Rclone(), config.REMOTE,
+                                      lister=lambda rel: transport.list(join(config.REMOTE, rel)))
+            items = self.source.children("")
+        except RcloneError as e:
+            message = f"목록을 불러오지 못했습니다: {e}"
+            self.app.call_in_ui(lambda: self.status.set(message))
+            return
+        if self.source.manifest is not None:
+            text = f"원격 매니페스트 기준 (파일 {len(self.source.manifest)}개, 업로드 방식: {self.source.manifest.layout})"
+        else:
+            text = "원격 매니페스트가 없어 폴더마다 목록을 조회합니다."
+        self.app.call_in_ui(lambda: (self.status.set(text), self.populate("", items)))
+    
+    def populate(self, parent, items):
+        if not self.window.winfo_exists():
+            return
+        self.tree.delete(*self.tree.get_children(parent))
+        for name, is_dir, size in items:
+            rel = f"{parent}/{name}" if parent else name
+            label = f"📁 {name}" if is_dir else name
+            self.tree.insert(parent, tk.END, iid=rel, text=label,
+                             values=(format_bytes(size) if size or not is_dir else "",))
+            if is_dir:
+                # 펼칠 수 있도록 임시 항목을 넣어 두고, 펼칠 때 실제 목록으로 교체
+                self.tree.insert(rel, tk.END, iid=rel + self.LOADING, text="불러오는 중...")
+        self.loaded.add(parent)
+    
+    def on_open(self, event):
+        rel = self.tree.focus()
+        if not rel or rel in self.loaded or self.source is None:
+            return
+        self.loaded.add(rel)
+        
+        def load():
+            try:
+                items = self.source.children(rel)
+            except RcloneError as e:
+                self.app.log(f"❌ 목록 조회 실패: {rel} ({e})")
+                self.loaded.discard(rel)
+                return
+            self.app.call_in_ui(lambda: self.populate(rel, items))
+        
+        threading.Thread(target=load, daemon=True).start()
+    
+    def restore_selected(self):
+        patterns = [iid for iid in self.tree.selection() if not iid.endswith(self.LOADING)]
+        if not patterns:
+            messagebox.showwarning("경고", "복원할 파일이나 폴더를 선택해주세요.", parent=self.window)
+            return
+        if not messagebox.askyesno("확인", f"선택한 {len(patterns)}개 항목을 복원하시겠습니까?\n"
+                                   "같은 경로의 로컬 파일은 덮어씁니다.", parent=self.window):
+            return
+        if self.app.start_restore(patterns):
+            self.window.destroy()
+
 class YuniServerGUI:
     def __init__(self):
         self.root = tk.Tk()
         self.root.title("YuniServer 관리 도구")
-        self.root.geometry("600x500")
+        self.root.geometry("600x620")
         self.root.resizable(True, True)
         
-        # 변수 설정
+        # 변수 설정 (is_running은 초기 설정 중인지, 업로드/다운로드 등은 작업 큐에서 동시에 실행)
         self.is_running = False
-        self.current_process = None
+        self.transport = None
+        self.transport_lock = threading.Lock()
+        self.ui_calls = queue.Queue()
+        self.reported_jobs = set()
+        self.engine = JobEngine(MAX_JOBS, transport_factory=self.job_transport, on_change=self.on_job_change)
+        self.engine.start()
+        
+        # 로그는 작업 스레드에서 버퍼에 쌓고 메인 루프가 주기적으로 화면에 반영
+        self.log_path = os.path.join(state_dir(config.SERVER_DIR), "logs", "gui.log")
+        self.log_sink = LogSink(self.log_path)
+        console.set_sink(self.log)
         
         # GUI 구성
         self.setup_gui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(LOG_FLUSH_MS, self.flush_log)
         
         # 초기 상태 확인
         self.check_initial_status()
@@ -198,9 +323,18 @@ class YuniServerGUI:
         self.download_btn = ttk.Button(button_frame, text="다운로드", command=self.start_download)
         self.download_btn.pack(side=tk.LEFT, padx=5)
         
+        self.restore_btn = ttk.Button(button_frame, text="선택 복원", command=self.open_restore)
+        self.restore_btn.pack(side=tk.LEFT, padx=5)
+        
+        self.resume_btn = ttk.Button(button_frame, text="이어하기", command=self.start_resume)
+        self.resume_btn.pack(side=tk.LEFT, padx=5)
+        
         self.refresh_btn = ttk.Button(button_frame, text="상태 새로고침", command=self.check_initial_status)
         self.refresh_btn.pack(side=tk.LEFT, padx=5)
         
+        self.cancel_btn = ttk.Button(button_frame, text="취소", command=self.cancel_job)
+        self.cancel_btn.pack(side=tk.LEFT, padx=5)
+        
         # 진행률 표시
         progress_frame = ttk.LabelFrame(main_frame, text="진행률", padding="10")
         progress_frame.grid(row=3, column=0, columnspan=2, sticky=tk.W+tk.E, pady=(0, 10))
@@ -212,9 +346,23 @@ class YuniServerGUI:
         self.progress_text = tk.StringVar(value="대기 중...")
         ttk.Label(progress_frame, textvariable=self.progress_text).grid(row=1, column=0, sticky=tk.W)
         
+        # 작업 목록 (선택 후 "취소"로 작업 하나만 취소)
+        job_frame = ttk.LabelFrame(main_frame, text="작업", padding="10")
+        job_frame.grid(row=4, column=0, columnspan=2, sticky=tk.W+tk.E, pady=(0, 10))
+        
+        self.job_tree = ttk.Treeview(job_frame, columns=("kind", "state", "detail"), height=4)
+        self.job_tree.heading("#0", text="번호")
+        self.job_tree.heading("kind", text="작업")
+        self.job_tree.heading("state", text="상태")
+        self.job_tree.heading("detail", text="진행률")
+        self.job_tree.column("#0", width=50, stretch=False)
+        self.job_tree.column("kind", width=90, stretch=False)
+        self.job_tree.column("state", width=70, stretch=False)
+        self.job_tree.grid(row=0, column=0, sticky=tk.W+tk.E)
+        
         # 로그 창
         log_frame = ttk.LabelFrame(main_frame, text="로그", padding="10")
-        log_frame.grid(row=4, column=0, columnspan=2, sticky=tk.W+tk.E+tk.N+tk.S, pady=(0, 10))
+        log_frame.grid(row=5, column=0, columnspan=2, sticky=tk.W+tk.E+tk.N+tk.S, pady=(0, 10))
         
         self.log_text = scrolledtext.ScrolledText(log_frame, height=12, width=70)
         self.log_text.grid(row=0, column=0, sticky=tk.W+tk.E+tk.N+tk.S)
@@ -223,41 +371,81 @@ class YuniServerGUI:
         self.root.columnconfigure(0, weight=1)
         self.root.rowconfigure(0, weight=1)
         main_frame.columnconfigure(0, weight=1)
-        main_frame.rowconfigure(4, weight=1)
+        main_frame.rowconfigure(5, weight=1)
         progress_frame.columnconfigure(0, weight=1)
+        job_frame.columnconfigure(0, weight=1)
         log_frame.columnconfigure(0, weight=1)
         log_frame.rowconfigure(0, weight=1)
     
     def log(self, message):
-        """로그 메시지 추가"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"[{timestamp}] {message}\n"
-        self.log_text.insert(tk.END, log_message)
-        self.log_text.see(tk.END)
-        self.root.update_idletasks()
+        """로그 메시지 추가 (어느 스레드에서나 호출 가능)"""
+        self.log_sink.write(message)
+    
+    def flush_log(self):
+        """쌓인 로그와 최신 진행률을 한 번에 화면에 반영 (메인 루프 타이머)"""
+        lines, dropped = self.log_sink.drain()
+        if lines:
+            at_bottom = self.log_text.yview()[1] >= 0.999
+            if dropped:
+                self.log_text.insert(tk.END, f"... {dropped}줄 생략 (전체 로그: {self.log_path})\n")
+            self.log_text.insert(tk.END, "".join(lines))
+            # 화면에는 최근 줄만 유지
+            line_count = int(self.log_text.index("end-1c").split(".")[0])
+            if line_count > self.log_sink.max_lines:
+                self.log_text.delete("1.0", f"{line_count - self.log_sink.max_lines + 1}.0")
+            if at_bottom:
+                self.log_text.see(tk.END)
+        
+        while True:
+            try:
+                func = self.ui_calls.get_nowait()
+            except queue.Empty:
+                break
+            func()
+        
+        self.root.after(LOG_FLUSH_MS, self.flush_log)
+    
+    def call_in_ui(self, func):
+        """작업 스레드에서 화면을 바꿀 때 사용 (다음 flush_log에서 메인 루프가 실행)"""
+        self.ui_calls.put(func)
+    
+    def get_transport(self):
+        """rclone 전송 계층 (rcd 데몬, 사용할 수 없으면 하위 프로세스 방식)"""
+        with self.transport_lock:
+            if self.transport is None:
+                self.transport = open_transport(config.SERVER_DIR)
+                self.log(f"rclone 전송 방식: {self.transport.name}")
+            return self.transport
+    
+    def reset_transport(self):
+        """rclone 설정이 바뀐 경우 데몬을 다시 시작하도록 초기화"""
+        with self.transport_lock:
+            if self.transport is not None:
+                self.transport.close()
+                self.transport = None
     
     def check_initial_status(self):
         """초기 상태 확인"""
         def check_status():
             # rclone 설치 확인
             try:
-                result = subprocess.run(['rclone', 'version'], capture_output=True, text=True)
-                if result.returncode == 0:
-                    self.status_vars['rclone'].set("✓ 설치됨")
-                else:
-                    self.status_vars['rclone'].set("❌ 설치 안됨")
-            except FileNotFoundError:
+                transport = self.get_transport()
+                transport.version()
+                self.status_vars['rclone'].set("✓ 설치됨")
+            except RcloneError:
                 self.status_vars['rclone'].set("❌ 설치 안됨")
+                self.status_vars['google_drive'].set("❌ 연결 안됨")
+                transport = None
             
             # Google Drive 연결 확인
-            try:
-                result = subprocess.run(['rclone', 'listremotes'], capture_output=True, text=True)
-                if result.returncode == 0 and 'googledrive:' in result.stdout:
-                    self.status_vars['google_drive'].set("✓ 연결됨")
-                else:
+            if transport is not None:
+                try:
+                    if 'googledrive:' in transport.listremotes():
+                        self.status_vars['google_drive'].set("✓ 연결됨")
+                    else:
+                        self.status_vars['google_drive'].set("❌ 연결 안됨")
+                except RcloneError:
                     self.status_vars['google_drive'].set("❌ 연결 안됨")
-            except:
-                self.status_vars['google_drive'].set("❌ 연결 안됨")
             
             # yuniserver 폴더 확인
             if os.path.exists('yuniserver'):
@@ -269,14 +457,13 @@ class YuniServerGUI:
     
     def run_setup(self):
         """초기 설정 실행"""
-        if self.is_running:
+        if self.is_running or self.engine.busy():
             messagebox.showwarning("경고", "다른 작업이 진행 중입니다.")
             return
         
         # rclone이 이미 설정되어 있는지 확인
         try:
-            result = subprocess.run(['rclone', 'listremotes'], capture_output=True, text=True)
-            if result.returncode == 0 and 'googledrive:' in result.stdout:
+            if 'googledrive:' in self.get_transport().listremotes():
                 if messagebox.askyesno("확인", "Google Drive가 이미 설정되어 있습니다. 다시 설정하시겠습니까?"):
                     pass  # 계속 진행
                 else:
@@ -300,11 +487,13 @@ class YuniServerGUI:
         self.progress_var.set(0)
         
         def setup():
+            self.begin_trace()
             try:
                 # rclone 설치 확인
                 self.log("rclone 설치 확인 중...")
                 try:
-                    result = subprocess.run(['rclone', 'version'], capture_output=True, text=True)
+                    with trace.span("setup.rclone-check"):
+                        result = subprocess.run(['rclone', 'version'], capture_output=True, text=True)
                     if result.returncode != 0:
                         raise FileNotFoundError
                     self.log("✓ rclone이 이미 설치되어 있습니다.")
@@ -317,7 +506,8 @@ class YuniServerGUI:
                         'powershell', '-Command',
                         'iwr https://rclone.org/install.ps1 -useb | iex'
                     ]
-                    result = subprocess.run(install_cmd, capture_output=True, text=True)
+                    with trace.span("setup.rclone-install"):
+                        result = subprocess.run(install_cmd, capture_output=True, text=True)
                     
                     if result.returncode != 0:
                         self.log("❌ rclone 자동 설치 실패")
@@ -346,14 +536,17 @@ class YuniServerGUI:
                 self.log("✓ rclone 설정 파일 생성 완료")
                 self.progress_var.set(70)
                 
+                # 새 설정을 읽도록 데몬 재시작
+                self.reset_transport()
+                transport = self.get_transport()
+                
                 # Google Drive 연결 테스트
                 self.log("Google Drive 연결 테스트 중...")
-                result = subprocess.run(['rclone', 'lsf', 'googledrive:'], 
-                                      capture_output=True, text=True, timeout=30)
-                
-                if result.returncode == 0:
+                try:
+                    with trace.span("setup.connect"):
+                        transport.list('googledrive:')
                     self.log("✓ Google Drive 접근 권한 확인 완료")
-                else:
+                except RcloneError:
                     self.log("⚠️ Google Drive 접근 권한을 확인하세요.")
                     self.log("Service Account 이메일을 Google Drive 폴더에 편집자로 추가했는지 확인하세요.")
                 
@@ -368,8 +561,10 @@ class YuniServerGUI:
                     self.log("✓ yuniserver 폴더가 이미 존재합니다.")
                 
                 # Google Drive에 yuniserver 폴더 생성
-                subprocess.run(['rclone', 'mkdir', 'googledrive:yuniserver'], 
-                             capture_output=True)
+                try:
+                    transport.mkdir(config.REMOTE)
+                except RcloneError:
+                    pass
                 self.log("✓ Google Drive 폴더 확인 완료")
                 
                 self.progress_var.set(100)
@@ -381,116 +576,165 @@ class YuniServerGUI:
                 self.log(f"설정 중 오류: {str(e)}")
                 self.progress_text.set("설정 오류")
             finally:
+                self.end_trace()
                 self.is_running = False
         
         threading.Thread(target=setup, daemon=True).start()
     
-    def start_upload(self):
-        """업로드 시작"""
+    def job_transport(self):
+        """작업마다 쓸 전송 계층 (공유 rcd 데몬이 있으면 작업별로 연결해 작업 하나만 취소할 수 있음)"""
+        transport = self.get_transport()
+        if transport.name == "rcd":
+            return DaemonTransport(transport.daemon)
+        return SubprocessTransport(Rclone())
+    
+    def submit_job(self, kind, label, **options):
+        """작업 큐에 추가. 겹치지 않는 작업은 동시에 실행된다."""
         if self.is_running:
-            messagebox.showwarning("경고", "다른 작업이 진행 중입니다.")
+            messagebox.showwarning("경고", "초기 설정이 진행 중입니다.")
+            return None
+        if not self.engine.busy():
+            self.begin_trace()
+        job = self.engine.submit(kind, config.SERVER_DIR, config.REMOTE, **options)
+        self.log(f"{label} 작업 추가 (#{job.id})")
+        return job
+    
+    def on_job_change(self, job):
+        """작업 상태/진행률 변경 (작업 스레드에서 호출, 화면 반영은 메인 루프에서)"""
+        self.call_in_ui(lambda: self.show_job(job))
+    
+    def show_job(self, job):
+        """작업 목록과 진행률 표시 갱신"""
+        if job.state == RUNNING and job.progress is not None:
+            detail = job.progress.format()
+        else:
+            detail = job.error or ""
+        values = (KINDS[job.kind][0], STATE_NAMES[job.state], detail)
+        iid = str(job.id)
+        if self.job_tree.exists(iid):
+            self.job_tree.item(iid, values=values)
+        else:
+            self.job_tree.insert("", tk.END, iid=iid, text=f"#{job.id}", values=values)
+        if not job.active and iid not in self.reported_jobs:
+            self.reported_jobs.add(iid)
+            self.report_job(job)
+        
+        jobs = self.engine.jobs()
+        running = [j for j in jobs if j.state == RUNNING]
+        queued = sum(1 for j in jobs if j.state == QUEUED)
+        if running:
+            self.progress_var.set(sum(j.progress.percent if j.progress else 0 for j in running) / len(running))
+            self.progress_text.set(f"실행 중 {len(running)}개, 대기 {queued}개")
+        elif not queued and not job.active:
+            self.progress_var.set(100 if job.state == DONE else 0)
+            self.progress_text.set(f"#{job.id} {KINDS[job.kind][0]} {STATE_NAMES[job.state]}")
+            self.end_trace()
+    
+    def report_job(self, job):
+        """끝난 작업의 통계/결과를 로그에 기록"""
+        p = job.progress
+        if p is not None:
+            self.log(f"#{job.id} 통계: 파일 {p.files}개, {p.bytes / 1024 / 1024:.1f} MB, "
+                     f"{p.bytes_per_sec / 1024 / 1024:.2f} MB/s, {p.files_per_sec:.1f}개/s, "
+                     f"오류 {p.errors}개, {p.elapsed:.0f}초")
+        for problem in job.problems[:20]:
+            self.log(f"❌ {problem}")
+        if job.state == DONE:
+            self.log(f"✓ {job.label} 완료")
+        elif job.state == CANCELLED:
+            self.log(f"⚠️ {job.label} 취소됨")
+        else:
+            self.log(f"❌ {job.label} 실패: {job.error}")
+        if job.state != DONE and job.kind in ("upload", "download"):
+            self.log("⚠️ 끝난 파일을 기록했습니다. '이어하기'로 남은 파일만 전송할 수 있습니다.")
+        if job.writes_local:
+            self.check_initial_status()
+    
+    def begin_trace(self):
+        """YUNISYNC_TRACE가 설정되어 있으면 이번 작업의 단계별 시간 기록 시작"""
+        if trace.default_trace_path():
+            trace.enable()
+    
+    def end_trace(self):
+        """단계별 요약을 로그에 남기고 추적 파일에 추가"""
+        path = trace.default_trace_path()
+        if not path or not trace.enabled():
             return
-        
+        trace.disable()
+        self.log("단계별 소요 시간:")
+        for line in trace.summary():
+            self.log(f"  {line}")
+        try:
+            trace.write_trace(path)
+            self.log(f"추적 기록: {path}")
+        except OSError as e:
+            self.log(f"⚠️ 추적 기록 실패: {e}")
+    
+    def cancel_job(self):
+        """선택한 작업 취소 (선택이 없으면 모든 작업)"""
+        if not self.engine.busy():
+            return
+        selected = [int(iid) for iid in self.job_tree.selection()]
+        if selected:
+            message = f"선택한 작업 {len(selected)}개를 취소하시겠습니까?"
+        else:
+            message = "진행 중인 모든 작업을 취소하시겠습니까?"
+        if messagebox.askyesno("확인", message):
+            self.log("작업 취소 요청...")
+            for job_id in selected or [None]:
+                self.engine.cancel(job_id)
+    
+    def start_upload(self):
+        """업로드 작업 추가"""
         if not os.path.exists('yuniserver'):
             messagebox.showerror("오류", "yuniserver 폴더가 존재하지 않습니다.")
             return
-        
-        self.log("업로드 시작...")
-        self.is_running = True
-        self.progress_text.set("업로드 중...")
-        self.progress_var.set(0)
-        
-        def upload():
-            try:
-                # upload.bat 실행
-                process = subprocess.Popen(['upload.bat'], 
-                                         stdout=subprocess.PIPE, 
-                                         stderr=subprocess.STDOUT,
-                                         text=True,
-                                         cwd='.')
-                
-                if process.stdout:
-                    for line in iter(process.stdout.readline, ''):
-                        if line:
-                            self.log(line.strip())
-                            # 진행률 파싱 (간단한 버전)
-                            if "%" in line:
-                                try:
-                                    percent = float(line.split("%")[0].split()[-1])
-                                    self.progress_var.set(percent)
-                                except:
-                                    pass
-                    
-                    process.stdout.close()
-                return_code = process.wait()
-                
-                if return_code == 0:
-                    self.log("업로드 완료")
-                    self.progress_text.set("업로드 완료")
-                    self.progress_var.set(100)
-                else:
-                    self.log("업로드 실패")
-                    self.progress_text.set("업로드 실패")
-                    
-            except Exception as e:
-                self.log(f"업로드 중 오류: {str(e)}")
-                self.progress_text.set("업로드 오류")
-            finally:
-                self.is_running = False
-        
-        threading.Thread(target=upload, daemon=True).start()
+        self.submit_job("upload", "업로드")
     
     def start_download(self):
-        """다운로드 시작"""
+        """다운로드 작업 추가"""
+        backup = False
+        if os.path.exists('yuniserver'):
+            answer = messagebox.askyesnocancel(
+                "확인", "기존 yuniserver 폴더가 존재합니다.\n백업 후 다운로드하시겠습니까?\n"
+                        "(아니오: 백업 없이 변경된 파일만 덮어쓰기)")
+            if answer is None:
+                return
+            backup = answer
+        self.submit_job("download", "다운로드", backup=backup)
+    
+    def open_restore(self):
+        """원격 트리를 보고 일부 파일/폴더만 복원"""
         if self.is_running:
             messagebox.showwarning("경고", "다른 작업이 진행 중입니다.")
             return
-        
-        self.log("다운로드 시작...")
-        self.is_running = True
-        self.progress_text.set("다운로드 중...")
-        self.progress_var.set(0)
-        
-        def download():
-            try:
-                # download.bat 실행
-                process = subprocess.Popen(['download.bat'], 
-                                         stdout=subprocess.PIPE, 
-                                         stderr=subprocess.STDOUT,
-                                         text=True,
-                                         cwd='.')
-                
-                if process.stdout:
-                    for line in iter(process.stdout.readline, ''):
-                        if line:
-                            self.log(line.strip())
-                            # 진행률 파싱 (간단한 버전)
-                            if "%" in line:
-                                try:
-                                    percent = float(line.split("%")[0].split()[-1])
-                                    self.progress_var.set(percent)
-                                except:
-                                    pass
-                    
-                    process.stdout.close()
-                return_code = process.wait()
-                
-                if return_code == 0:
-                    self.log("다운로드 완료")
-                    self.progress_text.set("다운로드 완료")
-                    self.progress_var.set(100)
-                    self.check_initial_status()
-                else:
-                    self.log("다운로드 실패")
-                    self.progress_text.set("다운로드 실패")
-                    
-            except Exception as e:
-                self.log(f"다운로드 중 오류: {str(e)}")
-                self.progress_text.set("다운로드 오류")
-            finally:
-                self.is_running = False
-        
-        threading.Thread(target=download, daemon=True).start()
+        RestoreDialog(self)
+    
+    def start_restore(self, patterns):
+        """선택한 경로만 복원 (작업을 추가했으면 True)"""
+        self.log(f"선택 복원: {', '.join(patterns[:5])}" + (f" 외 {len(patterns) - 5}개" if len(patterns) > 5 else ""))
+        return self.submit_job("restore", "선택 복원", patterns=patterns) is not None
+    
+    def start_resume(self):
+        """끊긴 업로드/다운로드를 작업 기록에서 이어서 실행"""
+        journals = pending(config.SERVER_DIR, config.REMOTE)
+        if not journals:
+            messagebox.showinfo("알림", "이어서 할 작업이 없습니다.")
+            return
+        for journal in journals:
+            self.log(f"이어하기: {journal.describe()}")
+        self.submit_job("resume", "이어하기")
+    
+    def on_close(self):
+        """창 닫기 (작업 취소, rclone 데몬 정리)"""
+        busy = self.is_running or self.engine.busy()
+        if busy and not messagebox.askyesno("확인", "작업이 진행 중입니다. 종료하시겠습니까?"):
+            return
+        self.engine.stop()
+        self.reset_transport()
+        console.set_sink(None)
+        self.log_sink.close()
+        self.root.destroy()
     
     def run(self):
         """프로그램 실행"""
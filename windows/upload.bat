@@ -39,8 +39,45 @@ echo 📤 업로드 시작...
 echo 시작 시간: %time%
 echo.
 
-REM rclone sync 명령 실행 (진행률 표시)
-rclone sync yuniserver googledrive:yuniserver --progress --stats=1s --transfers=4 --checkers=8
+if /i "%~1"=="--incremental" (
+    REM 변경된 파일만 전송 (원격 목록 조회/비교 생략)
+    echo 📤 증분 업로드 실행 중...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync upload --source yuniserver --remote googledrive:yuniserver %2
+) else if /i "%~1"=="--snapshot" (
+    REM 내용 기반 청크로 나눠 원격에 없는 청크만 전송
+    echo 📤 청크 스냅샷 업로드 실행 중...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync snapshot-push --source yuniserver --remote googledrive:yuniserver
+) else if /i "%~1"=="--pack" (
+    REM 작은 파일은 압축 묶음으로, 큰 파일은 rclone sync로 전송
+    echo 📤 묶음 업로드 실행 중...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync pack-push --source yuniserver --remote googledrive:yuniserver
+) else if /i "%~1"=="--auto-tune" (
+    REM 파일 크기 분포와 이전 측정값으로 동시성을 정해 작은/큰 파일을 나눠 전송
+    echo 📤 자동 조정 업로드 실행 중...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync sync up --auto-tune --source yuniserver --remote googledrive:yuniserver
+) else if /i "%~1"=="--throttle" (
+    REM 서버 틱 시간(YUNISYNC_TICK_COMMAND)과 시간대 일정(YUNISYNC_BWLIMIT_SCHEDULE)에 맞춰 대역폭 조절
+    echo 📤 부하 조절 업로드 실행 중...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync sync up --throttle --source yuniserver --remote googledrive:yuniserver
+) else if /i "%~1"=="--resume" (
+    REM 끊긴 업로드를 작업 기록에서 이어서 실행 (남은 파일만 전송)
+    echo 📤 중단된 업로드 이어하기...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync resume --direction up --source yuniserver --remote googledrive:yuniserver
+) else if /i "%~1"=="--watch" (
+    REM 바뀐 파일을 묶어 계속 전송 (Ctrl+C로 종료하면 남은 변경을 올리고 끝냄)
+    echo 📤 감시 모드 실행 중...
+    set PYTHONPATH=%~dp0..
+    python -m yunisync watch --source yuniserver --remote googledrive:yuniserver
+) else (
+    REM rclone sync 명령 실행 (진행률 표시)
+    rclone sync yuniserver googledrive:yuniserver --progress --stats=1s --transfers=4 --checkers=8 --exclude "/.yunisync/**"
+)
 
 if %errorLevel% neq 0 (
     echo ❌ 업로드 실패
@@ -48,6 +85,12 @@ if %errorLevel% neq 0 (
     exit /b 1
 )
 
+if "%~1"=="" (
+    REM 다운로드 쪽 사전 확인/검증에 쓸 원격 매니페스트 갱신 (python이 없으면 이전 매니페스트 삭제)
+    set PYTHONPATH=%~dp0..
+    python -m yunisync publish --source yuniserver --remote googledrive:yuniserver 2>nul || rclone deletefile googledrive:yuniserver/.yunisync/manifest.json.gz 2>nul
+)
+
 echo.
 echo ✓ 업로드 완료!
 echo 완료 시간: %time%
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""
+YuniServer 동기화 엔진
+upload/download 스크립트와 GUI 도구가 공통으로 사용하는 Python 모듈
+"""
+
+__version__ = "1.1.0"
@@ -0,0 +1,7 @@
+import sys
+
+from .cli import main
+
+# 작업 프로세스(spawn 방식)가 이 모듈을 다시 불러올 때 main이 실행되지 않도록
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+"""
+공유 블록 백업
+yuniserver 폴더를 reflink(블록 공유 복사)로 복제해 백업한다. (지원하지 않는 파일시스템은 일반 복사)
+바뀌지 않은 파일은 디스크 공간을 공유하므로 백업 비용이 변경량에 비례한다.
+
+하드링크는 직접 지정할 때만 사용한다. 백업과 원본이 같은 inode를 쓰므로 복원 뒤 게임 서버가
+지역/SQLite/jar 파일을 제자리에서 고치거나 권한을 바꾸면 백업도 함께 바뀐다.
+"""
+
+import os
+import re
+import shutil
+import time
+
+from . import config, console, trace
+
+# Linux FICLONE ioctl (btrfs, xfs 등에서 블록 공유 복사)
+FICLONE = 0x40049409
+
+BACKUP_PREFIX = f"{config.SERVER_DIR}_backup_"
+
+
+def backup_name():
+    return BACKUP_PREFIX + time.strftime("%Y%m%d_%H%M%S")
+
+
+def reflink(src, dst):
+    import fcntl
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+    shutil.copystat(src, dst)
+
+
+def hardlink(src, dst):
+    os.link(src, dst)
+
+
+def copy(src, dst):
+    shutil.copy2(src, dst)
+
+
+METHODS = {"reflink": reflink, "hardlink": hardlink, "copy": copy}
+
+
+class CloneStats:
+    def __init__(self):
+        self.files = 0
+        self.method = None
+        self.seconds = 0.0
+
+
+def clone_tree(src, dst, mode="auto"):
+    """src를 dst로 복제. mode: auto(reflink -> copy 순서로 시도), reflink, hardlink, copy
+    심볼릭 링크는 파일/폴더 모두 링크 그대로 복제한다. (os.walk는 폴더 링크를 dirnames에 넣고 따라가지 않음)"""
+    started = time.time()
+    candidates = ["reflink", "copy"] if mode == "auto" else [mode]
+    stats = CloneStats()
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel = os.path.relpath(dirpath, src)
+        target_dir = dst if rel == "." else os.path.join(dst, rel)
+        os.makedirs(target_dir, exist_ok=True)
+        for name in dirnames:
+            s = os.path.join(dirpath, name)
+            if os.path.islink(s):
+                os.symlink(os.readlink(s), os.path.join(target_dir, name))
+        for name in filenames:
+            s = os.path.join(dirpath, name)
+            d = os.path.join(target_dir, name)
+            if os.path.islink(s):
+                os.symlink(os.readlink(s), d)
+                continue
+            while True:
+                method = stats.method or candidates[0]
+                try:
+                    METHODS[method](s, d)
+                    stats.method = method
+                    break
+                except (OSError, ImportError):
+                    # 첫 파일에서 지원되지 않는 방식이면 다음 방식으로 전환
+                    if stats.method is not None or method == candidates[-1]:
+                        raise
+                    if os.path.exists(d):
+                        os.remove(d)
+                    candidates.remove(method)
+            stats.files += 1
+    for dirpath, dirnames, filenames in os.walk(src):
+        rel = os.path.relpath(dirpath, src)
+        target_dir = dst if rel == "." else os.path.join(dst, rel)
+        shutil.copystat(dirpath, target_dir)
+    stats.seconds = time.time() - started
+    return stats
+
+
+def list_backups(parent="."):
+    pattern = re.compile(re.escape(BACKUP_PREFIX) + r"\d{8}_\d{6}$")
+    names = [n for n in os.listdir(parent) if pattern.match(n) and os.path.isdir(os.path.join(parent, n))]
+    return sorted(names)
+
+
+def rotate(parent=".", keep=3):
+    """최근 keep개 백업만 남기고 삭제. 삭제한 폴더 이름 목록 반환"""
+    names = list_backups(parent)
+    removed = names[:-keep] if keep > 0 else names
+    for name in removed:
+        shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+    return removed
+
+
+def rclone_replaces_files(rclone):
+    """rclone이 로컬 파일을 임시 파일 + 이름 변경으로 쓰는지 (1.63 이상) 확인"""
+    try:
+        match = re.search(r"v(\d+)\.(\d+)", rclone.version())
+    except Exception:
+        return False
+    return bool(match) and (int(match.group(1)), int(match.group(2))) >= (1, 63)
+
+
+def make_backup(source=config.SERVER_DIR, keep=3, mode="auto", rclone=None):
+    """source를 공유 블록 백업으로 복제하고 오래된 백업을 정리. 백업 폴더 경로 반환"""
+    if mode == "hardlink":
+        if rclone is not None and not rclone_replaces_files(rclone):
+            # 오래된 rclone은 파일을 제자리에서 덮어써 하드링크 백업까지 바뀌므로 사용하지 않음
+            console.warning("rclone 1.63 미만에서는 하드링크 백업을 사용하지 않고 일반 복사로 백업합니다.")
+            mode = "copy"
+        else:
+            console.warning("하드링크 백업은 원본과 파일을 공유합니다. 복원 뒤 서버가 파일을 제자리에서 고치거나 "
+                            "권한을 바꾸면 백업도 함께 바뀝니다.")
+    parent = os.path.dirname(os.path.abspath(source))
+    target = os.path.join(parent, backup_name())
+    with trace.span("backup.clone") as span:
+        stats = clone_tree(source, target, mode)
+        span.set(files=stats.files)
+    console.success(f"백업 완료: {os.path.basename(target)} "
+                    f"({stats.method or '빈 폴더'}, 파일 {stats.files}개, {stats.seconds:.1f}초)")
+    removed = rotate(parent, keep)
+    if removed:
+        console.info(f"오래된 백업 삭제: {', '.join(removed)}")
+    return target
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+내용 기반 청크 분할 (content-defined chunking)
+파일 내용의 고정 바이트 패턴(anchor)을 경계로 사용하므로, 파일 일부가 바뀌거나
+앞쪽에 데이터가 삽입되어도 바뀐 부분 주변의 청크만 달라진다.
+경계 탐색은 bytes.find로 처리해 순수 Python에서도 디스크 속도에 가깝게 동작한다.
+"""
+
+import hashlib
+
+# 청크 크기 범위. Google Drive는 파일당 비용이 크므로 평균 1MB 이상을 목표로 한다.
+# MIN_SIZE 이후 처음 나오는 ANCHOR에서 자르며, 무작위 데이터 기준 평균 약 MIN_SIZE + 64KB.
+MIN_SIZE = 1024 * 1024
+MAX_SIZE = 8 * 1024 * 1024
+ANCHOR = b"\x8e\x51"
+
+READ_SIZE = 16 * 1024 * 1024
+
+
+def chunk_id(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_path(cid):
+    """청크 저장 경로 (앞 2글자로 폴더 분산)"""
+    return f"{cid[:2]}/{cid}"
+
+
+def iter_chunks(f):
+    """파일 객체를 읽어 청크(bytes)를 순서대로 반환"""
+    buf = b""
+    eof = False
+    while not eof:
+        data = f.read(READ_SIZE)
+        eof = not data
+        buf += data
+        pos = 0
+        while pos < len(buf):
+            remaining = len(buf) - pos
+            if remaining < MAX_SIZE and not eof:
+                break
+            if remaining <= MIN_SIZE:
+                end = len(buf)
+            else:
+                i = buf.find(ANCHOR, pos + MIN_SIZE, pos + MAX_SIZE)
+                end = i + len(ANCHOR) if i >= 0 else min(pos + MAX_SIZE, len(buf))
+            yield buf[pos:end]
+            pos = end
+        buf = buf[pos:]
+
+
+def split_file(path):
+    """파일을 청크로 나눠 (청크 ID, 데이터)를 순서대로 반환"""
+    with open(path, "rb") as f:
+        for data in iter_chunks(f):
+            yield chunk_id(data), data
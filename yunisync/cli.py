@@ -0,0 +1,671 @@
+# -*- coding: utf-8 -*-
+"""
+명령줄 진입점
+사용법: python3 -m yunisync <명령> [옵션]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from . import config, console, trace
+from .progress import ConsoleProgress, ProgressTracker, default_metrics_path
+from .journal import Journal
+from .rclone import Rclone, RcloneError, exclude_flags, transfer_flags
+from .scheduler import from_env
+
+
+def report_trace(path):
+    """단계별 요약 표 출력 후 추적 파일 저장"""
+    console.info("단계별 소요 시간:")
+    for line in trace.summary():
+        print(f"  {line}")
+    trace.write_trace(path)
+    console.info(f"추적 기록: {path} (chrome://tracing 또는 ui.perfetto.dev에서 열기)")
+
+
+def cmd_scan(args):
+    from .upload import refresh_manifest
+    manifest = refresh_manifest(args.source)
+    console.success(f"파일 {len(manifest)}개, {manifest.total_bytes / 1024 / 1024:.1f} MB")
+    return 0
+
+
+def cmd_upload(args):
+    if args.mirror:
+        return cmd_fanout(args)
+    from .upload import incremental_upload
+    changed, deleted = incremental_upload(args.rclone, args.source, args.remote,
+                                          full=args.full, dry_run=args.dry_run, read_root=args.read_root)
+    if not args.dry_run:
+        console.success(f"업로드 완료 (전송 {changed}개, 삭제 {deleted}개)")
+    return 0
+
+
+def cmd_fanout(args):
+    from .fanout import Target, fanout_upload
+    targets = [Target(args.remote)] + [Target.parse(text) for text in args.mirror]
+    try:
+        failed = fanout_upload(targets, args.source, full=args.full, dry_run=args.dry_run,
+                               binary=args.rclone.binary, extra_args=args.rclone.extra_args,
+                               metrics_path=args.metrics, on_update=ConsoleProgress(),
+                               make_scheduler=lambda: from_env(args.throttle, args.schedule, args.max_tick,
+                                                               args.tick_command),
+                               read_root=args.read_root, transport=args.rclone.transport)
+    except ValueError as e:
+        console.error(str(e))
+        return 2
+    if args.dry_run:
+        return 0
+    for target in targets:
+        if target.error is None:
+            console.success(target.describe())
+        else:
+            console.error(target.describe())
+    if failed:
+        console.error(f"원격 {len(targets)}곳 중 {len(failed)}곳 실패. 다시 실행하면 실패한 원격만 보냅니다.")
+        return 1
+    console.success(f"업로드 완료 (원격 {len(targets)}곳)")
+    return 0
+
+
+def report_problems(problems, limit=50):
+    for problem in problems[:limit]:
+        console.error(problem)
+    if len(problems) > limit:
+        console.error(f"... 외 {len(problems) - limit}개")
+
+
+def cmd_download(args):
+    from .manifest import fetch_remote
+    from .pipeline import check_tree, stream_download
+    remote_manifest = fetch_remote(args.rclone, args.remote)
+    if remote_manifest is not None and remote_manifest.layout != "files":
+        return download_layout(args, remote_manifest)
+    expected = None
+    if remote_manifest is None:
+        console.warning("원격 매니페스트가 없어 받은 파일의 해시 검증을 생략합니다.")
+    elif args.verify:
+        # 받는 중에는 권한만 처리하고, 끝난 뒤 트리 전체를 병렬로 검증
+        console.info(f"다운로드 후 전체 트리를 검증합니다. (파일 {len(remote_manifest)}개)")
+    elif remote_manifest.layout == "files":
+        console.info(f"원격 매니페스트로 검증합니다. (파일 {len(remote_manifest)}개)")
+        expected = remote_manifest.entries
+    journal = Journal.open(args.source, "sync-down", args.remote, root=args.source)
+    try:
+        applied, mismatches = stream_download(args.rclone, args.remote, args.source, expected, journal=journal)
+    except BaseException:
+        journal.close()
+        raise
+    journal.finish()
+    if expected is not None:
+        mismatches += check_tree(args.source, remote_manifest)
+    if args.verify and remote_manifest is not None:
+        from .verify import verify
+        problems, stats = verify(args.rclone, args.source, args.remote, workers=args.workers,
+                                 expected=remote_manifest)
+        mismatches += problems
+    report_problems(mismatches)
+    if mismatches:
+        return 1
+    console.success(f"다운로드 및 후처리 완료 (파일 {applied}개)")
+    return 0
+
+
+def download_layout(args, remote_manifest):
+    """청크 스냅샷/묶음 원격 받기. 데이터가 .yunisync/ 아래에 있어 일반 sync로 받으면
+    로컬 트리가 지워지거나 옛 파일이 남으므로 올린 방식 그대로 받는다."""
+    layout = remote_manifest.layout
+    if layout not in ("snapshot", "pack"):
+        console.error(f"알 수 없는 업로드 방식입니다: {layout}")
+        return 1
+    console.info(f"원격이 {layout} 방식으로 업로드되어 있어 같은 방식으로 받습니다.")
+    try:
+        if layout == "snapshot":
+            from .snapshot import pull
+            pull(args.rclone, args.source, args.remote)
+        else:
+            from .packs import pull
+            pull(args.rclone, args.source, args.remote, workers=args.workers)
+    except (ValueError, RuntimeError) as e:
+        console.error(str(e))
+        return 1
+    if args.verify:
+        from .verify import verify
+        problems, stats = verify(args.rclone, args.source, args.remote, workers=args.workers,
+                                 expected=remote_manifest)
+        report_problems(problems)
+        if problems:
+            return 1
+    console.success("다운로드 완료")
+    return 0
+
+
+def cmd_resume(args):
+    from .journal import pending, resume
+    journals = pending(args.source, None if args.all else args.remote, args.direction)
+    if not journals:
+        console.info("이어서 할 작업이 없습니다.")
+        return 0
+    if args.list:
+        for journal in journals:
+            print(journal.describe())
+        return 0
+    problems = []
+    for journal in journals:
+        problems += resume(args.rclone, journal, args.source)
+    report_problems(problems)
+    if problems:
+        return 1
+    console.success("이어서 실행 완료")
+    return 0
+
+
+def cmd_verify(args):
+    from .verify import verify
+    try:
+        problems, stats = verify(args.rclone, args.source, args.remote, workers=args.workers, rehash=args.rehash)
+    except ValueError as e:
+        console.error(str(e))
+        return 2
+    report_problems(problems)
+    if problems:
+        console.error(f"검증 실패: 문제 {len(problems)}개")
+        return 1
+    console.success(f"검증 완료: 파일 {stats.files}개 모두 원격 기록과 일치")
+    return 0
+
+
+def cmd_restore(args):
+    from .restore import restore
+    try:
+        matched, problems = restore(args.rclone, args.source, args.remote, args.patterns,
+                                    snapshot=args.snapshot, dry_run=args.dry_run, workers=args.workers)
+    except ValueError as e:
+        console.error(str(e))
+        return 1
+    report_problems(problems)
+    if problems:
+        return 1
+    if not args.dry_run:
+        console.success(f"선택 복원 완료 (파일 {len(matched)}개)" if matched else "선택 복원 완료")
+    return 0
+
+
+def cmd_publish(args):
+    from .manifest import publish
+    from .upload import refresh_manifest
+    manifest = publish(args.rclone, refresh_manifest(args.source), args.remote)
+    console.success(f"원격 매니페스트 기록 (파일 {len(manifest)}개, {manifest.total_bytes / 1024 / 1024:.1f} MB)")
+    return 0
+
+
+def cmd_remote_info(args):
+    from .manifest import fetch_remote
+    manifest = fetch_remote(args.rclone, args.remote)
+    if manifest is None:
+        console.warning("원격 매니페스트가 없습니다.")
+        return 2
+    created = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(manifest.created_ns / 1e9))
+    console.info(f"파일 개수: {len(manifest)}개")
+    console.info(f"전체 크기: {manifest.total_bytes / 1024 / 1024:.1f} MB")
+    console.info(f"업로드 시각: {created} (방식: {manifest.layout})")
+    if args.list:
+        recent = sorted(manifest.entries, key=lambda path: manifest.entries[path][1], reverse=True)
+        console.info(f"최근 파일 목록 (최대 {args.list}개):")
+        for path in recent[:args.list]:
+            print(f"  - {path}")
+    return 0
+
+
+def sync_ends(args):
+    """방향에 맞는 (원본, 대상, 제외 옵션)"""
+    if args.direction == "up":
+        return args.read_root, args.remote, exclude_flags()
+    return args.remote, args.source, [f"--exclude=/{config.META_DIR}/**"]
+
+
+def size_profile(args):
+    from .tuning import local_profile, remote_profile
+    if args.direction == "up":
+        return local_profile(args.source)
+    return remote_profile(args.rclone, args.remote)
+
+
+def cmd_sync(args):
+    from .manifest import publish
+    from .upload import refresh_manifest
+    src, dst, excludes = sync_ends(args)
+    # 업로드는 전송 전에 스캔해 둔 상태를 원격 매니페스트로 기록
+    manifest = refresh_manifest(args.source, args.read_root) if args.direction == "up" else None
+    # 끊기면 yunisync resume으로 남은 파일만 이어서 전송 (시점 고정이어도 기록은 원래 폴더 기준)
+    root = args.read_root if args.direction == "up" else args.source
+    journal = Journal.open(args.source, f"sync-{args.direction}", args.remote, root=root)
+    try:
+        if args.auto_tune:
+            from .tuning import TuningStore, auto_sync
+            store = TuningStore(args.source, args.remote, args.direction)
+            auto_sync(args.rclone, src, dst, excludes, size_profile(args), store, on_event=journal.on_event)
+        else:
+            args.rclone.transfer("sync", src, dst, transfer_flags() + excludes, on_event=journal.on_event)
+    except BaseException:
+        journal.close()
+        raise
+    if manifest is not None:
+        publish(args.rclone, manifest, args.remote)
+    journal.finish()
+    console.success("동기화 완료")
+    return 0
+
+
+def cmd_tune(args):
+    from .tuning import TuningStore, plan
+    store = TuningStore(args.source, args.remote, args.direction)
+    if args.reset:
+        store.reset()
+        console.success("학습한 설정을 지웠습니다.")
+        return 0
+    profile = size_profile(args)
+    console.info(profile.describe())
+    for p in plan(profile, store):
+        record = store.get(p.kind)
+        history = ""
+        if record:
+            history = f" (최고 기록: transfers={record['best']['transfers']})"
+        console.info(f"[{p.kind}] 다음 실행: {p.describe()}{history}")
+    return 0
+
+
+def cmd_freeze(args):
+    from .freeze import freeze
+    target, pause = freeze(args.source, args.pre_hook, args.post_hook)
+    print(target)
+    return 0
+
+
+def cmd_backup(args):
+    from .backup import make_backup
+    if args.keep < 1:
+        # 0 이하면 방금 만든 백업까지 모두 삭제됨
+        console.error("--keep은 1 이상이어야 합니다.")
+        return 2
+    if not os.path.isdir(args.source):
+        console.error(f"{args.source} 폴더가 존재하지 않습니다.")
+        return 1
+    make_backup(args.source, keep=args.keep, mode=args.mode, rclone=args.rclone)
+    return 0
+
+
+def cmd_daemon(args):
+    from .rcd import RcloneDaemon, daemon_info_path, start_shared_daemon, stop_shared_daemon
+    if args.action == "start":
+        daemon = start_shared_daemon(args.source)
+        console.success(f"rclone rcd 실행 중: {daemon.addr} (PID {daemon.pid})")
+    elif args.action == "stop":
+        if stop_shared_daemon(args.source):
+            console.success("rclone rcd를 종료했습니다.")
+        else:
+            console.info("실행 중인 rclone rcd가 없습니다.")
+    else:
+        daemon = RcloneDaemon.connect(daemon_info_path(args.source))
+        if daemon is None:
+            console.info("실행 중인 rclone rcd가 없습니다.")
+            return 1
+        console.success(f"rclone rcd 실행 중: {daemon.addr} (PID {daemon.pid})")
+    return 0
+
+
+def cmd_status(args):
+    from .rcd import open_transport
+    transport = open_transport(args.source, start=False)
+    try:
+        console.info(f"전송 방식: {transport.name}")
+        console.success(f"rclone 버전: {transport.version()}")
+        remote_name = args.remote.split(":", 1)[0] + ":" if ":" in args.remote else None
+        if remote_name and remote_name not in transport.listremotes():
+            console.error(f"{remote_name} 원격이 설정되지 않았습니다.")
+            return 1
+        entries = transport.list(args.remote)
+        console.success(f"{args.remote}: 항목 {len(entries)}개")
+    finally:
+        transport.close()
+    return 0
+
+
+def cmd_snapshot_push(args):
+    from .snapshot import push
+    push(args.rclone, args.source, args.remote, rescan=args.rescan, read_root=args.read_root)
+    return 0
+
+
+def cmd_snapshot_pull(args):
+    from .snapshot import pull
+    try:
+        pull(args.rclone, args.source, args.remote, name=args.name)
+    except ValueError as e:
+        console.error(str(e))
+        return 1
+    return 0
+
+
+def cmd_snapshot_list(args):
+    from .snapshot import list_snapshots
+    names = list_snapshots(args.rclone, args.remote)
+    if not names:
+        console.warning("원격에 스냅샷이 없습니다.")
+    for name in names:
+        print(f"  - {name}")
+    return 0
+
+
+def cmd_snapshot_prune(args):
+    from .snapshot import prune
+    try:
+        prune(args.rclone, args.source, args.remote, keep=args.keep)
+    except ValueError as e:
+        console.error(str(e))
+        return 1
+    return 0
+
+
+def cmd_pack_push(args):
+    from .packs import push
+    push(args.rclone, args.source, args.remote, workers=args.workers, read_root=args.read_root)
+    return 0
+
+
+def cmd_pack_pull(args):
+    from .packs import pull
+    try:
+        pull(args.rclone, args.source, args.remote, workers=args.workers)
+    except (ValueError, RuntimeError) as e:
+        console.error(str(e))
+        return 1
+    return 0
+
+
+def cmd_watch(args):
+    from .watch import watch
+    if not os.path.isdir(args.source):
+        console.error(f"{args.source} 폴더가 존재하지 않습니다.")
+        return 1
+    watch(args.rclone, args.source, args.remote, debounce=args.debounce, max_delay=args.max_delay,
+          poll=args.poll, poll_interval=args.poll_interval)
+    return 0
+
+
+def cmd_pull(args):
+    from .watch import pull
+    pull(args.rclone, args.source, args.remote, interval=args.interval, once=args.once)
+    return 0
+
+
+def cmd_jobs(args):
+    import asyncio
+    from .jobs import DONE, JobEngine, StatePrinter, load_jobs, run_reported
+    specs = [(kind, source, remote, 0, {}) for kind, source, remote in args.job or []]
+    try:
+        if args.file:
+            specs += load_jobs(args.file)
+        if not specs:
+            console.error("실행할 작업이 없습니다. (--job 또는 --file)")
+            return 2
+        engine = JobEngine(args.max_jobs, on_change=StatePrinter())
+        jobs = [engine.submit(kind, source, remote, priority, **options)
+                for kind, source, remote, priority, options in specs]
+    except (OSError, ValueError, KeyError) as e:
+        console.error(f"작업 목록 오류: {e}")
+        return 2
+    try:
+        asyncio.run(run_reported(engine, args.report_interval))
+    except KeyboardInterrupt:
+        engine.cancel()
+        raise
+    finally:
+        engine.shutdown()
+    failed = [job for job in jobs if job.state != DONE]
+    for job in jobs:
+        report_problems(job.problems, limit=20)
+    if failed:
+        console.error(f"작업 {len(jobs)}개 중 {len(failed)}개 실패/취소")
+        return 1
+    console.success(f"작업 {len(jobs)}개 완료")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="yunisync", description="YuniServer 동기화 도구")
+    sub = parser.add_subparsers(dest="command")
+
+    def add_freeze(p):
+        p.add_argument("--freeze", action="store_true",
+                       help="서버를 멈추지 않고 시점 고정 복사본(.yunisync/<폴더>/freeze)에서 업로드")
+        p.add_argument("--pre-hook", help="고정 직전 실행할 명령 (예: 저장 중지). 기본: YUNISYNC_PRE_HOOK")
+        p.add_argument("--post-hook", help="고정 직후 실행할 명령 (예: 저장 재개). 기본: YUNISYNC_POST_HOOK")
+
+    def add_common(p):
+        p.add_argument("--source", default=config.SERVER_DIR, help="로컬 서버 폴더 (기본: yuniserver)")
+        p.add_argument("--remote", default=config.REMOTE, help="원격 경로 (기본: googledrive:yuniserver)")
+        p.add_argument("--metrics", default=default_metrics_path(),
+                       help="진행률/처리량을 기록할 JSONL 파일 (기본: YUNISYNC_METRICS 환경 변수)")
+        p.add_argument("--throttle", action="store_true", default=bool(os.environ.get("YUNISYNC_THROTTLE")),
+                       help="호스트 부하(CPU/iowait/네트워크/틱)를 보며 전송 대역폭을 조절하고 낮은 우선순위로 실행")
+        p.add_argument("--schedule", help="시간대별 대역폭 상한 (예: \"08:00,1M 02:00,off\"). 기본: YUNISYNC_BWLIMIT_SCHEDULE")
+        p.add_argument("--max-tick", type=float, help="허용할 서버 틱 시간 ms (기본: YUNISYNC_MAX_TICK 또는 50)")
+        p.add_argument("--tick-command", help="서버 틱 시간(ms)을 출력하는 명령. 기본: YUNISYNC_TICK_COMMAND")
+        p.add_argument("--trace", default=trace.default_trace_path(),
+                       help="단계별 소요 시간을 Chrome 추적 형식(JSON)으로 기록하고 끝에 요약 표 출력. 파일이 있으면 이어서 기록 (기본: YUNISYNC_TRACE)")
+        p.add_argument("--profile", default=trace.default_profile_path(),
+                       help="파이썬 코드의 함수별 시간을 cProfile 형식으로 기록 (기본: YUNISYNC_PROFILE)")
+
+    p = sub.add_parser("scan", help="로컬 매니페스트 갱신")
+    add_common(p)
+    p.set_defaults(func=cmd_scan)
+
+    p = sub.add_parser("upload", help="변경된 파일만 업로드")
+    add_common(p)
+    p.add_argument("--full", action="store_true", help="기준 상태를 무시하고 전체 sync")
+    p.add_argument("--dry-run", action="store_true", help="전송 없이 변경 목록만 출력")
+    p.add_argument("--mirror", action="append", default=[], metavar="원격[@전송 수]",
+                   help="--remote와 함께 동시에 업로드할 원격 (여러 번 지정 가능). 스캔/해시는 한 번만 하고 "
+                        "원격별로 따로 전송하며, 한 원격이 실패해도 나머지는 계속 진행")
+    add_freeze(p)
+    p.set_defaults(func=cmd_upload)
+
+    p = sub.add_parser("download", help="다운로드하면서 권한 설정/검증을 동시에 처리")
+    add_common(p)
+    p.add_argument("--verify", action="store_true", help="다운로드 후 트리 전체의 MD5를 병렬로 검증")
+    p.add_argument("--workers", type=int, help="검증/묶음 압축 해제 프로세스 수 (기본: CPU 수)")
+    p.set_defaults(func=cmd_download)
+
+    p = sub.add_parser("restore", help="경로 패턴에 맞는 파일만 복원 (원격 매니페스트/스냅샷 기준)")
+    add_common(p)
+    p.add_argument("patterns", nargs="+", help="yuniserver 기준 경로 또는 패턴 (예: world/playerdata, plugins/*.yml)")
+    p.add_argument("--snapshot", help="이 스냅샷에서 복원 (latest: 최신 스냅샷)")
+    p.add_argument("--dry-run", action="store_true", help="받지 않고 대상 파일만 출력")
+    p.add_argument("--workers", type=int, help="묶음 압축 해제 프로세스 수 (기본: CPU 수)")
+    p.set_defaults(func=cmd_restore)
+
+    p = sub.add_parser("verify", help="로컬 트리의 MD5를 병렬로 계산해 원격 매니페스트와 비교")
+    add_common(p)
+    p.add_argument("--workers", type=int, help="해시 프로세스 수 (기본: CPU 수)")
+    p.add_argument("--rehash", action="store_true", help="로컬 매니페스트의 해시를 쓰지 않고 모든 파일을 다시 읽음")
+    p.set_defaults(func=cmd_verify)
+
+    p = sub.add_parser("sync", help="일반 rclone sync (진행률/처리량 측정 포함)")
+    add_common(p)
+    p.add_argument("direction", choices=["up", "down"], help="up: 로컬 -> 원격, down: 원격 -> 로컬")
+    p.add_argument("--auto-tune", action="store_true",
+                   help="파일 크기 분포와 이전 측정값으로 동시성/버퍼를 정하고 작은/큰 파일을 나눠 전송")
+    add_freeze(p)
+    p.set_defaults(func=cmd_sync)
+
+    p = sub.add_parser("freeze", help="업로드용 시점 고정 복사본 갱신 (서버 저장 중지 시간 최소화)")
+    add_common(p)
+    p.add_argument("--pre-hook", help="고정 직전 실행할 명령 (기본: YUNISYNC_PRE_HOOK)")
+    p.add_argument("--post-hook", help="고정 직후 실행할 명령 (기본: YUNISYNC_POST_HOOK)")
+    p.set_defaults(func=cmd_freeze)
+
+    p = sub.add_parser("tune", help="자동 조정 설정 확인 / 초기화")
+    add_common(p)
+    p.add_argument("direction", choices=["up", "down"])
+    p.add_argument("--reset", action="store_true", help="이 호스트/원격에서 학습한 설정 삭제")
+    p.set_defaults(func=cmd_tune)
+
+    p = sub.add_parser("publish", help="로컬 상태를 원격 매니페스트로 기록 (일반 rclone sync 후 사용)")
+    add_common(p)
+    p.set_defaults(func=cmd_publish)
+
+    p = sub.add_parser("remote-info", help="원격 매니페스트로 파일 개수/크기 확인 (Drive 목록 조회 없음)")
+    add_common(p)
+    p.add_argument("--list", type=int, default=0, help="최근 수정된 파일을 N개까지 출력")
+    p.set_defaults(func=cmd_remote_info)
+
+    p = sub.add_parser("backup", help="reflink로 공유 블록 백업 생성 후 오래된 백업 정리")
+    add_common(p)
+    p.add_argument("--keep", type=int, default=3, help="남길 백업 개수 (기본: 3)")
+    p.add_argument("--mode", choices=["auto", "reflink", "hardlink", "copy"], default="auto",
+                   help="복제 방식 (기본: auto = reflink -> copy, hardlink는 원본과 파일을 공유하므로 직접 지정할 때만)")
+    p.set_defaults(func=cmd_backup)
+
+    p = sub.add_parser("daemon", help="스크립트/GUI가 함께 쓸 rclone rcd 데몬 관리")
+    add_common(p)
+    p.add_argument("action", choices=["start", "stop", "status"])
+    p.set_defaults(func=cmd_daemon)
+
+    p = sub.add_parser("status", help="rclone 설치 및 원격 연결 상태 확인")
+    add_common(p)
+    p.set_defaults(func=cmd_status)
+
+    p = sub.add_parser("snapshot-push", help="청크 스냅샷 업로드 (새 청크만 전송)")
+    add_common(p)
+    p.add_argument("--rescan", action="store_true", help="원격 청크 목록을 다시 조회")
+    add_freeze(p)
+    p.set_defaults(func=cmd_snapshot_push)
+
+    p = sub.add_parser("snapshot-pull", help="청크 스냅샷으로 로컬 폴더 복원")
+    add_common(p)
+    p.add_argument("--name", help="복원할 스냅샷 이름 (기본: 최신)")
+    p.set_defaults(func=cmd_snapshot_pull)
+
+    p = sub.add_parser("snapshot-list", help="원격 스냅샷 목록")
+    add_common(p)
+    p.set_defaults(func=cmd_snapshot_list)
+
+    p = sub.add_parser("snapshot-prune", help="오래된 스냅샷과 사용하지 않는 청크 삭제")
+    add_common(p)
+    p.add_argument("--keep", type=int, default=3, help="남길 스냅샷 개수 (기본: 3)")
+    p.set_defaults(func=cmd_snapshot_prune)
+
+    p = sub.add_parser("pack-push", help="작은 파일을 압축 묶음으로 업로드")
+    add_common(p)
+    p.add_argument("--workers", type=int, help="묶음 생성 프로세스 수 (기본: CPU 수)")
+    add_freeze(p)
+    p.set_defaults(func=cmd_pack_push)
+
+    p = sub.add_parser("pack-pull", help="압축 묶음을 받아 병렬로 복원")
+    add_common(p)
+    p.add_argument("--workers", type=int, help="압축 해제 프로세스 수 (기본: CPU 수)")
+    p.set_defaults(func=cmd_pack_pull)
+
+    p = sub.add_parser("watch", help="변경을 감시해 몇 초 단위로 계속 업로드 (서버 이전 준비)")
+    add_common(p)
+    p.add_argument("--debounce", type=float, default=2.0,
+                   help="마지막 변경 후 이 시간(초) 동안 조용하면 묶어서 업로드 (기본: 2)")
+    p.add_argument("--max-delay", type=float, default=10.0,
+                   help="변경이 계속되어도 첫 변경 후 이 시간(초)이 지나면 업로드 (기본: 10)")
+    p.add_argument("--poll", action="store_true", help="inotify 대신 주기적인 stat 비교로 감시")
+    p.add_argument("--poll-interval", type=float, default=5.0, help="주기적 확인 간격(초) (기본: 5)")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("resume", help="중단된 업로드/다운로드를 작업 기록에서 이어서 실행")
+    add_common(p)
+    p.add_argument("--list", action="store_true", help="이어서 할 작업만 출력")
+    p.add_argument("--all", action="store_true", help="--remote와 관계없이 기록된 모든 원격의 작업")
+    p.add_argument("--direction", choices=["up", "down"], help="업로드(up) 또는 다운로드(down) 작업만")
+    p.set_defaults(func=cmd_resume)
+
+    p = sub.add_parser("jobs", help="여러 서버 폴더/원격의 업로드/다운로드를 작업 큐로 동시에 실행 (화면 없이, cron용)")
+    add_common(p)
+    p.add_argument("--job", nargs=3, action="append", metavar=("종류", "폴더", "원격"),
+                   help="작업 추가 (종류: upload, incremental, download, restore, resume). 여러 번 지정 가능")
+    p.add_argument("--file", help="작업 목록 JSON 파일 (kind, source, remote, priority 및 backup/full/patterns 등 옵션)")
+    p.add_argument("--max-jobs", type=int, default=2, help="동시에 실행할 작업 수 (기본: 2)")
+    p.add_argument("--report-interval", type=float, default=10.0, help="진행률 출력 간격(초) (기본: 10)")
+    p.set_defaults(func=cmd_jobs)
+
+    p = sub.add_parser("pull", help="watch가 올린 변경 기록을 따라 받기 (대상 서버)")
+    add_common(p)
+    p.add_argument("--interval", type=float, default=5.0, help="원격 확인 간격(초) (기본: 5)")
+    p.add_argument("--once", action="store_true", help="밀린 변경을 한 번만 적용하고 종료 (최종 전환용)")
+    p.set_defaults(func=cmd_pull)
+
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if not getattr(args, "func", None):
+        parser.print_help()
+        return 1
+    try:
+        scheduler = from_env(args.throttle, args.schedule, args.max_tick, args.tick_command)
+    except ValueError as e:
+        console.error(str(e))
+        return 2
+    tracker = ProgressTracker(args.command, args.remote, args.metrics, on_update=ConsoleProgress())
+    args.rclone = Rclone(progress=tracker, scheduler=scheduler)
+    if scheduler is None and args.command != "daemon":
+        # 공유 데몬(yunisync daemon start)이 실행 중이면 copy/sync를 데몬 작업으로 실행
+        # (부하 조절기는 rclone마다 rc 서버를 따로 띄워야 하므로 하위 프로세스 방식 유지)
+        from .rcd import open_transport
+        transport = open_transport(args.source, start=False)
+        if transport.name == "rcd":
+            args.rclone.transport = transport
+    if args.trace:
+        trace.enable()
+    profiler = trace.Profiler(args.profile) if args.profile else None
+    if profiler is not None:
+        profiler.start()
+    # 파일을 읽을 폴더 (--freeze면 시점 고정 복사본)
+    args.read_root = args.source
+    code = 1
+    try:
+        if getattr(args, "freeze", False):
+            if getattr(args, "direction", "up") != "up":
+                console.error("--freeze는 업로드에서만 사용할 수 있습니다.")
+                return code
+            from .freeze import freeze
+            # 파일만 고정 복사본에서 읽고 매니페스트/기준 상태/작업 기록은 원래 폴더 기준으로 유지
+            args.read_root = freeze(args.source, args.pre_hook, args.post_hook)[0]
+        with trace.span(args.command):
+            code = args.func(args)
+        return code
+    except RuntimeError as e:
+        # 시점 고정 훅 실패 등
+        console.error(str(e))
+        return code
+    except RcloneError as e:
+        console.error(str(e))
+        code = e.returncode or 1
+        return code
+    except KeyboardInterrupt:
+        console.warning("중단되었습니다.")
+        code = 130
+        return code
+    finally:
+        result = tracker.close(ok=code == 0)
+        if args.metrics and tracker.updates:
+            console.info(f"처리량: {result.bytes_per_sec / 1024 / 1024:.2f} MB/s, "
+                         f"{result.files_per_sec:.1f}개/s (기록: {args.metrics})")
+        if profiler is not None:
+            print(profiler.stop(), end="")
+            console.info(f"프로파일 기록: {args.profile} (python3 -m pstats {args.profile})")
+        if args.trace:
+            report_trace(args.trace)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+공통 설정값
+"""
+
+import os
+
+# 로컬 서버 데이터 폴더 (스크립트 실행 위치 기준)
+SERVER_DIR = "yuniserver"
+
+# 기본 원격 저장소 (YUNISYNC_REMOTE 환경 변수로 변경 가능 - 예: 로컬 폴더로 시험)
+REMOTE = os.environ.get("YUNISYNC_REMOTE", "googledrive:yuniserver")
+
+# 로컬/원격 메타데이터 폴더 이름
+# - 로컬: yuniserver 옆에 위치 (매니페스트 등)
+# - 원격: googledrive:yuniserver 아래에 위치하며 일반 sync 대상에서 제외됨
+META_DIR = ".yunisync"
+
+# 업로드에서 제외할 파일 패턴 (upload.sh와 동일)
+EXCLUDES = ["*.tmp", "*.lock", "*.log"]
+
+# rclone 기본 동시성
+TRANSFERS = 4
+CHECKERS = 8
+
+# 다운로드 후 실행 권한을 부여할 확장자
+EXEC_SUFFIXES = (".sh", ".jar", ".exe")
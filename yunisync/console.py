@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+콘솔 출력 도구
+셸 스크립트의 log_info/log_success/log_error/log_warning과 같은 형식으로 출력한다.
+GUI에서는 set_sink()로 출력 대상을 로그 창으로 바꿀 수 있다.
+"""
+
+import sys
+
+_sink = None
+
+
+def set_sink(func):
+    """출력 대상 변경 (None이면 표준 출력)"""
+    global _sink
+    _sink = func
+
+
+def _emit(message):
+    if _sink is not None:
+        _sink(message)
+    else:
+        # 작업 큐의 여러 스레드가 동시에 출력해도 줄이 섞이지 않도록 한 번에 기록
+        sys.stdout.write(message + "\n")
+        sys.stdout.flush()
+
+
+def info(message):
+    _emit(f"ℹ️  {message}")
+
+
+def success(message):
+    _emit(f"✓ {message}")
+
+
+def error(message):
+    _emit(f"❌ {message}")
+
+
+def warning(message):
+    _emit(f"⚠️  {message}")
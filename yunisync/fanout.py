@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+여러 원격 동시 업로드 (미러)
+로컬 트리는 한 번만 스캔/해시하고, 원격마다 마지막 업로드 상태와 비교해 바뀐 파일만 모든 원격에 동시에 보낸다.
+
+- 원격마다 rclone을 따로 실행하므로 전체 시간은 원격별 시간의 합이 아니라 가장 느린 원격에 가깝다.
+- 원격마다 동시 전송 수를 정할 수 있다. (예: nas:/backup/yuniserver@16)
+- 한 원격이 실패해도 나머지는 끝까지 진행한다. 실패한 원격은 기준 상태가 그대로이므로 다음 실행
+  (또는 이어하기)에서 그 원격만 다시 보낸다.
+- 모든 원격에 같은 순서(경로순)로 파일을 넘기므로 같은 파일을 비슷한 시점에 읽게 되어,
+  두 번째 원격부터는 디스크 대신 페이지 캐시에서 읽는다.
+"""
+
+import threading
+import time
+
+from . import config, console, trace
+from .progress import ProgressTracker, format_bytes
+from .rclone import Rclone, RcloneError
+from .upload import incremental_upload, refresh_manifest
+
+
+class Target:
+    """업로드 대상 원격 하나와 결과"""
+
+    def __init__(self, remote, transfers=None):
+        self.remote = remote
+        self.transfers = transfers
+        self.rclone = None
+        self.changed = self.deleted = 0
+        self.error = None
+        self.seconds = 0.0
+
+    @classmethod
+    def parse(cls, text):
+        """"원격[@동시 전송 수]" 형식 (예: nas:/backup/yuniserver@16)"""
+        remote, sep, count = text.rpartition("@")
+        if sep and remote and count.isdigit() and int(count) > 0:
+            return cls(remote, int(count))
+        return cls(text)
+
+    @property
+    def progress(self):
+        return self.rclone.progress.progress if self.rclone is not None else None
+
+    def describe(self):
+        if self.error is not None:
+            return f"{self.remote}: 실패 ({self.seconds:.1f}초) {self.error}"
+        return f"{self.remote}: 전송 {self.changed}개, 삭제 {self.deleted}개 ({self.seconds:.1f}초)"
+
+
+class FanoutStatus:
+    """원격별 진행률을 한 줄로 묶어 on_update(ConsoleProgress 등)로 전달"""
+
+    def __init__(self, targets, on_update):
+        self.targets = targets
+        self.on_update = on_update
+        self._lock = threading.Lock()
+
+    def format(self):
+        parts = []
+        for target in self.targets:
+            p = target.progress
+            if p is not None:
+                parts.append(f"{target.remote} {p.percent:.0f}% {format_bytes(p.bytes_per_sec)}/s")
+        return " | ".join(parts)
+
+    def __call__(self, progress):
+        with self._lock:
+            self.on_update(self)
+
+    def finish(self):
+        finish = getattr(self.on_update, "finish", None)
+        if finish is not None:
+            with self._lock:
+                finish()
+
+
+def unique_targets(targets):
+    """같은 원격이 두 번 지정되면 ValueError"""
+    seen = set()
+    for target in targets:
+        key = target.remote.rstrip("/")
+        if key in seen:
+            raise ValueError(f"같은 원격이 두 번 지정되었습니다: {target.remote}")
+        seen.add(key)
+    return targets
+
+
+def fanout_upload(targets, source=config.SERVER_DIR, full=False, dry_run=False, resume=False, binary="rclone",
+                  extra_args=None, metrics_path=None, on_update=None, make_scheduler=None, read_root=None,
+                  transport=None):
+    """모든 원격에 동시에 증분 업로드. 원격별 결과는 targets에 기록되고, 실패한 원격 목록을 반환한다.
+    원격마다 Rclone(진행률, 부하 조절기)을 따로 만든다. make_scheduler는 원격마다 호출된다.
+    read_root는 실제로 읽을 폴더 (시점 고정 복사본), transport는 원격들이 함께 쓸 공유 rcd 데몬 (선택)"""
+    unique_targets(targets)
+    with trace.span("fanout.scan"):
+        current = refresh_manifest(source, read_root)
+    status = FanoutStatus(targets, on_update) if on_update is not None else None
+    for target in targets:
+        tracker = ProgressTracker("upload", target.remote, metrics_path, on_update=status)
+        scheduler = make_scheduler() if make_scheduler is not None else None
+        target.rclone = Rclone(binary, extra_args, progress=tracker, scheduler=scheduler, transport=transport)
+
+    if dry_run:
+        for target in targets:
+            console.info(f"[{target.remote}]")
+            target.changed, target.deleted = incremental_upload(target.rclone, source, target.remote, full=full,
+                                                                dry_run=True, current=current)
+        return []
+
+    console.info(f"원격 {len(targets)}곳에 동시에 업로드합니다: {', '.join(t.remote for t in targets)}")
+    threads = [threading.Thread(target=send, args=(target, source, current, full, resume, read_root),
+                                name=f"fanout-{index}", daemon=True)
+               for index, target in enumerate(targets)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        for target in targets:
+            target.rclone.cancel()
+        for thread in threads:
+            thread.join()
+        raise
+    finally:
+        for target in targets:
+            target.rclone.progress.close(ok=target.error is None)
+
+    elapsed = time.perf_counter() - started
+    slowest = max(target.seconds for target in targets)
+    console.info(f"전체 {elapsed:.1f}초 (가장 느린 원격 {slowest:.1f}초, 원격별 합계 "
+                 f"{sum(target.seconds for target in targets):.1f}초)")
+    return [target for target in targets if target.error is not None]
+
+
+def send(target, source, current, full, resume, read_root=None):
+    """원격 하나에 업로드 (작업 스레드). 실패는 target.error에 기록하고 다른 원격에는 영향을 주지 않는다."""
+    started = time.perf_counter()
+    try:
+        with trace.span("fanout.target", remote=target.remote):
+            target.changed, target.deleted = incremental_upload(
+                target.rclone, source, target.remote, full=full, resume=resume,
+                current=current, transfers=target.transfers, read_root=read_root)
+    except (RcloneError, OSError) as e:
+        target.error = str(e)
+    except Exception as e:
+        target.error = f"{type(e).__name__}: {e}"
+    finally:
+        target.seconds = time.perf_counter() - started
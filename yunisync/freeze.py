@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+실행 중인 서버의 시점 고정 복사본 (업로드용)
+게임 서버를 멈추지 않고 일관된 시점의 yuniserver를 올리기 위해, .yunisync/yuniserver/freeze/yuniserver에
+복사본을 유지하고 업로드는 이 복사본에서 읽는다. (매니페스트, 기준 상태, 작업 기록은 원래 폴더 기준으로 둔다)
+
+1) 서버가 돌아가는 동안 복사본을 미리 맞춤 (바뀐 파일만 복사, 대부분의 시간이 여기서 걸림)
+2) pre 훅으로 저장을 멈추고(예: save-off, save-all flush) 그 사이에 바뀐 파일만 다시 복사
+3) post 훅으로 저장 재개
+
+2단계는 1단계에서 읽어 둔 파일 정보와 원본만 비교하고 복사본은 다시 읽지 않는다.
+바뀐 파일도 많지 않으므로 서버 저장이 멈추는 시간은 보통 1초 안팎이다.
+파일 복사는 reflink(블록 공유)를 먼저 시도하고, 지원하지 않으면 일반 복사를 한다.
+(지역 파일은 제자리에서 수정되므로 하드링크는 쓰지 않음)
+"""
+
+import os
+import shutil
+import subprocess
+import time
+
+from . import config, console, trace
+from .backup import reflink
+from .manifest import state_dir, walk
+
+PRE_HOOK_ENV = "YUNISYNC_PRE_HOOK"
+POST_HOOK_ENV = "YUNISYNC_POST_HOOK"
+
+
+def freeze_path(source=config.SERVER_DIR):
+    return os.path.join(state_dir(source), "freeze", os.path.basename(os.path.abspath(source)))
+
+
+class MirrorStats:
+    def __init__(self):
+        self.copied = 0
+        self.copied_bytes = 0
+        self.deleted = 0
+        self.seconds = 0.0
+        self.method = None
+        # 원본에서 읽은 파일 정보 (경로 -> (크기, 수정 시각)), catch_up()에서 사용
+        self.state = {}
+
+
+def clone_file(src, dst, stats):
+    """src를 dst로 복제 (임시 파일에 쓴 뒤 교체). 첫 파일에서 reflink가 안 되면 이후로는 일반 복사"""
+    tmp = dst + ".yunisync-tmp"
+    if stats.method in (None, "reflink"):
+        try:
+            reflink(src, tmp)
+            stats.method = "reflink"
+            os.replace(tmp, dst)
+            return
+        except (OSError, ImportError):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            if stats.method is None:
+                stats.method = "copy"
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+def mirror(src, dst, stats=None):
+    """dst를 src와 같게 맞춤. 크기/수정 시각이 같은 파일은 건너뛴다."""
+    stats = stats or MirrorStats()
+    started = time.time()
+    wanted = stats.state
+    for rel, st in walk(src):
+        wanted[rel] = (st.st_size, st.st_mtime_ns)
+        target = os.path.join(dst, rel)
+        try:
+            old = os.stat(target)
+            if old.st_size == st.st_size and old.st_mtime_ns == st.st_mtime_ns:
+                continue
+        except OSError:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            clone_file(os.path.join(src, rel), target, stats)
+        except FileNotFoundError:
+            # 복사 중에 삭제된 파일 (다음 단계에서 정리됨)
+            del wanted[rel]
+            continue
+        stats.copied += 1
+        stats.copied_bytes += st.st_size
+    for rel, st in list(walk(dst)):
+        if rel not in wanted:
+            os.remove(os.path.join(dst, rel))
+            stats.deleted += 1
+    stats.seconds = time.time() - started
+    return stats
+
+
+def catch_up(src, dst, state, stats=None):
+    """mirror() 이후 원본에서 바뀐 파일만 반영. 원본만 다시 읽고 복사본은 읽지 않는다. (저장 중지 구간용)"""
+    stats = stats or MirrorStats()
+    started = time.time()
+    seen = set()
+    for rel, st in walk(src):
+        seen.add(rel)
+        if state.get(rel) == (st.st_size, st.st_mtime_ns):
+            continue
+        target = os.path.join(dst, rel)
+        if rel not in state:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            clone_file(os.path.join(src, rel), target, stats)
+        except FileNotFoundError:
+            seen.discard(rel)
+            continue
+        stats.copied += 1
+        stats.copied_bytes += st.st_size
+    for rel in state:
+        if rel not in seen:
+            try:
+                os.remove(os.path.join(dst, rel))
+                stats.deleted += 1
+            except FileNotFoundError:
+                pass
+    stats.seconds = time.time() - started
+    return stats
+
+
+def run_hook(command, name):
+    if not command:
+        return
+    console.info(f"{name} 훅 실행: {command}")
+    result = subprocess.run(command, shell=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{name} 훅 실패 (종료 코드: {result.returncode})")
+
+
+def freeze(source=config.SERVER_DIR, pre_hook=None, post_hook=None):
+    """시점 고정 복사본을 갱신하고 경로 반환. 서버 저장이 멈춰 있던 시간(초)도 함께 반환"""
+    pre_hook = pre_hook if pre_hook is not None else os.environ.get(PRE_HOOK_ENV)
+    post_hook = post_hook if post_hook is not None else os.environ.get(POST_HOOK_ENV)
+    target = freeze_path(source)
+    os.makedirs(target, exist_ok=True)
+
+    console.info("고정 복사본 미리 맞추는 중 (서버 실행 중)...")
+    with trace.span("freeze.warm") as span:
+        warm = mirror(source, target)
+        span.set(files=warm.copied, bytes=warm.copied_bytes)
+    console.info(f"미리 복사: {warm.copied}개 ({warm.copied_bytes / 1024 / 1024:.1f} MB), "
+                 f"삭제 {warm.deleted}개, {warm.seconds:.1f}초 ({warm.method or '변경 없음'})")
+
+    paused = time.time()
+    with trace.span("freeze.pause"):
+        run_hook(pre_hook, "pre")
+        try:
+            final = MirrorStats()
+            final.method = warm.method
+            catch_up(source, target, warm.state, final)
+        finally:
+            run_hook(post_hook, "post")
+    pause = time.time() - paused
+    console.success(f"시점 고정 완료: 추가 복사 {final.copied}개, 삭제 {final.deleted}개, "
+                    f"서버 저장 중지 시간 {pause:.2f}초")
+    return target, pause
@@ -0,0 +1,425 @@
+# -*- coding: utf-8 -*-
+"""
+작업 큐 (여러 서버 폴더/원격 동시 전송)
+GUI와 화면 없는 명령(python3 -m yunisync jobs)이 같은 엔진으로 업로드/다운로드를 실행한다.
+
+- asyncio 이벤트 루프가 대기 중인 작업을 우선순위가 높은 것부터 최대 max_jobs개까지 동시에 실행한다.
+  실제 전송과 해시 계산은 작업 스레드에서 실행된다.
+- 겹치면 안 되는 작업은 앞의 작업이 끝날 때까지 기다린다.
+  같은 폴더로 받는 작업(다운로드/복원/이어하기)은 그 폴더의 다른 작업과, 원격에 쓰는 업로드는 같은 원격의 다른 작업과
+  겹치지 않는다. (다른 폴더/원격의 작업, 한 폴더에서 여러 원격으로의 업로드는 동시에 실행)
+- 작업마다 진행률과 rclone 실행기를 따로 가지므로 작업 하나만 취소할 수 있다.
+  해시 계산 중에는 다음 rclone 실행 시점에 취소된다.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config, console
+from .journal import Journal, pending, resume
+from .manifest import fetch_remote, publish, state_dir
+from .pipeline import RestorePipeline, check_tree, fix_modes
+from .progress import ProgressTracker
+from .rclone import Rclone, RcloneError
+
+# 동시에 실행할 작업 수 기본값
+MAX_JOBS = 2
+# 화면 없는 실행에서 진행률을 출력하는 간격 (초)
+REPORT_INTERVAL = 10.0
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+STATE_NAMES = {
+    QUEUED: "대기",
+    RUNNING: "실행 중",
+    DONE: "완료",
+    FAILED: "실패",
+    CANCELLED: "취소됨",
+}
+
+
+class JobCancelled(Exception):
+    """작업이 취소됨"""
+
+
+class Job:
+    """큐에 들어간 작업 하나. 상태/진행률은 작업 스레드가 갱신하고 다른 스레드는 읽기만 한다."""
+
+    def __init__(self, job_id, kind, source, remote, priority=0, options=None):
+        self.id = job_id
+        self.kind = kind
+        self.source = source
+        self.remote = remote
+        self.priority = priority
+        self.options = options or {}
+        self.state = QUEUED
+        self.progress = None
+        self.error = None
+        self.problems = []
+        self.cancelled = False
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.rclone = None
+        self.transport = None
+
+    @property
+    def writes_local(self):
+        """로컬 폴더를 쓰는 작업인지 (다운로드 등)"""
+        return KINDS[self.kind][1]
+
+    @property
+    def writes_remote(self):
+        """원격을 쓰는 작업인지 (업로드 등)"""
+        return KINDS[self.kind][2]
+
+    @property
+    def active(self):
+        return self.state in (QUEUED, RUNNING)
+
+    @property
+    def label(self):
+        arrow = {(True, False): "<-", (False, True): "->"}.get((self.writes_local, self.writes_remote), "<->")
+        return f"#{self.id} {KINDS[self.kind][0]} {self.source} {arrow} {self.remote}"
+
+    def conflicts(self, other):
+        """동시에 실행하면 안 되는 작업인지"""
+        # 같은 폴더면 매니페스트/기준 상태/작업 기록도 함께 쓰므로 상태 폴더로 비교
+        if state_dir(self.source) == state_dir(other.source) and (self.writes_local or other.writes_local):
+            return True
+        return self.remote.rstrip("/") == other.remote.rstrip("/") and (self.writes_remote or other.writes_remote)
+
+    def describe(self):
+        text = f"{self.label} [{STATE_NAMES[self.state]}]"
+        if self.state == RUNNING and self.progress is not None:
+            text += f" {self.progress.format()}"
+        elif self.error:
+            text += f" {self.error}"
+        return text
+
+    def check(self):
+        """단계 사이에서 취소 확인"""
+        if self.cancelled:
+            raise JobCancelled()
+
+    def cancel(self):
+        self.cancelled = True
+        for target in (self.rclone, self.transport):
+            if target is not None:
+                target.cancel()
+
+    def events(self, *handlers):
+        """전송 계층 sync()의 on_event: 진행률과 handlers(작업 기록, 후처리)에 전달"""
+        tracker = self.rclone.progress
+
+        def on_event(event):
+            tracker.on_event(event)
+            for handler in handlers:
+                handler(event)
+            if event.get("level") == "error":
+                console.error(f"#{self.id} {event.get('msg', '')}")
+
+        return on_event
+
+
+def run_upload(job):
+    """rclone sync 업로드 + 작업 기록 + 원격 매니페스트 (GUI 업로드와 같음)"""
+    from .upload import refresh_manifest
+    excludes = config.EXCLUDES + [f"/{config.META_DIR}/**"]
+    manifest = refresh_manifest(job.source)
+    job.check()
+    journal = Journal.open(job.source, "sync-up", job.remote, root=job.source)
+    try:
+        job.transport.sync("sync", job.source, job.remote, excludes=excludes, on_event=job.events(journal.on_event))
+    except BaseException:
+        journal.close()
+        raise
+    publish(job.rclone, manifest, job.remote)
+    journal.finish()
+
+
+def run_incremental(job):
+    from .upload import incremental_upload
+    incremental_upload(job.rclone, job.source, job.remote, full=job.options.get("full", False))
+
+
+def run_download(job):
+    """(백업) + rclone sync 다운로드 + 받는 즉시 권한 설정/검증.
+    청크 스냅샷/묶음 원격은 데이터가 .yunisync/ 아래에 있으므로 올린 방식 그대로 받는다."""
+    manifest = fetch_remote(job.rclone, job.remote)
+    layout = manifest.layout if manifest is not None else "files"
+    if layout not in ("files", "snapshot", "pack"):
+        raise ValueError(f"알 수 없는 업로드 방식입니다: {layout}")
+    job.check()
+    existed = os.path.isdir(job.source)
+    if job.options.get("backup") and existed:
+        from .backup import make_backup
+        make_backup(job.source, rclone=job.rclone)
+        job.check()
+    if layout == "snapshot":
+        from .snapshot import pull
+        pull(job.rclone, job.source, job.remote)
+        return
+    if layout == "pack":
+        from .packs import pull
+        pull(job.rclone, job.source, job.remote)
+        return
+    expected = manifest.entries if manifest is not None and manifest.layout == "files" else None
+    pipeline = RestorePipeline(job.source, expected)
+    journal = Journal.open(job.source, "sync-down", job.remote, root=job.source)
+    try:
+        job.transport.sync("sync", job.remote, job.source, excludes=[f"/{config.META_DIR}/**"],
+                           on_event=job.events(pipeline.on_event, journal.on_event))
+    except BaseException:
+        journal.close()
+        raise
+    finally:
+        applied, mismatches = pipeline.close()
+    journal.finish()
+    # 이번에 받지 않은 기존 파일은 권한만 확인 (rcd 데몬 전송이면 close()에서 이미 확인)
+    if existed and not pipeline.lossy:
+        fix_modes(job.source)
+    if expected is not None:
+        mismatches += check_tree(job.source, manifest)
+    job.problems = mismatches
+
+
+def run_restore(job):
+    from .restore import restore
+    matched, job.problems = restore(job.rclone, job.source, job.remote, job.options.get("patterns", ()))
+
+
+def run_resume(job):
+    journals = pending(job.source, job.remote, job.options.get("direction"))
+    if not journals:
+        console.info(f"#{job.id} 이어서 할 작업이 없습니다.")
+    for journal in journals:
+        job.check()
+        job.problems += resume(job.rclone, journal, job.source)
+
+
+# 작업 종류 -> (설명, 로컬 폴더를 쓰는지, 원격을 쓰는지, 실행 함수)
+KINDS = {
+    "upload": ("업로드", False, True, run_upload),
+    "incremental": ("증분 업로드", False, True, run_incremental),
+    "download": ("다운로드", True, False, run_download),
+    "restore": ("선택 복원", True, False, run_restore),
+    "resume": ("이어하기", True, True, run_resume),
+}
+
+
+def subprocess_transport(binary="rclone"):
+    from .rcd import SubprocessTransport
+    return SubprocessTransport(Rclone(binary))
+
+
+class JobEngine:
+    """asyncio 작업 큐
+
+    transport_factory: 작업마다 새 전송 계층을 만드는 함수 (기본: rclone 하위 프로세스,
+                       GUI는 공유 rcd 데몬에 붙는 DaemonTransport)
+    on_change: 작업 상태/진행률이 바뀔 때 job을 받는 함수 (작업 스레드에서 호출됨)
+    """
+
+    def __init__(self, max_jobs=MAX_JOBS, transport_factory=None, on_change=None, binary="rclone"):
+        self.max_jobs = max(1, max_jobs)
+        self.transport_factory = transport_factory or (lambda: subprocess_transport(binary))
+        self.on_change = on_change
+        self.binary = binary
+        self._jobs = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_jobs, thread_name_prefix="yunisync-job")
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+
+    def submit(self, kind, source=config.SERVER_DIR, remote=config.REMOTE, priority=0, **options):
+        """작업 추가 (어느 스레드에서나 호출 가능). 우선순위가 클수록 먼저 실행"""
+        if kind not in KINDS:
+            raise ValueError(f"알 수 없는 작업 종류: {kind} (가능: {', '.join(KINDS)})")
+        job = Job(next(self._ids), kind, source, remote, priority, options)
+        with self._lock:
+            self._jobs.append(job)
+        self._changed(job)
+        self._wake()
+        return job
+
+    def cancel(self, job_id=None):
+        """작업 취소 (job_id가 없으면 끝나지 않은 모든 작업)"""
+        for job in self.jobs():
+            if job_id is not None and job.id != job_id:
+                continue
+            with self._lock:
+                if job.state == QUEUED:
+                    job.state = CANCELLED
+                    job.finished = time.time()
+                elif job.state != RUNNING:
+                    continue
+            job.cancel()
+            self._changed(job)
+        self._wake()
+
+    def jobs(self):
+        with self._lock:
+            return list(self._jobs)
+
+    def busy(self):
+        return any(job.active for job in self.jobs())
+
+    def _changed(self, job):
+        if self.on_change is not None:
+            self.on_change(job)
+
+    def _wake(self):
+        loop, wakeup = self._loop, self._wakeup
+        if loop is not None and not loop.is_closed():
+            try:
+                loop.call_soon_threadsafe(wakeup.set)
+            except RuntimeError:
+                pass  # 루프가 막 끝남
+
+    def _ready(self):
+        """지금 시작할 수 있는 작업 (우선순위 순, 실행 중인 작업과 겹치지 않는 것)"""
+        with self._lock:
+            running = [job for job in self._jobs if job.state == RUNNING]
+            queued = sorted((job for job in self._jobs if job.state == QUEUED), key=lambda j: (-j.priority, j.id))
+            ready = []
+            for job in queued:
+                if len(running) >= self.max_jobs:
+                    break
+                if any(job.conflicts(other) for other in running):
+                    continue
+                job.state = RUNNING
+                running.append(job)
+                ready.append(job)
+        return ready
+
+    async def run(self, until_idle=False):
+        """작업 실행 루프. until_idle이면 큐가 비었을 때 끝나고, 아니면 stop()까지 계속 대기"""
+        self._wakeup = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        tasks = set()
+        try:
+            while True:
+                self._wakeup.clear()
+                for job in self._ready():
+                    task = self._loop.create_task(self._run_job(job))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                # 작업 상태는 작업 스레드가 끝내기 전에 바꾸므로 tasks 대신 상태로 확인
+                if not any(job.state == RUNNING for job in self.jobs()) and (until_idle or self._stopping):
+                    break
+                await self._wakeup.wait()
+        finally:
+            self._loop = None
+
+    async def _run_job(self, job):
+        try:
+            await self._loop.run_in_executor(self._pool, self.execute, job)
+        finally:
+            self._wakeup.set()
+
+    def execute(self, job):
+        """작업 하나 실행 (작업 스레드)"""
+        def on_update(progress):
+            job.progress = progress
+            self._changed(job)
+
+        tracker = ProgressTracker(job.kind, job.remote, on_update=on_update)
+        job.rclone = Rclone(self.binary, progress=tracker)
+        job.started = time.time()
+        ok = False
+        try:
+            job.transport = self.transport_factory()
+            if job.cancelled:
+                raise JobCancelled()
+            self._changed(job)
+            KINDS[job.kind][3](job)
+            ok = not job.problems
+            job.state = DONE if ok else FAILED
+            if job.problems:
+                job.error = f"검증 문제 {len(job.problems)}개"
+        except (JobCancelled, RcloneError) as e:
+            if job.cancelled:
+                job.state = CANCELLED
+            else:
+                job.state = FAILED
+                job.error = str(e)
+        except Exception as e:
+            # 한 작업의 오류가 다른 작업이나 루프를 멈추지 않도록 모두 실패로 기록
+            job.state = FAILED
+            job.error = f"{type(e).__name__}: {e}"
+        finally:
+            job.progress = tracker.close(ok)
+            job.finished = time.time()
+            if job.transport is not None:
+                job.transport.close()
+            self._changed(job)
+
+    def start(self):
+        """백그라운드 스레드에서 실행 루프 시작 (GUI용). stop()으로 종료"""
+        thread = threading.Thread(target=lambda: asyncio.run(self.run()), daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        """실행 중인 작업을 모두 취소하고 루프 종료"""
+        self._stopping = True
+        self.cancel()
+        self._wake()
+
+    def shutdown(self):
+        """작업 스레드가 끝날 때까지 대기"""
+        self._pool.shutdown(wait=True)
+
+
+def load_jobs(path):
+    """작업 파일(JSON 목록) 읽기 -> [(종류, 폴더, 원격, 우선순위, 옵션), ...]
+    예: [{"kind": "upload", "source": "/srv/a/yuniserver", "remote": "googledrive:a", "priority": 5}]"""
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    specs = []
+    for item in items:
+        options = {key: value for key, value in item.items() if key not in ("kind", "source", "remote", "priority")}
+        specs.append((item["kind"], item.get("source", config.SERVER_DIR), item.get("remote", config.REMOTE),
+                      int(item.get("priority", 0)), options))
+    return specs
+
+
+async def run_reported(engine, interval=REPORT_INTERVAL):
+    """큐가 빌 때까지 실행하면서 interval마다 실행 중인 작업의 진행률 출력 (화면 없는 실행용)"""
+    runner = asyncio.ensure_future(engine.run(until_idle=True))
+    while not runner.done():
+        await asyncio.wait([runner], timeout=interval)
+        for job in engine.jobs():
+            if job.state == RUNNING:
+                console.info(job.describe())
+    await runner
+
+
+class StatePrinter:
+    """on_change로 사용: 작업 상태가 바뀔 때만 한 줄 출력"""
+
+    def __init__(self):
+        self.seen = {}
+
+    def __call__(self, job):
+        if self.seen.get(job.id) == job.state:
+            return
+        self.seen[job.id] = job.state
+        if job.state == DONE:
+            console.success(job.describe())
+        elif job.state in (FAILED, CANCELLED):
+            console.error(job.describe())
+        else:
+            console.info(job.describe())
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+전송 체크포인트 기록
+긴 전송이 중간에 끊겨도(SSH 끊김, VM 재시작) 처음부터 다시 하지 않도록 끝난 파일을 기록한다.
+
+- .yunisync/journal/<작업>-<원격>.jsonl: 첫 줄은 작업 정보, 이후 한 줄에 끝난 파일(또는 청크) 하나
+  추가 기록만 하므로 중간에 끊겨도 그때까지의 기록은 남는다. (마지막 줄이 잘렸으면 무시)
+- 작업이 성공하면 기록을 지운다. 남아 있으면 끝나지 않은 작업이다.
+- resume은 남은 기록으로 같은 작업을 이어서 한다. 기록된 파일은 크기/수정 시각이 그대로면 다시 보내지 않는다.
+"""
+
+import json
+import os
+import time
+
+from . import config, console
+from .manifest import remote_slug, state_dir
+from .pipeline import is_copied
+
+JOURNAL_DIR = "journal"
+# 이 간격마다 디스크에 확실히 기록 (VM이 꺼져도 남도록)
+FSYNC_INTERVAL = 1.0
+
+# 작업 종류 -> (설명, 방향)
+KINDS = {
+    "sync-up": ("업로드 (sync)", "up"),
+    "sync-down": ("다운로드 (sync)", "down"),
+    "upload": ("증분 업로드", "up"),
+    "snapshot-push": ("청크 스냅샷 업로드", "up"),
+}
+
+
+def journal_dir(source):
+    return os.path.join(state_dir(source), JOURNAL_DIR)
+
+
+def journal_path(source, kind, remote):
+    return os.path.join(journal_dir(source), f"{kind}-{remote_slug(remote)}.jsonl")
+
+
+class Journal:
+    """끝난 항목 기록. done: 키(상대 경로 또는 청크 ID) -> [크기, 수정 시각] (청크는 빈 목록)
+
+    root가 있으면 전송 완료 이벤트마다 root 아래 로컬 파일의 크기/수정 시각을 함께 기록한다.
+    (업로드는 보낸 파일, 다운로드는 받은 파일)
+    """
+
+    def __init__(self, path, job, done=None, root=None):
+        self.path = path
+        self.job = job
+        self.done = done if done is not None else {}
+        self.root = root
+        self._file = None
+        self._synced = 0.0
+
+    @classmethod
+    def open(cls, source, kind, remote, resume=False, root=None):
+        """작업 기록 시작. resume이면 남은 기록에 이어서 쓰고, 아니면 새로 시작"""
+        path = journal_path(source, kind, remote)
+        journal = cls.load(path) if resume else None
+        if journal is None:
+            if not resume and os.path.exists(path):
+                console.warning("끝나지 않은 이전 작업 기록을 지우고 새로 시작합니다. (이어서 하려면 yunisync resume)")
+            job = {"kind": kind, "source": os.path.abspath(source), "remote": remote,
+                   "started": time.strftime("%Y-%m-%d %H:%M:%S")}
+            journal = cls(path, job)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            journal._file = open(path, "w", encoding="utf-8")
+            journal._write(job)
+        else:
+            journal._file = open(path, "a", encoding="utf-8")
+        journal.root = root
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        """기록 읽기 (없거나 첫 줄이 깨졌으면 None)"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return None
+        try:
+            job = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return None
+        done = {}
+        for line in lines[1:]:
+            try:
+                item = json.loads(line)
+            except ValueError:
+                continue  # 끊긴 순간 쓰던 줄
+            done[item[0]] = item[1:]
+        return cls(path, job, done)
+
+    @property
+    def kind(self):
+        return self.job["kind"]
+
+    @property
+    def remote(self):
+        return self.job["remote"]
+
+    def describe(self):
+        return (f"{KINDS[self.kind][0]} -> {self.remote} "
+                f"(시작: {self.job['started']}, 완료 {len(self.done)}개)")
+
+    def _write(self, item):
+        self._file.write(json.dumps(item, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._file.flush()
+        now = time.monotonic()
+        if now - self._synced >= FSYNC_INTERVAL:
+            os.fsync(self._file.fileno())
+            self._synced = now
+
+    def record(self, key, *values):
+        self.done[key] = list(values)
+        if self._file is not None:
+            self._write([key] + list(values))
+
+    def on_event(self, event):
+        """Rclone.stream()/전송 계층 sync()의 on_event로 사용"""
+        if not is_copied(event):
+            return
+        rel = event["object"]
+        if self.root is None:
+            self.record(rel)
+            return
+        try:
+            st = os.stat(os.path.join(self.root, rel))
+        except OSError:
+            return
+        self.record(rel, st.st_size, st.st_mtime_ns)
+
+    def is_done(self, key, size=None, mtime_ns=None):
+        """기록된 항목이고 그 뒤로 바뀌지 않았는지"""
+        values = self.done.get(key)
+        if values is None:
+            return False
+        return not values or (values[0] == size and values[1] == mtime_ns)
+
+    def close(self):
+        """기록을 남긴 채 닫음 (실패/중단 시)"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def finish(self):
+        """작업 성공: 기록 삭제"""
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+def pending(source=config.SERVER_DIR, remote=None, direction=None):
+    """끝나지 않은 작업 기록 목록 (remote/direction(up, down)이 있으면 그 작업만)"""
+    try:
+        names = sorted(os.listdir(journal_dir(source)))
+    except OSError:
+        return []
+    journals = []
+    for name in names:
+        if not name.endswith(".jsonl"):
+            continue
+        journal = Journal.load(os.path.join(journal_dir(source), name))
+        if journal is None or journal.kind not in KINDS:
+            continue
+        if (remote is None or journal.remote == remote) and direction in (None, KINDS[journal.kind][1]):
+            journals.append(journal)
+    return journals
+
+
+def resume(rclone, journal, source=config.SERVER_DIR):
+    """기록된 작업을 이어서 실행. 다운로드 검증에서 나온 문제 목록 반환"""
+    console.info(f"이어서 실행: {journal.describe()}")
+    if journal.kind == "sync-down":
+        from .pipeline import resume_download
+        applied, mismatches = resume_download(rclone, journal.remote, source)
+        return mismatches
+    if journal.kind == "sync-up":
+        from .upload import resume_sync
+        resume_sync(rclone, source, journal.remote)
+    elif journal.kind == "upload":
+        from .upload import incremental_upload
+        incremental_upload(rclone, source, journal.remote, resume=True)
+    elif journal.kind == "snapshot-push":
+        from .snapshot import push
+        push(rclone, source, journal.remote)
+    return []
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+GUI 로그 버퍼
+작업 스레드는 write()로 줄을 넣기만 하고, 화면 갱신은 Tk 메인 루프가 타이머로 drain()해서 묶음으로 처리한다.
+화면에 보여줄 줄은 고정 크기 링 버퍼로 제한하고, 전체 로그는 크기 제한이 있는 순환 파일에 남긴다.
+"""
+
+import os
+import threading
+from collections import deque
+from datetime import datetime
+
+MAX_LINES = 5000
+MAX_FILE_BYTES = 5 * 1024 * 1024
+FILE_BACKUPS = 3
+
+
+class LogSink:
+    """스레드 안전 로그 버퍼
+
+    path: 전체 로그를 남길 파일 (None이면 기록 안 함). MAX_FILE_BYTES를 넘으면 .1, .2 ...로 순환
+    max_lines: 화면에 남길 최대 줄 수. 화면 갱신보다 빨리 쌓이면 오래된 줄은 화면에서 생략(파일에는 남음)
+    """
+
+    def __init__(self, path=None, max_lines=MAX_LINES, max_bytes=MAX_FILE_BYTES, backups=FILE_BACKUPS):
+        self.max_lines = max_lines
+        self.pending = deque(maxlen=max_lines)
+        self.dropped = 0
+        self.lock = threading.Lock()
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.file = None
+        self.size = 0
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._open()
+
+    def _open(self):
+        self.file = open(self.path, "a", encoding="utf-8")
+        self.size = self.file.tell()
+
+    def _rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            older = f"{self.path}.{i}"
+            if os.path.exists(older):
+                os.replace(older, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._open()
+
+    def write(self, message):
+        """로그 한 줄 추가 (어느 스레드에서나 호출 가능). 타임스탬프를 붙인 줄을 반환"""
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        line = f"[{timestamp}] {message}\n"
+        with self.lock:
+            if len(self.pending) == self.max_lines:
+                self.dropped += 1
+            self.pending.append(line)
+            if self.file is not None:
+                self.file.write(line)
+                self.size += len(line.encode("utf-8"))
+                if self.size >= self.max_bytes:
+                    self._rotate()
+        return line
+
+    def drain(self):
+        """쌓인 줄을 모두 꺼냄 -> (줄 목록, 화면에서 생략된 줄 수). 메인 루프에서 호출"""
+        with self.lock:
+            lines = list(self.pending)
+            self.pending.clear()
+            dropped, self.dropped = self.dropped, 0
+            if self.file is not None:
+                self.file.flush()
+        return lines, dropped
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+로컬 매니페스트 (경로, 크기, 수정 시각, MD5)
+yuniserver 옆의 .yunisync 폴더에 저장되며, 크기와 수정 시각이 그대로인 파일은
+이전 해시를 재사용하므로 변경된 파일만 다시 읽는다.
+"""
+
+import fnmatch
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from . import config, trace
+from .rclone import RcloneError, join
+
+FORMAT_VERSION = 1
+
+# 업로드마다 원격 .yunisync 폴더에 올리는 매니페스트 이름
+REMOTE_NAME = "manifest.json.gz"
+
+# 수정 시각이 스캔 시각과 이 값(ns) 이내인 파일은 다음 스캔에서 다시 해시한다.
+# (같은 시각 안에 다시 수정된 경우를 놓치지 않기 위함)
+RACY_WINDOW_NS = 2 * 1000 * 1000 * 1000
+
+READ_SIZE = 1024 * 1024
+
+
+# 폴더별로 나누기 전(.yunisync 바로 아래)에 기록하던 상태. 처음 접근할 때 폴더별 위치로 옮긴다.
+LEGACY_STATE = ("manifest.json.gz", "synced", "journal", "snapshot", "packs", "pulled", "tuning.json", "logs")
+
+_migrate_lock = threading.Lock()
+
+
+def meta_root(source):
+    """source 폴더 옆의 로컬 메타데이터 폴더 (.yunisync). 같은 상위 폴더의 서버 폴더들이 함께 쓴다."""
+    parent = os.path.dirname(os.path.abspath(source))
+    return os.path.join(parent, config.META_DIR)
+
+
+def state_dir(source):
+    """source 폴더의 로컬 상태 폴더 (.yunisync/<폴더 이름>)
+    같은 상위 폴더 아래 서버 폴더가 여러 개여도(srv/a, srv/b) 매니페스트, 기준 상태, 작업 기록이 섞이지 않는다."""
+    root = meta_root(source)
+    path = os.path.join(root, os.path.basename(os.path.abspath(source)))
+    if not os.path.isdir(path):
+        migrate_state(root, path)
+    return path
+
+
+def migrate_state(root, path):
+    """예전 위치(.yunisync 바로 아래)의 상태를 폴더별 위치로 옮김"""
+    with _migrate_lock:
+        if os.path.isdir(path):
+            return
+        legacy = [name for name in LEGACY_STATE if os.path.exists(os.path.join(root, name))]
+        os.makedirs(path, exist_ok=True)
+        for name in legacy:
+            try:
+                os.replace(os.path.join(root, name), os.path.join(path, name))
+            except OSError:
+                pass
+
+
+def manifest_path(source):
+    return os.path.join(state_dir(source), "manifest.json.gz")
+
+
+def remote_slug(remote):
+    """원격 경로를 파일 이름으로 쓸 수 있게 변환"""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", remote)
+
+
+def synced_path(source, remote):
+    """remote에 마지막으로 업로드된 상태를 기록한 매니페스트 경로"""
+    return os.path.join(state_dir(source), "synced", f"{remote_slug(remote)}.json.gz")
+
+
+def file_md5(path):
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        while True:
+            block = f.read(READ_SIZE)
+            if not block:
+                break
+            md5.update(block)
+    return md5.hexdigest()
+
+
+def is_excluded(name, excludes):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in excludes)
+
+
+class Manifest:
+    """경로 -> [크기, 수정 시각(ns), MD5] 매핑"""
+
+    def __init__(self, entries=None, created_ns=0):
+        self.entries = entries if entries is not None else {}
+        self.created_ns = created_ns
+
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def total_bytes(self):
+        return sum(entry[0] for entry in self.entries.values())
+
+    def to_dict(self):
+        return {
+            "version": FORMAT_VERSION,
+            "created_ns": self.created_ns,
+            "files": self.entries,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 매니페스트 버전: {data.get('version')}")
+        return cls({path: list(entry) for path, entry in data["files"].items()},
+                   data.get("created_ns", 0))
+
+    def dumps(self):
+        return gzip.compress(json.dumps(self.to_dict(), separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def loads(cls, blob):
+        return cls.from_dict(json.loads(gzip.decompress(blob).decode("utf-8")))
+
+    def save(self, path):
+        """임시 파일에 쓴 뒤 교체 (중단되어도 이전 매니페스트가 남음)
+        같은 폴더를 여러 작업이 동시에 갱신할 수 있으므로 임시 파일 이름은 스레드마다 다르게 한다."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self.dumps())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """매니페스트 읽기 (없거나 손상되었으면 None)"""
+        try:
+            with open(path, "rb") as f:
+                return cls.loads(f.read())
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+
+
+class RemoteManifest(Manifest):
+    """업로드 때 원격에 올리는 매니페스트
+
+    layout: 원격 저장 방식. files(일반 파일), snapshot(청크 스냅샷), pack(묶음 + 큰 파일)
+    일반 파일로 받을 때의 검증은 layout이 files인 경우에만 사용한다.
+    """
+
+    def __init__(self, entries=None, created_ns=0, layout="files"):
+        super().__init__(entries, created_ns)
+        self.layout = layout
+
+    def to_dict(self):
+        data = super().to_dict()
+        data["layout"] = self.layout
+        data["total_bytes"] = self.total_bytes
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        manifest = super().from_dict(data)
+        manifest.layout = data.get("layout", "files")
+        return manifest
+
+
+def remote_manifest_path(remote):
+    return join(remote, f"{config.META_DIR}/{REMOTE_NAME}")
+
+
+def publish(rclone, manifest, remote, layout="files"):
+    """업로드가 끝난 상태를 원격 매니페스트로 기록 (rclone 호출 1회)"""
+    published = RemoteManifest(manifest.entries, manifest.created_ns, layout)
+    with trace.span("publish", files=len(published)):
+        rclone.rcat(remote_manifest_path(remote), published.dumps())
+    return published
+
+
+def fetch_remote(rclone, remote):
+    """원격 매니페스트 읽기 (없거나 손상되었으면 None)"""
+    try:
+        with trace.span("preflight.remote-manifest"):
+            return RemoteManifest.loads(rclone.cat(remote_manifest_path(remote)))
+    except (RcloneError, ValueError, KeyError, EOFError, OSError):
+        return None
+
+
+def unpublish(rclone, remote):
+    """매니페스트 없이 올린 경우 이전 매니페스트가 남지 않도록 삭제"""
+    try:
+        rclone.run(["deletefile", remote_manifest_path(remote)])
+    except RcloneError:
+        pass
+
+
+class ScanStats:
+    def __init__(self):
+        self.files = 0
+        self.hashed = 0
+        self.hashed_bytes = 0
+        self.seconds = 0.0
+
+
+def walk(root, excludes=None):
+    """root 아래의 일반 파일을 (상대 경로, stat) 형태로 나열 (심볼릭 링크 제외)"""
+    excludes = config.EXCLUDES if excludes is None else excludes
+    stack = [""]
+    while stack:
+        rel_dir = stack.pop()
+        abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+        try:
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            continue
+        for entry in entries:
+            rel = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            if entry.is_symlink():
+                continue
+            if entry.is_dir():
+                if rel != config.META_DIR:
+                    stack.append(rel)
+            elif entry.is_file() and not is_excluded(entry.name, excludes):
+                yield rel, entry.stat()
+
+
+def scan(root, previous=None, excludes=None):
+    """root를 스캔해 새 매니페스트 생성. 크기/수정 시각이 같은 파일은 previous의 해시를 재사용한다."""
+    started = time.time()
+    created_ns = time.time_ns()
+    old = previous.entries if previous is not None else {}
+    racy_limit = previous.created_ns - RACY_WINDOW_NS if previous is not None else 0
+    stats = ScanStats()
+    entries = {}
+
+    with trace.span("preflight.scan") as span:
+        for rel, st in walk(root, excludes):
+            stats.files += 1
+            entry = old.get(rel)
+            if (entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns
+                    and st.st_mtime_ns < racy_limit):
+                entries[rel] = entry
+                continue
+            try:
+                digest = file_md5(os.path.join(root, rel))
+            except OSError:
+                continue
+            stats.hashed += 1
+            stats.hashed_bytes += st.st_size
+            entries[rel] = [st.st_size, st.st_mtime_ns, digest]
+        span.set(files=stats.files, hashed=stats.hashed, bytes=stats.hashed_bytes)
+
+    stats.seconds = time.time() - started
+    return Manifest(entries, created_ns), stats
+
+
+def diff(current, baseline):
+    """baseline 대비 (변경/추가된 경로, 삭제된 경로) 반환. 내용(크기, 해시)이 같으면 변경으로 보지 않는다."""
+    changed = []
+    for path, entry in current.entries.items():
+        base = baseline.entries.get(path)
+        if base is None or base[0] != entry[0] or base[2] != entry[2]:
+            changed.append(path)
+    deleted = [path for path in baseline.entries if path not in current.entries]
+    changed.sort()
+    deleted.sort()
+    return changed, deleted
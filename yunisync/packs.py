@@ -0,0 +1,354 @@
+# -*- coding: utf-8 -*-
+"""
+작은 파일 묶음(pack) 전송
+Google Drive는 파일당 비용이 크므로, 작은 설정/플레이어 데이터 파일을 크기 제한이 있는
+압축 묶음으로 만들어 전송한다. 묶음 생성과 압축 해제는 여러 프로세스에서 병렬로 처리하고,
+큰 파일은 기존처럼 rclone sync로 직접 전송한다.
+
+- 압축: zstandard 모듈이 있으면 zstd, 없으면 gzip
+- 묶음 경계는 경로 해시로 정해지므로 파일이 추가/삭제되어도 주변 묶음만 바뀐다.
+- 묶음 이름은 구성 파일의 (경로, 크기, 수정 시각, MD5) 해시라 바뀌지 않은 묶음은 다시 올리지 않는다.
+"""
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import tarfile
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+
+from . import config, console
+from .manifest import publish, remote_slug, state_dir
+from .pipeline import is_copied
+from .rclone import RcloneError, exclude_flags, join, transfer_flags
+from .upload import refresh_manifest
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+FORMAT_VERSION = 1
+
+PACK_DIR = "packs"
+INDEX_NAME = "index.json.gz"
+
+# 이 크기 미만의 파일만 묶음으로 전송
+SMALL_FILE_LIMIT = 1024 * 1024
+# 묶음 하나의 최대 원본 크기
+PACK_MAX_BYTES = 32 * 1024 * 1024
+# 경로 해시가 이 값으로 나누어떨어지면 묶음을 끊는다 (평균 약 256개 파일)
+PACK_ANCHOR = 256
+
+ZSTD_LEVEL = 3
+GZIP_LEVEL = 6
+
+
+def meta_remote(remote):
+    return join(remote, f"{config.META_DIR}/{PACK_DIR}")
+
+
+def cache_dir(source, remote):
+    return os.path.join(state_dir(source), "packs", remote_slug(remote))
+
+
+def pack_suffix():
+    return ".tar.zst" if zstandard is not None else ".tar.gz"
+
+
+def compress(data):
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return gzip.compress(data, GZIP_LEVEL)
+
+
+def decompress(name, blob):
+    if name.endswith(".tar.zst"):
+        if zstandard is None:
+            raise RuntimeError("zstd 묶음을 풀려면 zstandard 모듈이 필요합니다. (pip install zstandard)")
+        return zstandard.ZstdDecompressor().decompressobj().decompress(blob)
+    return gzip.decompress(blob)
+
+
+def group_files(entries):
+    """작은 파일을 묶음 단위로 나눔. entries: 경로 -> [크기, 수정 시각, MD5]"""
+    groups = []
+    current = []
+    current_bytes = 0
+    for path in sorted(entries):
+        size = entries[path][0]
+        if size >= SMALL_FILE_LIMIT:
+            continue
+        if current and current_bytes + size > PACK_MAX_BYTES:
+            groups.append(current)
+            current, current_bytes = [], 0
+        current.append(path)
+        current_bytes += size
+        if zlib.crc32(path.encode("utf-8")) % PACK_ANCHOR == 0:
+            groups.append(current)
+            current, current_bytes = [], 0
+    if current:
+        groups.append(current)
+    return groups
+
+
+def pack_name(paths, entries):
+    digest = hashlib.sha256()
+    for path in paths:
+        size, mtime_ns, md5 = entries[path][:3]
+        digest.update(f"{path}\0{size}\0{mtime_ns}\0{md5}\n".encode("utf-8"))
+    return digest.hexdigest()[:32] + pack_suffix()
+
+
+def build_pack(source, paths, out_path):
+    """파일 목록을 tar로 묶어 압축 저장 (작업 프로세스에서 실행). (파일 수, 원본 크기, 압축 크기) 반환"""
+    buf = io.BytesIO()
+    raw_bytes = 0
+    with tarfile.open(fileobj=buf, mode="w", format=tarfile.PAX_FORMAT) as tar:
+        for path in paths:
+            abs_path = os.path.join(source, path)
+            info = tar.gettarinfo(abs_path, arcname=path)
+            info.uid = info.gid = 0
+            info.uname = info.gname = ""
+            with open(abs_path, "rb") as f:
+                tar.addfile(info, f)
+            raw_bytes += info.size
+    blob = compress(buf.getvalue())
+    with open(out_path + ".tmp", "wb") as f:
+        f.write(blob)
+    os.replace(out_path + ".tmp", out_path)
+    return len(paths), raw_bytes, len(blob)
+
+
+def safe_target(root, name):
+    """압축 해제 대상 경로 (root 밖을 가리키면 None)"""
+    if name.startswith("/") or "\\" in name or ".." in name.split("/"):
+        return None
+    return os.path.join(root, *name.split("/"))
+
+
+def extract_pack(pack_path, target_root, only=None):
+    """묶음을 풀어 target_root에 기록 (작업 프로세스에서 실행). 기록한 상대 경로 목록 반환
+    only: 이 경로들만 풀기 (선택 복원)"""
+    with open(pack_path, "rb") as f:
+        data = decompress(pack_path, f.read())
+    written = []
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r") as tar:
+        for info in tar:
+            if not info.isfile() or (only is not None and info.name not in only):
+                continue
+            target = safe_target(target_root, info.name)
+            if target is None:
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = target + ".yunisync-tmp"
+            with tar.extractfile(info) as src, open(tmp_path, "wb") as out:
+                shutil.copyfileobj(src, out)
+            os.utime(tmp_path, (info.mtime, info.mtime))
+            os.replace(tmp_path, target)
+            if os.name == "posix":
+                mode = info.mode & 0o777
+                if target.endswith(config.EXEC_SUFFIXES):
+                    mode |= 0o111
+                os.chmod(target, mode)
+            written.append(info.name)
+    return written
+
+
+class PackIndex:
+    """묶음 목록: 묶음 이름 -> 경로 목록, 경로 -> [크기, 수정 시각, MD5, 묶음 이름]"""
+
+    def __init__(self, packs=None, files=None, created=None):
+        self.packs = packs if packs is not None else {}
+        self.files = files if files is not None else {}
+        self.created = created or time.strftime("%Y-%m-%d %H:%M:%S")
+
+    def dumps(self):
+        data = {"version": FORMAT_VERSION, "created": self.created, "limit": SMALL_FILE_LIMIT,
+                "packs": self.packs, "files": self.files}
+        return gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def loads(cls, blob):
+        data = json.loads(gzip.decompress(blob).decode("utf-8"))
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 묶음 목록 버전: {data.get('version')}")
+        return cls(data["packs"], data["files"], data.get("created"))
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "rb") as f:
+                return cls.loads(f.read())
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(self.dumps())
+        os.replace(path + ".tmp", path)
+
+
+def fetch_index(rclone, remote):
+    try:
+        return PackIndex.loads(rclone.cat(join(meta_remote(remote), INDEX_NAME)))
+    except RcloneError:
+        return None
+
+
+def large_file_flags():
+    """묶음에 포함되지 않는 큰 파일만 대상으로 하는 rclone 필터"""
+    return [f"--min-size={SMALL_FILE_LIMIT}B"]
+
+
+class PackStats:
+    def __init__(self):
+        self.packs = 0
+        self.files = 0
+        self.raw_bytes = 0
+        self.packed_bytes = 0
+
+
+def push(rclone, source=config.SERVER_DIR, remote=config.REMOTE, workers=None, sync_large=True, read_root=None):
+    """작은 파일은 묶음으로, 큰 파일은 rclone sync로 업로드
+    read_root가 있으면 파일은 그 폴더(시점 고정 복사본)에서 읽고, 묶음 캐시는 source 기준으로 둔다."""
+    read_root = read_root or source
+    manifest = refresh_manifest(source, read_root)
+    cache = cache_dir(source, remote)
+    index_path = os.path.join(cache, INDEX_NAME)
+    previous = PackIndex.load(index_path) or fetch_index(rclone, remote) or PackIndex()
+
+    index = PackIndex()
+    todo = []
+    for paths in group_files(manifest.entries):
+        name = pack_name(paths, manifest.entries)
+        index.packs[name] = paths
+        for path in paths:
+            index.files[path] = manifest.entries[path][:3] + [name]
+        if name not in previous.packs:
+            todo.append((name, paths))
+
+    staging = os.path.join(cache, "staging")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    stats = PackStats()
+    console.info(f"묶음 {len(index.packs)}개 중 새 묶음 {len(todo)}개 생성 중...")
+    if todo:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(build_pack, read_root, paths, os.path.join(staging, name))
+                       for name, paths in todo]
+            for future in futures:
+                files, raw_bytes, packed_bytes = future.result()
+                stats.packs += 1
+                stats.files += files
+                stats.raw_bytes += raw_bytes
+                stats.packed_bytes += packed_bytes
+        console.info(f"파일 {stats.files}개 ({stats.raw_bytes / 1024 / 1024:.1f} MB) -> "
+                     f"묶음 {stats.packs}개 ({stats.packed_bytes / 1024 / 1024:.1f} MB)")
+        rclone.transfer("copy", staging, meta_remote(remote),
+                        transfer_flags() + ["--no-check-dest", "--no-traverse"])
+
+    if sync_large:
+        console.info("큰 파일 동기화 중...")
+        rclone.transfer("sync", read_root, remote, transfer_flags() + exclude_flags() + large_file_flags())
+
+    # 새 묶음과 큰 파일이 모두 올라간 뒤 목록을 교체하고, 쓰이지 않는 묶음을 지운다
+    rclone.rcat(join(meta_remote(remote), INDEX_NAME), index.dumps())
+    unused = [name for name in previous.packs if name not in index.packs]
+    rclone.delete_files(meta_remote(remote), unused)
+    publish(rclone, manifest, remote, layout="pack")
+
+    index.save(index_path)
+    shutil.rmtree(staging, ignore_errors=True)
+    console.success(f"묶음 업로드 완료 (새 묶음 {stats.packs}개, 삭제 {len(unused)}개)")
+    return index, stats
+
+
+def pull(rclone, source=config.SERVER_DIR, remote=config.REMOTE, workers=None, sync_large=True):
+    """묶음을 받아 병렬로 풀고, 큰 파일은 rclone sync로 다운로드"""
+    index = fetch_index(rclone, remote)
+    if index is None:
+        raise ValueError("원격에 묶음 목록이 없습니다. 먼저 --pack 모드로 업로드해주세요.")
+    os.makedirs(source, exist_ok=True)
+    local = refresh_manifest(source)
+
+    # 로컬과 내용이 다른 파일이 들어 있는 묶음만 받는다
+    needed = set()
+    for path, entry in index.files.items():
+        current = local.entries.get(path)
+        if current is None or current[0] != entry[0] or current[2] != entry[2]:
+            needed.add(entry[3])
+    console.info(f"묶음 {len(index.packs)}개 중 {len(needed)}개 다운로드 중...")
+
+    download_dir = os.path.join(cache_dir(source, remote), "download")
+    shutil.rmtree(download_dir, ignore_errors=True)
+    os.makedirs(download_dir)
+    stats = PackStats()
+    if needed:
+        # 묶음이 도착하는 대로 작업 프로세스에서 압축 해제
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {}
+
+            def on_event(event):
+                name = event.get("object")
+                if is_copied(event) and name in needed and name not in futures:
+                    futures[name] = pool.submit(extract_pack, os.path.join(download_dir, name), source)
+
+            rclone.stream("copy", meta_remote(remote), download_dir, transfer_flags(),
+                          files=sorted(needed), on_event=on_event)
+            for name in sorted(needed - set(futures)):
+                futures[name] = pool.submit(extract_pack, os.path.join(download_dir, name), source)
+            for future in futures.values():
+                stats.files += len(future.result())
+                stats.packs += 1
+    shutil.rmtree(download_dir, ignore_errors=True)
+
+    # 원격에서 사라진 작은 파일 정리 (큰 파일은 sync가 처리)
+    for path, entry in local.entries.items():
+        if entry[0] < SMALL_FILE_LIMIT and path not in index.files:
+            try:
+                os.remove(os.path.join(source, path))
+            except OSError:
+                pass
+
+    if sync_large:
+        console.info("큰 파일 동기화 중...")
+        rclone.transfer("sync", remote, source, transfer_flags() + [f"--exclude=/{config.META_DIR}/**"]
+                        + large_file_flags())
+    console.success(f"묶음 {stats.packs}개에서 파일 {stats.files}개 복원")
+    return index, stats
+
+
+def restore_paths(rclone, source, remote, paths, workers=None):
+    """일부 파일만 복원 (선택 복원). 작은 파일은 들어 있는 묶음만 받아 해당 파일만 풀고, 큰 파일은 직접 받는다.
+    복원한 파일 수 반환"""
+    index = fetch_index(rclone, remote)
+    if index is None:
+        raise ValueError("원격에 묶음 목록이 없습니다.")
+    small = {path for path in paths if path in index.files}
+    large = sorted(path for path in paths if path not in index.files)
+    needed = sorted({index.files[path][3] for path in small})
+    restored = 0
+    if needed:
+        console.info(f"묶음 {len(needed)}개에서 파일 {len(small)}개 복원 중...")
+        download_dir = os.path.join(cache_dir(source, remote), "download")
+        shutil.rmtree(download_dir, ignore_errors=True)
+        os.makedirs(download_dir)
+        rclone.transfer("copy", meta_remote(remote), download_dir, transfer_flags(), files=needed)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(extract_pack, os.path.join(download_dir, name), source, small)
+                       for name in needed]
+            for future in futures:
+                restored += len(future.result())
+        shutil.rmtree(download_dir, ignore_errors=True)
+    if large:
+        console.info(f"큰 파일 {len(large)}개 다운로드 중...")
+        rclone.transfer("copy", remote, source, transfer_flags(), files=large)
+        restored += len(large)
+    return restored
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+스트리밍 복원 파이프라인
+rclone이 파일 하나를 다 받을 때마다 실행 권한 부여와 크기/해시 검증을 바로 처리한다.
+다운로드가 끝나는 시점에 복원도 끝나므로, 별도의 find/chmod 단계가 필요 없다.
+"""
+
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+
+from . import config, console, trace
+from .manifest import file_md5, walk
+from .rclone import is_copied, transfer_flags
+
+WORKERS = 8
+# 수정 시각 비교 허용 오차 (Google Drive는 밀리초 단위로 저장)
+MTIME_TOLERANCE_NS = 1000 * 1000 * 1000
+
+
+def needs_exec(name):
+    return name.endswith(config.EXEC_SUFFIXES)
+
+
+def make_executable(path):
+    """실행 권한 부여 (이미 있으면 건너뜀)"""
+    if os.name != "posix":
+        return
+    mode = os.stat(path).st_mode
+    wanted = mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH
+    if mode != wanted:
+        os.chmod(path, stat.S_IMODE(wanted))
+
+
+class RestorePipeline:
+    """다운로드된 파일을 작업 스레드에서 후처리 (실행 권한, 크기/MD5 검증)
+
+    expected: 경로 -> [크기, 수정 시각, MD5, ...] (없으면 검증 생략)
+    targets: 이번에 받을 파일 목록 (일부만 받을 때. 없으면 트리 전체)
+
+    공유 rcd 데몬 작업은 완료 목록(core/transferred)에 최근 항목만 남아 완료 이벤트가 빠질 수 있다.
+    그런 전송이면 close()에서 이벤트를 받지 못한 파일도 권한을 정리하고, 빠진 전송이 있으면 검증한다.
+    """
+
+    def __init__(self, root, expected=None, workers=WORKERS, targets=None):
+        self.root = root
+        self.expected = expected
+        self.targets = targets
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.futures = []
+        self.applied = 0
+        self.mismatches = []
+        self.seen = set()
+        self.lossy = False
+        self.incomplete = False
+
+    def submit(self, func, *args):
+        """임의의 후처리 작업 추가"""
+        self.futures.append(self.pool.submit(func, *args))
+
+    def submit_file(self, rel):
+        self.seen.add(rel)
+        self.submit(self.apply, rel)
+
+    def apply(self, rel):
+        path = os.path.join(self.root, rel)
+        if needs_exec(rel):
+            make_executable(path)
+        entry = self.expected.get(rel) if self.expected is not None else None
+        if entry is None:
+            return None
+        size = os.path.getsize(path)
+        if size != entry[0]:
+            return f"{rel}: 크기 불일치 ({size} != {entry[0]})"
+        if entry[2] and file_md5(path) != entry[2]:
+            return f"{rel}: MD5 불일치"
+        return None
+
+    def on_event(self, event):
+        """Rclone.stream()의 on_event로 사용"""
+        if event.get("rcd"):
+            self.lossy = True
+            self.incomplete = self.incomplete or bool(event.get("incomplete"))
+        if is_copied(event):
+            self.submit_file(event["object"])
+        elif event.get("level") == "error":
+            console.error(event.get("msg", ""))
+
+    def close(self):
+        """남은 작업을 모두 기다리고 (처리 수, 불일치 목록) 반환"""
+        if self.lossy:
+            self.recheck()
+        with trace.span("postprocess.wait", files=len(self.futures)):
+            for future in self.futures:
+                try:
+                    problem = future.result()
+                except (OSError, ValueError) as e:
+                    problem = str(e)
+                self.applied += 1
+                if problem:
+                    self.mismatches.append(problem)
+            self.futures = []
+            self.pool.shutdown()
+        return self.applied, self.mismatches
+
+
+    def recheck(self):
+        """완료 이벤트를 받지 못한 파일 후처리. 빠진 전송이 있으면 크기/MD5까지 검증하고, 아니면 권한만 정리"""
+        if self.targets is None:
+            fix_modes(self.root)
+            candidates = self.expected if self.incomplete and self.expected is not None else ()
+        else:
+            candidates = self.targets
+        for rel in candidates:
+            path = os.path.join(self.root, rel)
+            if rel in self.seen or not os.path.isfile(path):
+                continue
+            if self.incomplete:
+                self.submit_file(rel)
+            elif needs_exec(rel):
+                make_executable(path)
+
+
+def fix_modes(root):
+    """기존 파일 중 실행 권한이 빠진 .sh/.jar/.exe 파일 정리 (프로세스 생성 없이 stat만 사용)"""
+    fixed = 0
+    with trace.span("postprocess.modes") as span:
+        for rel, st in walk(root, excludes=[]):
+            if needs_exec(rel) and os.name == "posix" and not st.st_mode & stat.S_IXUSR:
+                make_executable(os.path.join(root, rel))
+                fixed += 1
+        span.set(files=fixed)
+    return fixed
+
+
+def check_tree(root, manifest):
+    """다운로드 후 로컬 트리를 매니페스트와 비교 (stat만 사용). 문제 목록 반환"""
+    problems = []
+    seen = set()
+    with trace.span("verify.tree") as span:
+        for rel, st in walk(root):
+            entry = manifest.entries.get(rel)
+            if entry is None:
+                problems.append(f"{rel}: 원격 매니페스트에 없는 파일")
+                continue
+            seen.add(rel)
+            if st.st_size != entry[0]:
+                problems.append(f"{rel}: 크기 불일치 ({st.st_size} != {entry[0]})")
+        for rel in manifest.entries:
+            if rel not in seen:
+                problems.append(f"{rel}: 받지 못한 파일")
+        span.set(files=len(seen))
+    return problems
+
+
+def stream_download(rclone, remote=config.REMOTE, source=config.SERVER_DIR, expected=None, journal=None):
+    """rclone sync와 후처리를 동시에 실행. (처리한 파일 수, 불일치 목록) 반환
+    journal이 있으면 받은 파일을 작업 기록에 남긴다."""
+    existed = os.path.isdir(source)
+    pipeline = RestorePipeline(source, expected)
+
+    def on_event(event):
+        pipeline.on_event(event)
+        if journal is not None:
+            journal.on_event(event)
+
+    try:
+        rclone.stream("sync", remote, source,
+                      transfer_flags() + [f"--exclude=/{config.META_DIR}/**"],
+                      on_event=on_event)
+    finally:
+        applied, mismatches = pipeline.close()
+    # 이번에 받지 않은 기존 파일은 권한만 확인 (rcd 데몬 전송이면 close()에서 이미 확인)
+    if existed and not pipeline.lossy:
+        fix_modes(source)
+    return applied, mismatches
+
+
+def resume_download(rclone, remote=config.REMOTE, source=config.SERVER_DIR):
+    """중단된 다운로드 이어하기. (처리한 파일 수, 불일치 목록) 반환
+    원격 매니페스트가 있으면 로컬에 없거나 다른 파일만 받고, 원격에 없는 로컬 파일은 지운다. (원격 목록 조회 없음)"""
+    from .journal import Journal
+    from .manifest import fetch_remote
+    journal = Journal.open(source, "sync-down", remote, resume=True, root=source)
+    try:
+        manifest = fetch_remote(rclone, remote)
+        if manifest is None or manifest.layout != "files":
+            console.info("원격 매니페스트가 없어 전체 sync로 이어갑니다. (이미 받은 파일은 rclone이 건너뜀)")
+            result = stream_download(rclone, remote, source, journal=journal)
+        else:
+            result = download_missing(rclone, remote, source, manifest, journal)
+    except BaseException:
+        journal.close()
+        raise
+    journal.finish()
+    return result
+
+
+def download_missing(rclone, remote, source, manifest, journal):
+    local = dict(walk(source, excludes=[])) if os.path.isdir(source) else {}
+    missing = []
+    for rel, entry in manifest.entries.items():
+        st = local.get(rel)
+        # 받은 파일의 수정 시각은 원격(업로드 당시 로컬) 값이므로 크기/수정 시각이 같으면 받은 것으로 본다
+        if st is not None and (journal.is_done(rel, st.st_size, st.st_mtime_ns) or (
+                st.st_size == entry[0] and abs(st.st_mtime_ns - entry[1]) < MTIME_TOLERANCE_NS)):
+            continue
+        missing.append(rel)
+    extra = sorted(rel for rel in local if rel not in manifest.entries)
+    console.info(f"남은 파일: {len(missing)}개, 지울 파일: {len(extra)}개 (원격 {len(manifest)}개)")
+
+    pipeline = RestorePipeline(source, manifest.entries, targets=missing)
+
+    def on_event(event):
+        pipeline.on_event(event)
+        journal.on_event(event)
+
+    try:
+        if missing:
+            rclone.stream("copy", remote, source, transfer_flags(), files=sorted(missing), on_event=on_event)
+    finally:
+        applied, mismatches = pipeline.close()
+    for rel in extra:
+        try:
+            os.remove(os.path.join(source, rel))
+        except OSError:
+            pass
+    fix_modes(source)
+    return applied, mismatches
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+전송 진행률 / 처리량 측정
+rclone의 JSON 통계(--use-json-log의 "stats" 또는 rc core/stats)를 받아
+바이트/초, 파일/초, 남은 시간, 전송 중인 파일, 검사 수, 오류 수를 계산한다.
+같은 값을 GUI 표시, 콘솔 한 줄 표시, JSONL 측정 파일에 함께 사용한다.
+"""
+
+import json
+import os
+import socket
+import sys
+import time
+
+# 콘솔이 아닐 때(로그 파일로 리다이렉트 등) 진행률 출력 간격
+PLAIN_INTERVAL = 10.0
+
+
+def format_bytes(n):
+    if n < 1024:
+        return f"{int(n)} B"
+    for unit in ("KB", "MB", "GB"):
+        n /= 1024.0
+        if n < 1024 or unit == "GB":
+            return f"{n:.1f} {unit}"
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "-"
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+    return f"{seconds // 60}:{seconds % 60:02d}"
+
+
+class Progress:
+    """특정 시점의 진행 상태 (여러 rclone 실행에 걸친 누적값)"""
+
+    def __init__(self):
+        self.elapsed = 0.0
+        self.bytes = 0
+        self.total_bytes = 0
+        self.files = 0
+        self.total_files = 0
+        self.checks = 0
+        self.total_checks = 0
+        self.errors = 0
+        self.bytes_per_sec = 0.0
+        self.files_per_sec = 0.0
+        self.eta = None
+        self.in_flight = []
+
+    @property
+    def percent(self):
+        if self.total_bytes:
+            return min(100.0, self.bytes * 100.0 / self.total_bytes)
+        if self.total_files:
+            return min(100.0, self.files * 100.0 / self.total_files)
+        return 0.0
+
+    def to_dict(self):
+        return {
+            "elapsed": round(self.elapsed, 3),
+            "bytes": self.bytes,
+            "total_bytes": self.total_bytes,
+            "bytes_per_sec": round(self.bytes_per_sec, 1),
+            "files": self.files,
+            "total_files": self.total_files,
+            "files_per_sec": round(self.files_per_sec, 2),
+            "checks": self.checks,
+            "total_checks": self.total_checks,
+            "errors": self.errors,
+            "eta": self.eta,
+            "in_flight": len(self.in_flight),
+            "percent": round(self.percent, 1),
+        }
+
+    def format(self):
+        """한 줄 요약 (GUI 상태 표시 / 콘솔 출력용)"""
+        return (f"{self.percent:5.1f}% {format_bytes(self.bytes)}/{format_bytes(self.total_bytes)} "
+                f"{format_bytes(self.bytes_per_sec)}/s, 파일 {self.files}/{self.total_files} "
+                f"({self.files_per_sec:.1f}개/s), 검사 {self.checks}, 오류 {self.errors}, "
+                f"전송 중 {len(self.in_flight)}, 남은 시간 {format_eta(self.eta)}")
+
+
+class MetricsWriter:
+    """JSONL 측정 파일 기록기 (한 줄에 한 기록, 추가 모드)"""
+
+    def __init__(self, path, operation, remote=None):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.file = open(path, "a", encoding="utf-8")
+        self.base = {
+            "host": socket.gethostname(),
+            "operation": operation,
+            "remote": remote,
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    def write(self, record):
+        line = dict(self.base, time=round(time.time(), 3), **record)
+        self.file.write(json.dumps(line, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class ProgressTracker:
+    """rclone 이벤트를 받아 Progress를 갱신하고 on_update / 측정 파일로 전달
+
+    on_event()를 Rclone.stream() 또는 전송 계층 sync()의 on_event로 넘기면 된다.
+    한 작업에서 rclone을 여러 번 실행하면 begin()으로 단계를 나눠 값을 누적한다.
+    """
+
+    def __init__(self, operation="sync", remote=None, metrics_path=None, on_update=None):
+        self.progress = Progress()
+        self.on_update = on_update
+        self.metrics = MetricsWriter(metrics_path, operation, remote) if metrics_path else None
+        self.started = time.time()
+        self._base = Progress()
+        self._phase = None
+        self.updates = 0
+
+    def begin(self, phase=None):
+        """새 rclone 실행 시작. 이전 실행의 값을 누적값으로 옮긴다."""
+        current, base = self.progress, self._base
+        for name in ("bytes", "total_bytes", "files", "total_files", "checks", "total_checks", "errors"):
+            setattr(base, name, getattr(current, name))
+        self._phase = phase
+
+    def end(self):
+        """rclone 실행 종료 (콘솔 표시 줄 마무리)"""
+        finish = getattr(self.on_update, "finish", None)
+        if finish is not None:
+            finish()
+
+    def on_event(self, event):
+        stats = event.get("stats")
+        if stats:
+            self.update(stats)
+
+    def update(self, stats):
+        """rclone 통계(dict)로 진행 상태 갱신"""
+        p, base = self.progress, self._base
+        self.updates += 1
+        p.elapsed = time.time() - self.started
+        p.bytes = base.bytes + int(stats.get("bytes") or 0)
+        p.total_bytes = base.total_bytes + int(stats.get("totalBytes") or 0)
+        p.files = base.files + int(stats.get("transfers") or 0)
+        p.total_files = base.total_files + int(stats.get("totalTransfers") or 0)
+        p.checks = base.checks + int(stats.get("checks") or 0)
+        p.total_checks = base.total_checks + int(stats.get("totalChecks") or 0)
+        p.errors = base.errors + int(stats.get("errors") or 0)
+        p.in_flight = [t.get("name", "") for t in stats.get("transferring") or []]
+        p.bytes_per_sec = float(stats.get("speed") or 0.0)
+        p.files_per_sec = p.files / p.elapsed if p.elapsed > 0 else 0.0
+        eta = stats.get("eta")
+        p.eta = int(eta) if isinstance(eta, (int, float)) else None
+        if self.metrics is not None:
+            record = p.to_dict()
+            if self._phase:
+                record["phase"] = self._phase
+            self.metrics.write(record)
+        if self.on_update is not None:
+            self.on_update(p)
+
+    def close(self, ok=True):
+        """최종 기록 (평균 처리량) 후 측정 파일 닫기"""
+        p = self.progress
+        p.elapsed = time.time() - self.started
+        if p.elapsed > 0:
+            p.files_per_sec = p.files / p.elapsed
+            p.bytes_per_sec = p.bytes / p.elapsed
+        p.eta = 0 if ok else p.eta
+        p.in_flight = []
+        if self.metrics is not None:
+            # 전송이 없던 명령(목록 조회 등)은 기록하지 않음
+            if self.updates:
+                self.metrics.write(dict(p.to_dict(), final=True, ok=ok))
+            self.metrics.close()
+            self.metrics = None
+        return p
+
+
+class ConsoleProgress:
+    """콘솔 한 줄 진행률 표시 (터미널이면 같은 줄 갱신, 아니면 일정 간격 출력)"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.tty = self.stream.isatty()
+        self.last = 0.0
+        self.width = 0
+
+    def __call__(self, progress):
+        line = progress.format()
+        if self.tty:
+            self.stream.write("\r" + line.ljust(self.width))
+            self.width = len(line)
+        elif time.time() - self.last >= PLAIN_INTERVAL:
+            self.stream.write(line + "\n")
+            self.last = time.time()
+        self.stream.flush()
+
+    def finish(self):
+        if self.tty and self.width:
+            self.stream.write("\n")
+            self.stream.flush()
+            self.width = 0
+
+
+def default_metrics_path():
+    """YUNISYNC_METRICS 환경 변수 (스크립트의 --metrics 옵션이 설정)"""
+    return os.environ.get("YUNISYNC_METRICS") or None
@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+"""
+rclone 원격 제어(rcd) 데몬 전송 계층
+rclone rcd를 한 번 띄워두고 상태 확인, 목록 조회, sync 작업을 HTTP API로 처리한다.
+매번 프로세스를 새로 띄우고 Google Drive 인증을 다시 하는 비용을 없앤다.
+데몬을 쓸 수 없으면 같은 인터페이스의 하위 프로세스 방식으로 동작한다.
+
+- 실행 중인 데몬 정보는 .yunisync/rcd.json에 기록되어 스크립트와 GUI가 함께 사용한다.
+- 로컬 폴더 경로도 원격처럼 쓸 수 있으므로 Google Drive 없이 시험할 수 있다.
+"""
+
+import base64
+import json
+import os
+import secrets
+import socket
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from . import config, console, trace
+from .manifest import meta_root
+from .rclone import Rclone, RcloneError, fs_path, transfer_flags
+
+START_TIMEOUT = 15.0
+POLL_INTERVAL = 0.5
+
+
+def daemon_info_path(source=config.SERVER_DIR):
+    # 데몬은 호스트의 서버 폴더들이 함께 쓰므로 폴더별 상태가 아니라 .yunisync 바로 아래에 기록
+    return os.path.join(meta_root(source), "rcd.json")
+
+
+def rc_env(user, password):
+    """rc 인증 정보를 넣은 하위 프로세스 환경 변수.
+    명령줄(--rc-pass)로 넘기면 같은 호스트의 다른 사용자가 ps나 /proc/<pid>/cmdline으로 읽을 수 있다."""
+    return dict(os.environ, RCLONE_RC_USER=user, RCLONE_RC_PASS=password)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class RcloneDaemon:
+    """rclone rcd 프로세스와 HTTP API 클라이언트"""
+
+    def __init__(self, addr, user, password, process=None, pid=None):
+        self.addr = addr
+        self.user = user
+        self.password = password
+        self.process = process
+        self.pid = pid if pid is not None else (process.pid if process else None)
+
+    @classmethod
+    def start(cls, binary="rclone"):
+        """새 rcd 프로세스를 띄우고 응답할 때까지 대기"""
+        addr = f"127.0.0.1:{free_port()}"
+        user = "yunisync"
+        password = secrets.token_hex(16)
+        cmd = [binary, "rcd", f"--rc-addr={addr}"]
+        try:
+            process = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                       env=rc_env(user, password))
+        except FileNotFoundError:
+            raise RcloneError(["rcd"], 127, "rclone을 찾을 수 없습니다.")
+        daemon = cls(addr, user, password, process)
+        deadline = time.time() + START_TIMEOUT
+        while time.time() < deadline:
+            if process.poll() is not None:
+                raise RcloneError(["rcd"], process.returncode, "rclone rcd가 종료되었습니다.")
+            if daemon.alive():
+                return daemon
+            time.sleep(0.1)
+        daemon.stop()
+        raise RcloneError(["rcd"], 1, "rclone rcd 응답 시간 초과")
+
+    @classmethod
+    def connect(cls, path):
+        """기록된 데몬 정보로 연결 (응답이 없으면 None)"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+        except (OSError, ValueError):
+            return None
+        daemon = cls(info["addr"], info["user"], info["password"], pid=info.get("pid"))
+        return daemon if daemon.alive() else None
+
+    def save(self, path):
+        """접속 정보 기록. 비밀번호가 들어 있으므로 처음부터 소유자만 읽을 수 있는 파일(0600)로 만든 뒤 교체한다."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        try:
+            os.remove(tmp_path)
+        except FileNotFoundError:
+            pass
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"addr": self.addr, "user": self.user, "password": self.password, "pid": self.pid}, f)
+        os.replace(tmp_path, path)
+
+    def call(self, method, timeout=None, **params):
+        """rc API 호출. 실패하면 RcloneError"""
+        request = urllib.request.Request(
+            f"http://{self.addr}/{method}",
+            data=json.dumps(params).encode("utf-8"),
+            headers={"Content-Type": "application/json"},
+        )
+        token = base64.b64encode(f"{self.user}:{self.password}".encode("utf-8")).decode("ascii")
+        request.add_header("Authorization", f"Basic {token}")
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                return json.loads(response.read().decode("utf-8") or "{}")
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read().decode("utf-8")).get("error", str(e))
+            except ValueError:
+                message = str(e)
+            raise RcloneError([method], e.code, message)
+        except (urllib.error.URLError, OSError) as e:
+            raise RcloneError([method], 1, f"rcd 연결 실패: {e}")
+
+    def alive(self):
+        try:
+            self.call("rc/noop", timeout=2)
+            return True
+        except RcloneError:
+            return False
+
+    def stop(self):
+        try:
+            self.call("core/quit", timeout=2)
+        except RcloneError:
+            pass
+        if self.process is not None:
+            try:
+                self.process.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class SubprocessTransport:
+    """rclone 명령을 매번 하위 프로세스로 실행"""
+
+    name = "subprocess"
+
+    def __init__(self, rclone=None):
+        self.rclone = rclone or Rclone()
+        self._process = None
+
+    def version(self):
+        return self.rclone.version()
+
+    def listremotes(self):
+        return self.rclone.listremotes()
+
+    def list(self, path, recursive=False):
+        args = ["lsjson", path]
+        if recursive:
+            args.append("-R")
+        return json.loads(self.rclone.run(args).stdout.decode("utf-8") or "[]")
+
+    def mkdir(self, path):
+        self.rclone.run(["mkdir", path])
+
+    def sync(self, verb, src, dst, excludes=(), on_event=None):
+        """copy/sync 실행 (끝날 때까지 대기). on_event는 rclone JSON 로그를 받는다."""
+        flags = transfer_flags(progress=False) + ["--stats=1s"] + [f"--exclude={p}" for p in excludes]
+        self.rclone.stream(verb, src, dst, flags, on_event=on_event, on_start=self._started)
+
+    def _started(self, process):
+        self._process = process
+
+    def cancel(self):
+        if self._process is not None and self._process.poll() is None:
+            self._process.terminate()
+
+    def close(self):
+        self.cancel()
+
+
+class DaemonTransport:
+    """rclone rcd HTTP API로 실행 (여러 스레드가 함께 써도 됨)"""
+
+    name = "rcd"
+
+    def __init__(self, daemon, owned=False):
+        self.daemon = daemon
+        self.owned = owned
+        self._jobs = set()
+        self._lock = threading.Lock()
+
+    def version(self):
+        return "rclone " + self.daemon.call("core/version")["version"]
+
+    def listremotes(self):
+        return [f"{name}:" for name in self.daemon.call("config/listremotes").get("remotes", [])]
+
+    def list(self, path, recursive=False):
+        result = self.daemon.call("operations/list", fs=fs_path(path), remote="", opt={"recurse": recursive})
+        return result.get("list", [])
+
+    def mkdir(self, path):
+        self.daemon.call("operations/mkdir", fs=fs_path(path), remote="")
+
+    def sync(self, verb, src, dst, excludes=(), on_event=None):
+        """비동기 작업으로 시작하고 끝날 때까지 대기. on_event는 job()과 같다."""
+        params = {
+            "srcFs": fs_path(src),
+            "dstFs": fs_path(dst),
+            "_async": True,
+            "_config": {"Transfers": config.TRANSFERS, "Checkers": config.CHECKERS},
+        }
+        if excludes:
+            params["_filter"] = {"ExcludeRule": list(excludes)}
+        with trace.span(f"transfer.{verb}") as phase:
+            status = self.job(verb, params, on_event)
+            phase.set(files=len(status.get("copied", ())))
+        if not status.get("success"):
+            raise RcloneError([verb, src, dst], 1, status.get("error", ""))
+
+    def job(self, verb, params, on_event=None, on_start=None):
+        """sync/<verb> 작업을 실행하고 core/stats를 주기적으로 조회해 끝난 작업 상태를 반환.
+        on_event는 {"stats": {...}} 형태로 받고, 끝난 전송(core/transferred)은 하위 프로세스 방식과 같은
+        {"msg": "Copied (new)", "object": 경로}로 받는다. 이벤트에는 "rcd": True가 붙고, 완료 목록에서 빠진
+        전송이 있으면 마지막에 "incomplete": True 이벤트를 보낸다. on_start는 작업 ID를 받는다. (작업 취소용)"""
+        jobid = self.daemon.call(f"sync/{verb}", **params)["jobid"]
+        with self._lock:
+            self._jobs.add(jobid)
+        group = f"job/{jobid}"
+        copied = set()
+        stats = {}
+        try:
+            if on_start is not None:
+                on_start(jobid)
+            while True:
+                status = self.daemon.call("job/status", jobid=jobid)
+                if on_event is not None:
+                    stats = self.daemon.call("core/stats", group=group)
+                    on_event({"level": "info", "stats": stats, "rcd": True})
+                    for item in self.daemon.call("core/transferred", group=group).get("transferred", []):
+                        name = item.get("name")
+                        if name and name not in copied and not item.get("error") and not item.get("checked"):
+                            copied.add(name)
+                            on_event({"level": "info", "msg": "Copied (new)", "object": name, "rcd": True})
+                if status.get("finished"):
+                    break
+                time.sleep(POLL_INTERVAL)
+            missed = stats.get("transfers", 0) - len(copied)
+            if on_event is not None and status.get("success") and missed > 0:
+                # core/transferred는 최근 항목만 남으므로 조회 사이에 끝난 전송이 빠짐 (RestorePipeline이 다시 확인)
+                on_event({"level": "info", "msg": f"완료 목록에서 빠진 전송 {missed}개", "rcd": True,
+                          "incomplete": True})
+        except BaseException:
+            # Ctrl+C 등으로 대기를 멈추면 데몬 쪽 작업도 멈춤
+            self.stop_job(jobid)
+            raise
+        finally:
+            with self._lock:
+                self._jobs.discard(jobid)
+        status["copied"] = copied
+        return status
+
+    def stop_job(self, jobid):
+        try:
+            self.daemon.call("job/stop", jobid=jobid)
+        except RcloneError:
+            pass
+
+    def cancel(self):
+        with self._lock:
+            jobs = list(self._jobs)
+        for jobid in jobs:
+            self.stop_job(jobid)
+
+    def close(self):
+        self.cancel()
+        if self.owned:
+            self.daemon.stop()
+
+
+def open_transport(source=config.SERVER_DIR, start=True, binary="rclone"):
+    """사용 가능한 전송 계층 반환.
+    1) 실행 중인 공유 데몬에 연결 2) start면 새 데몬 시작 3) 실패하면 하위 프로세스 방식"""
+    daemon = RcloneDaemon.connect(daemon_info_path(source))
+    if daemon is not None:
+        return DaemonTransport(daemon)
+    if start:
+        try:
+            return DaemonTransport(RcloneDaemon.start(binary), owned=True)
+        except RcloneError as e:
+            console.warning(f"rclone rcd를 사용할 수 없어 하위 프로세스 방식으로 실행합니다. ({e})")
+    return SubprocessTransport(Rclone(binary))
+
+
+def start_shared_daemon(source=config.SERVER_DIR, binary="rclone"):
+    """스크립트와 GUI가 함께 쓸 데몬 시작 (이미 있으면 재사용)"""
+    path = daemon_info_path(source)
+    daemon = RcloneDaemon.connect(path)
+    if daemon is None:
+        daemon = RcloneDaemon.start(binary)
+        daemon.save(path)
+    return daemon
+
+
+def stop_shared_daemon(source=config.SERVER_DIR):
+    path = daemon_info_path(source)
+    daemon = RcloneDaemon.connect(path)
+    if daemon is not None:
+        daemon.stop()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+    return daemon is not None
@@ -0,0 +1,361 @@
+# -*- coding: utf-8 -*-
+"""
+rclone 실행 래퍼
+"""
+
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+from . import config, trace
+
+
+class RcloneError(Exception):
+    """rclone 명령 실패"""
+
+    def __init__(self, args, returncode, stderr=""):
+        self.args_list = list(args)
+        self.returncode = returncode
+        self.stderr = stderr
+        super().__init__(f"rclone {' '.join(self.args_list[:2])} 실패 (종료 코드: {returncode}) {stderr.strip()}")
+
+
+def join(remote, path):
+    """원격 경로 결합 (googledrive:yuniserver + a/b -> googledrive:yuniserver/a/b)"""
+    if not path:
+        return remote
+    if remote.endswith(":") or remote.endswith("/"):
+        return remote + path
+    return f"{remote}/{path}"
+
+
+class FileList:
+    """--files-from-raw에 넘길 임시 목록 파일"""
+
+    def __init__(self, paths):
+        fd, self.path = tempfile.mkstemp(prefix="yunisync-", suffix=".txt")
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            for p in paths:
+                f.write(p + "\n")
+
+    def __enter__(self):
+        return self.path
+
+    def __exit__(self, *exc):
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+class Rclone:
+    """rclone 하위 프로세스 실행기
+
+    progress: ProgressTracker (있으면 모든 전송의 JSON 통계를 전달하고 rclone 자체 진행률 표시는 끔)
+    scheduler: LoadScheduler (있으면 모든 전송을 rc 서버와 함께 띄워 부하에 따라 대역폭 조절)
+
+    transport: DaemonTransport (있으면 copy/sync를 공유 rcd 데몬의 작업으로 실행. 옮길 수 없는 옵션이
+               있거나 부하 조절기를 쓰면 하위 프로세스로 실행하고, 목록 조회 등 짧은 명령은 항상 하위 프로세스)
+
+    cancel()은 실행 중인 rclone을 모두 중단하고 이후 실행도 막는다. (작업 큐의 작업별 취소)
+    """
+
+    def __init__(self, binary="rclone", extra_args=None, progress=None, scheduler=None, transport=None):
+        self.binary = binary
+        self.extra_args = list(extra_args or [])
+        self.progress = progress
+        self.scheduler = scheduler
+        self.transport = transport
+        self.cancelled = False
+        self.processes = set()
+        self.jobs = set()
+
+    def command(self, args):
+        return [self.binary] + list(args) + self.extra_args
+
+    def run(self, args, capture=True, check=True, input=None):
+        """rclone 실행 후 CompletedProcess 반환"""
+        with trace.span(phase_name(args[0])):
+            process = self.popen(args,
+                                 stdin=subprocess.PIPE if input is not None else None,
+                                 stdout=subprocess.PIPE if capture else None,
+                                 stderr=subprocess.PIPE if capture else None)
+            try:
+                stdout, stderr = process.communicate(input)
+            except BaseException:
+                process.kill()
+                raise
+            finally:
+                self.processes.discard(process)
+        result = subprocess.CompletedProcess(process.args, process.returncode, stdout, stderr)
+        if check and result.returncode != 0:
+            stderr = result.stderr.decode("utf-8", "replace") if result.stderr else ""
+            raise RcloneError(args, result.returncode, stderr)
+        return result
+
+    def popen(self, args, **kwargs):
+        """취소할 수 있도록 기록해 두고 rclone 시작"""
+        if self.cancelled:
+            raise RcloneError(args, CANCELLED, "작업이 취소되었습니다.")
+        try:
+            process = subprocess.Popen(self.command(args), **kwargs)
+        except FileNotFoundError:
+            raise RcloneError(args, 127, "rclone을 찾을 수 없습니다.")
+        self.processes.add(process)
+        return process
+
+    def cancel(self):
+        """실행 중인 rclone 중단 (이후 실행은 RcloneError)"""
+        self.cancelled = True
+        for process in list(self.processes):
+            if process.poll() is None:
+                process.terminate()
+        for jobid in list(self.jobs):
+            self.transport.stop_job(jobid)
+
+    def version(self):
+        result = self.run(["version"])
+        return result.stdout.decode("utf-8", "replace").splitlines()[0]
+
+    def listremotes(self):
+        result = self.run(["listremotes"])
+        return result.stdout.decode("utf-8", "replace").split()
+
+    def lsf(self, path, recursive=False, files_only=False, dirs_only=False):
+        args = ["lsf", path]
+        if recursive:
+            args.append("-R")
+        if files_only:
+            args.append("--files-only")
+        if dirs_only:
+            args.append("--dirs-only")
+        result = self.run(args)
+        return [line for line in result.stdout.decode("utf-8", "replace").splitlines() if line]
+
+    def cat(self, path):
+        return self.run(["cat", path]).stdout
+
+    def rcat(self, path, data):
+        self.run(["rcat", path], input=data)
+
+    def copyto(self, src, dst, flags=()):
+        self.run(["copyto", src, dst] + list(flags))
+
+    def transfer(self, verb, src, dst, flags=(), files=None, capture=False, on_event=None):
+        """copy/sync/move 실행. files가 주어지면 해당 파일만 전송한다.
+        on_event가 있으면 stream()으로 실행해 JSON 로그를 전달한다."""
+        if (self.progress is not None or self.scheduler is not None or on_event is not None) and not capture:
+            return self.stream(verb, src, dst, flags, files=files, on_event=on_event)
+        args = [verb, src, dst] + list(flags)
+        if files is None:
+            return self.run(args, capture=capture)
+        with FileList(files) as list_path:
+            return self.run(args + ["--files-from-raw", list_path, "--no-traverse"], capture=capture)
+
+    def stream(self, verb, src, dst, flags=(), files=None, on_event=None, on_start=None):
+        """copy/sync 실행 중 rclone JSON 로그를 한 줄씩 on_event(dict)로 전달.
+        전송이 끝난 파일은 {"msg": "Copied (new)", "object": 경로, ...} 형태로 전달된다.
+        on_start는 시작된 Popen 객체를 받는다. (작업 취소용)"""
+        with trace.span(f"transfer.{verb}") as span:
+            if self.transport is not None and self.scheduler is None:
+                params = rc_params(src, dst, list(flags) + self.extra_args)
+                if params is not None:
+                    return self._rc_stream(span, verb, params, files, on_event)
+            return self._stream(span, verb, src, dst, flags, files, on_event, on_start)
+
+    def _rc_stream(self, span, verb, params, files, on_event):
+        """공유 rcd 데몬의 작업으로 실행. on_event는 하위 프로세스 방식과 같은 형태로 받는다."""
+        args = [verb, params["srcFs"], params["dstFs"]]
+        if self.cancelled:
+            raise RcloneError(args, CANCELLED, "작업이 취소되었습니다.")
+        tracker = self.progress
+        if tracker is not None:
+            tracker.begin(verb)
+        started = time.perf_counter()
+        first = None
+        stats = {}
+
+        def forward(event):
+            nonlocal first, stats
+            if "stats" in event:
+                stats = event["stats"]
+            if first is None and (stats.get("transferring") or stats.get("bytes") or is_copied(event)):
+                first = time.perf_counter()
+            if tracker is not None:
+                tracker.on_event(event)
+            if on_event is not None:
+                on_event(event)
+
+        ids = []
+
+        def started_job(jobid):
+            ids.append(jobid)
+            self.jobs.add(jobid)
+            if self.cancelled:
+                self.transport.stop_job(jobid)
+
+        with FileList(files or []) as list_path:
+            if files is not None:
+                params["_filter"]["FilesFromRaw"] = [list_path]
+                params["_config"]["NoTraverse"] = True
+            try:
+                status = self.transport.job(verb, params, forward, on_start=started_job)
+            finally:
+                self.jobs.difference_update(ids)
+                record_phases(span, verb, started, first, stats)
+        if tracker is not None:
+            tracker.end()
+        if not status.get("success"):
+            if self.cancelled:
+                raise RcloneError(args, CANCELLED, "작업이 취소되었습니다.")
+            raise RcloneError(args, 1, status.get("error", ""))
+        return 0
+
+    def _stream(self, span, verb, src, dst, flags, files, on_event, on_start):
+        tracker = self.progress
+        scheduler = self.scheduler
+        if tracker is not None or scheduler is not None or trace.enabled():
+            # 진행률과 부하 조절, 단계 측정은 JSON 통계를 사용
+            flags = [f for f in flags if f not in PROGRESS_FLAGS and not f.startswith("--stats=")]
+            flags += ["--stats=1s"]
+        if tracker is not None:
+            tracker.begin(verb)
+        env = None
+        if scheduler is not None:
+            flags = scheduler.prepare(flags)
+            env = scheduler.environment()
+        args = [verb, src, dst] + list(flags) + ["--use-json-log", "-v"]
+        with FileList(files or []) as list_path:
+            if files is not None:
+                args += ["--files-from-raw", list_path, "--no-traverse"]
+            process = self.popen(args, stderr=subprocess.PIPE, env=env)
+            if on_start is not None:
+                on_start(process)
+            if scheduler is not None:
+                scheduler.begin()
+            errors = []
+            # 첫 전송이 시작되기 전까지는 rclone 시작/인증/목록 조회/비교 구간
+            started = time.perf_counter()
+            first = None
+            stats = {}
+            try:
+                for raw in process.stderr:
+                    line = raw.decode("utf-8", "replace").strip()
+                    if not line:
+                        continue
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        event = {"level": "info", "msg": line}
+                    if event.get("level") == "error":
+                        errors.append(event.get("msg", ""))
+                    if "stats" in event:
+                        stats = event["stats"]
+                    if first is None and (stats.get("transferring") or stats.get("bytes") or is_copied(event)):
+                        first = time.perf_counter()
+                    if tracker is not None:
+                        tracker.on_event(event)
+                    if scheduler is not None:
+                        scheduler.on_event(event)
+                    if on_event is not None:
+                        on_event(event)
+                process.stderr.close()
+                returncode = process.wait()
+            finally:
+                self.processes.discard(process)
+                if scheduler is not None:
+                    scheduler.end()
+                record_phases(span, verb, started, first, stats)
+            if tracker is not None:
+                tracker.end()
+        if returncode != 0:
+            if self.cancelled:
+                raise RcloneError(args, CANCELLED, "작업이 취소되었습니다.")
+            raise RcloneError(args, returncode, errors[-1] if errors else "")
+        return returncode
+
+    def delete_files(self, remote, files):
+        """원격의 지정 파일만 삭제"""
+        if not files:
+            return
+        with FileList(files) as list_path:
+            self.run(["delete", remote, "--files-from-raw", list_path])
+
+
+PROGRESS_FLAGS = ("--progress", "-P", "--stats-one-line")
+# 취소된 작업의 종료 코드 (Ctrl+C와 같은 값)
+CANCELLED = 130
+# 원격 목록 조회 명령 (단계 측정에서 list로 묶음)
+LIST_COMMANDS = ("lsf", "lsjson", "ls", "size")
+
+
+# 공유 rcd 데몬 작업(_config/_filter)으로 옮길 수 있는 rclone 옵션
+RC_NUMBERS = {"--transfers": "Transfers", "--checkers": "Checkers"}
+RC_SWITCHES = {"--no-check-dest": "NoCheckDest", "--no-traverse": "NoTraverse"}
+RC_FILTERS = {"--min-size": "MinSize", "--max-size": "MaxSize"}
+
+
+def rc_params(src, dst, flags):
+    """copy/sync 옵션을 rcd sync/* 작업 인자로 변환. 옮길 수 없는 옵션이 있으면 None (하위 프로세스로 실행)"""
+    options = {}
+    filters = {}
+    for flag in flags:
+        name, _, value = flag.partition("=")
+        if flag in PROGRESS_FLAGS or name == "--stats":
+            continue
+        if name in RC_NUMBERS and value.isdigit():
+            options[RC_NUMBERS[name]] = int(value)
+        elif name in RC_SWITCHES and not value:
+            options[RC_SWITCHES[name]] = True
+        elif name in RC_FILTERS and value:
+            filters[RC_FILTERS[name]] = value
+        elif name == "--exclude" and value:
+            filters.setdefault("ExcludeRule", []).append(value)
+        else:
+            return None
+    return {"srcFs": fs_path(src), "dstFs": fs_path(dst), "_async": True, "_config": options, "_filter": filters}
+
+
+def fs_path(path):
+    """데몬은 작업 폴더가 다르므로 로컬 경로는 절대 경로로 넘김 (원격 이름:경로는 그대로)"""
+    if ":" in path and not os.path.splitdrive(path)[0]:
+        return path
+    return os.path.abspath(path)
+
+
+def phase_name(command):
+    return f"list.{command}" if command in LIST_COMMANDS else f"rclone.{command}"
+
+
+def is_copied(event):
+    """rclone JSON 로그가 파일 전송 완료를 뜻하는지 확인"""
+    return event.get("msg", "").startswith("Copied") and bool(event.get("object"))
+
+
+def record_phases(span, verb, started, first, stats):
+    """마지막 통계로 전송 단계의 파일/바이트 수를 기록하고 검사(전송 시작 전)와 전송 구간으로 나눔"""
+    span.set(files=stats.get("transfers", 0), bytes=stats.get("bytes", 0), checks=stats.get("checks", 0))
+    ended = time.perf_counter()
+    if first is None:
+        trace.record(f"transfer.{verb}.check", started, ended, checks=stats.get("checks", 0))
+        return
+    trace.record(f"transfer.{verb}.check", started, first)
+    trace.record(f"transfer.{verb}.copy", first, ended,
+                 files=stats.get("transfers", 0), bytes=stats.get("bytes", 0))
+
+
+def transfer_flags(progress=True, transfers=None, checkers=None):
+    """스크립트와 동일한 기본 전송 옵션"""
+    flags = [f"--transfers={transfers or config.TRANSFERS}", f"--checkers={checkers or config.CHECKERS}"]
+    if progress:
+        flags += ["--progress", "--stats=1s", "--stats-one-line"]
+    return flags
+
+
+def exclude_flags():
+    """업로드 제외 패턴 및 메타데이터 폴더 제외 옵션"""
+    flags = [f"--exclude={pattern}" for pattern in config.EXCLUDES]
+    flags.append(f"--exclude=/{config.META_DIR}/**")
+    return flags
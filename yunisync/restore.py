@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+선택 복원
+원격 매니페스트(또는 스냅샷 레시피)를 목록으로 삼아 경로 패턴에 맞는 파일만 받는다.
+Drive 전체 목록을 조회하지 않으므로 큰 트리에서도 파일 몇 개는 몇 초 안에 복원된다.
+
+- 패턴은 yuniserver 기준 상대 경로. *, ?, [] 를 쓸 수 있고 *는 폴더 경계(/)도 포함한다.
+  폴더 경로를 주면 그 아래 전체를 복원한다. (예: world/playerdata, plugins/*.yml)
+- 업로드 방식(일반 파일/스냅샷/묶음)에 맞춰 필요한 파일, 청크, 묶음만 받는다.
+- 패턴에 맞지 않는 로컬 파일은 건드리지 않는다.
+"""
+
+import fnmatch
+import json
+import os
+
+from . import config, console
+from .manifest import fetch_remote
+from .pipeline import RestorePipeline, make_executable, needs_exec
+from .rclone import join, transfer_flags
+
+
+def normalize(pattern):
+    pattern = pattern.replace("\\", "/").strip()
+    while pattern.startswith("./"):
+        pattern = pattern[2:]
+    return pattern.strip("/")
+
+
+def matches(path, pattern):
+    return (fnmatch.fnmatchcase(path, pattern) or path.startswith(pattern + "/")
+            or fnmatch.fnmatchcase(path, pattern + "/*"))
+
+
+def select(paths, patterns):
+    """패턴에 맞는 경로 목록 (정렬)"""
+    patterns = [p for p in (normalize(p) for p in patterns) if p]
+    return sorted(path for path in paths if any(matches(path, pattern) for pattern in patterns))
+
+
+class RemoteTree:
+    """원격 폴더를 한 단계씩 나열 (GUI 트리 보기용)
+
+    manifest가 있으면 네트워크 없이 매니페스트에서, 없으면 lister(상대 폴더 경로)로 폴더마다 조회한다.
+    lister는 rclone lsjson 형식의 항목 목록({"Name", "IsDir", "Size"})을 반환한다.
+    """
+
+    def __init__(self, manifest=None, lister=None):
+        self.manifest = manifest
+        self.lister = lister
+        self.cache = {}
+
+    def children(self, rel_dir=""):
+        """[(이름, 폴더 여부, 크기)] - 폴더 먼저, 이름순. 폴더 크기는 매니페스트가 있을 때만 합계"""
+        if rel_dir not in self.cache:
+            if self.manifest is not None:
+                items = self._from_manifest(rel_dir)
+            else:
+                items = [(item["Name"], bool(item.get("IsDir")), max(item.get("Size", 0), 0))
+                         for item in self.lister(rel_dir)
+                         if rel_dir or item["Name"] != config.META_DIR]
+            self.cache[rel_dir] = sorted(items, key=lambda item: (not item[1], item[0].lower()))
+        return self.cache[rel_dir]
+
+    def _from_manifest(self, rel_dir):
+        prefix = rel_dir + "/" if rel_dir else ""
+        dirs, files = {}, []
+        for path, entry in self.manifest.entries.items():
+            if not path.startswith(prefix):
+                continue
+            name, sep, rest = path[len(prefix):].partition("/")
+            if sep:
+                dirs[name] = dirs.get(name, 0) + entry[0]
+            else:
+                files.append((name, False, entry[0]))
+        return [(name, True, size) for name, size in dirs.items()] + files
+
+
+def remote_tree(rclone, remote=config.REMOTE, lister=None):
+    """원격 매니페스트가 있으면 그것으로, 없으면 lister로 폴더마다 조회하는 RemoteTree"""
+    manifest = fetch_remote(rclone, remote)
+    if manifest is None and lister is None:
+        def lister(rel_dir):
+            result = rclone.run(["lsjson", join(remote, rel_dir), "--no-mimetype"])
+            return json.loads(result.stdout.decode("utf-8") or "[]")
+    return RemoteTree(manifest, lister)
+
+
+def restore_by_filter(rclone, source, remote, patterns):
+    """매니페스트가 없을 때: rclone 필터로 복원 (원격 목록 조회가 필요해 느림)"""
+    flags = transfer_flags() + [f"--exclude=/{config.META_DIR}/**"]
+    for pattern in (normalize(p) for p in patterns):
+        if pattern:
+            flags += [f"--include=/{pattern}", f"--include=/{pattern}/**"]
+    rclone.transfer("copy", remote, source, flags)
+
+
+def restore(rclone, source=config.SERVER_DIR, remote=config.REMOTE, patterns=(), snapshot=None,
+            dry_run=False, workers=None):
+    """패턴에 맞는 파일만 복원. snapshot이 있으면 그 스냅샷에서 복원. (복원 대상 경로 목록, 문제 목록) 반환"""
+    recipe = None
+    manifest = None
+    if snapshot:
+        from .snapshot import fetch_recipe
+        recipe = fetch_recipe(rclone, remote, None if snapshot == "latest" else snapshot)
+        if recipe is None:
+            raise ValueError(f"스냅샷을 찾을 수 없습니다: {snapshot}")
+        layout, paths = "snapshot", recipe.files
+    else:
+        manifest = fetch_remote(rclone, remote)
+        if manifest is None:
+            console.warning("원격 매니페스트가 없어 rclone 필터로 복원합니다. (원격 전체 목록 조회)")
+            if not dry_run:
+                restore_by_filter(rclone, source, remote, patterns)
+            return [], []
+        layout, paths = manifest.layout, manifest.entries
+
+    matched = select(paths, patterns)
+    if not matched:
+        raise ValueError("패턴에 맞는 파일이 없습니다: " + ", ".join(patterns))
+    size = sum(recipe.files[p]["size"] if recipe else manifest.entries[p][0] for p in matched)
+    console.info(f"복원 대상: 파일 {len(matched)}개 ({size / 1024 / 1024:.1f} MB), 방식: {layout}")
+    if dry_run:
+        for path in matched:
+            print(f"  + {path}")
+        return matched, []
+
+    os.makedirs(source, exist_ok=True)
+    problems = []
+    if layout == "snapshot":
+        from .snapshot import fetch_recipe, restore_paths
+        recipe = recipe or fetch_recipe(rclone, remote)
+        if recipe is None:
+            raise ValueError("원격에 스냅샷이 없습니다.")
+        matched = [path for path in matched if path in recipe.files]
+        restore_paths(rclone, source, remote, recipe, matched)
+    elif layout == "pack":
+        from .packs import restore_paths
+        restore_paths(rclone, source, remote, matched, workers=workers)
+    else:
+        # 받는 즉시 크기/MD5 검증
+        pipeline = RestorePipeline(source, manifest.entries, targets=matched)
+        try:
+            rclone.stream("copy", remote, source, transfer_flags(), files=matched, on_event=pipeline.on_event)
+        finally:
+            applied, problems = pipeline.close()
+
+    for path in matched:
+        target = os.path.join(source, path)
+        if needs_exec(path) and os.path.isfile(target):
+            make_executable(target)
+    return matched, problems
@@ -0,0 +1,352 @@
+# -*- coding: utf-8 -*-
+"""
+부하 기반 전송 조절
+서버가 돌아가는 중에 업로드가 게임을 느리게 만들지 않도록 호스트 부하를 보면서
+전송 중인 rclone의 대역폭 제한을 바꾼다. (rclone --rc의 core/bwlimit)
+
+- 부하: CPU 사용률과 iowait(/proc/stat), 네트워크 송수신량(/proc/net/dev),
+  틱 명령(선택: 서버 틱 시간이나 지연 시간을 ms로 출력하는 명령)
+- 한계를 넘으면 대역폭을 현재 속도의 절반으로 줄이고, 여유가 이어지면 25%씩 늘린다.
+- 시간대 일정은 rclone --bwlimit 시간표와 같은 형식이다. ("08:00,1M 18:00,512k 02:00,off")
+  각 시간대의 값이 상한이 되고, 부하 조절은 그 아래에서 동작한다.
+- 동시 전송 수는 실행 중에 바꿀 수 없으므로 rclone을 시작할 때의 부하로 정한다.
+- 리눅스가 아니면 /proc 값이 없으므로 틱 명령과 시간대 일정만 사용한다.
+"""
+
+import os
+import re
+import secrets
+import shutil
+import subprocess
+import threading
+import time
+
+from . import console
+from .rcd import RcloneDaemon, free_port, rc_env
+from .rclone import RcloneError
+
+SAMPLE_INTERVAL = 2.0
+# 기본 한계 (틱 50ms = 마인크래프트 20 TPS의 한 틱)
+CPU_LIMIT = 85.0
+IOWAIT_LIMIT = 20.0
+MAX_TICK = 50.0
+TICK_TIMEOUT = 5.0
+# 대역폭 조절 폭
+MIN_RATE = 256 * 1024
+DECREASE = 0.5
+INCREASE = 1.25
+# 한계 아래로 이만큼 연속 측정되면 늘림
+CALM_SAMPLES = 3
+# 제한 없이 보내도 되는 것으로 볼 기준 (현재 속도의 배수)
+UNLIMIT_FACTOR = 4
+# 전송 프로세스 우선순위
+NICE = 10
+IONICE_CLASS = 2
+IONICE_LEVEL = 7
+
+SUFFIXES = {"": 1024, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_rate(text):
+    """rclone 크기 표기 (512k, 2M, 1.5G, off) -> 바이트/초 (off는 None)"""
+    text = text.strip()
+    if text.lower() == "off":
+        return None
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([bBkKmMgGtT]?)", text)
+    if not match:
+        raise ValueError(f"대역폭 형식이 올바르지 않습니다: {text}")
+    return float(match.group(1)) * SUFFIXES[match.group(2).upper()]
+
+
+def format_rate(rate):
+    """바이트/초 -> rclone --bwlimit 값"""
+    if rate is None:
+        return "off"
+    return f"{max(1, int(rate // 1024))}k"
+
+
+def describe_rate(rate):
+    if rate is None:
+        return "제한 없음"
+    return f"{rate / 1024 / 1024:.2f} MB/s"
+
+
+def parse_timetable(text):
+    """시간표 ("08:00,1M 23:00,off" 또는 "2M") -> [(분, 바이트/초)] (시각순)"""
+    entries = []
+    for item in text.split():
+        when, sep, rate = item.rpartition(",")
+        if not sep:
+            entries.append((0, parse_rate(rate)))
+            continue
+        match = re.fullmatch(r"(\d{1,2}):(\d{2})", when)
+        if not match or int(match.group(1)) > 23 or int(match.group(2)) > 59:
+            raise ValueError(f"시각 형식이 올바르지 않습니다: {when} (HH:MM)")
+        entries.append((int(match.group(1)) * 60 + int(match.group(2)), parse_rate(rate)))
+    if not entries:
+        raise ValueError("시간표가 비어 있습니다.")
+    return sorted(entries, key=lambda entry: entry[0])
+
+
+def cap_at(timetable, now=None):
+    """지금 적용되는 시간대 상한 (시간표가 없으면 None = 제한 없음)"""
+    if not timetable:
+        return None
+    now = time.localtime(now)
+    minutes = now.tm_hour * 60 + now.tm_min
+    current = timetable[-1][1]  # 첫 항목 이전은 전날의 마지막 시간대
+    for start, rate in timetable:
+        if start <= minutes:
+            current = rate
+    return current
+
+
+def read_cpu():
+    """/proc/stat 첫 줄의 (user, nice, system, idle, iowait, irq, softirq, steal). 없으면 None"""
+    try:
+        with open("/proc/stat", "r") as f:
+            fields = f.readline().split()
+    except OSError:
+        return None
+    if not fields or fields[0] != "cpu":
+        return None
+    return [int(value) for value in fields[1:9]]
+
+
+def read_net():
+    """/proc/net/dev의 (받은 바이트, 보낸 바이트) 합계 (lo 제외). 없으면 None"""
+    try:
+        with open("/proc/net/dev", "r") as f:
+            lines = f.readlines()[2:]
+    except OSError:
+        return None
+    rx = tx = 0
+    for line in lines:
+        name, sep, values = line.partition(":")
+        if not sep or name.strip() == "lo":
+            continue
+        values = values.split()
+        rx += int(values[0])
+        tx += int(values[8])
+    return rx, tx
+
+
+def probe_tick(command):
+    """틱 명령 실행 결과의 첫 숫자 (ms). 실패하면 None"""
+    try:
+        result = subprocess.run(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                timeout=TICK_TIMEOUT)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    match = re.search(r"\d+(?:\.\d+)?", result.stdout.decode("utf-8", "replace"))
+    return float(match.group(0)) if match else None
+
+
+class Load:
+    """한 번 측정한 호스트 부하 (측정할 수 없는 값은 None)"""
+
+    def __init__(self):
+        self.cpu = None
+        self.iowait = None
+        self.rx_rate = None
+        self.tx_rate = None
+        self.tick = None
+
+    def describe(self):
+        parts = []
+        if self.cpu is not None:
+            parts.append(f"CPU {self.cpu:.0f}%, iowait {self.iowait:.0f}%")
+        if self.tx_rate is not None:
+            parts.append(f"송신 {self.tx_rate / 1024 / 1024:.2f} MB/s")
+        if self.tick is not None:
+            parts.append(f"틱 {self.tick:.1f}ms")
+        return ", ".join(parts) or "측정값 없음"
+
+
+class LoadSampler:
+    """직전 측정과의 차이로 CPU/iowait 비율과 네트워크 속도를 계산"""
+
+    def __init__(self, tick_command=None):
+        self.tick_command = tick_command
+        self._cpu = read_cpu()
+        self._net = read_net()
+        self._time = time.monotonic()
+
+    def sample(self):
+        cpu, net, now = read_cpu(), read_net(), time.monotonic()
+        load = Load()
+        if cpu is not None and self._cpu is not None:
+            total = sum(cpu) - sum(self._cpu)
+            if total > 0:
+                idle = cpu[3] - self._cpu[3]
+                iowait = cpu[4] - self._cpu[4]
+                load.cpu = 100.0 * (total - idle - iowait) / total
+                load.iowait = 100.0 * iowait / total
+        seconds = now - self._time
+        if net is not None and self._net is not None and seconds > 0:
+            load.rx_rate = (net[0] - self._net[0]) / seconds
+            load.tx_rate = (net[1] - self._net[1]) / seconds
+        if self.tick_command:
+            load.tick = probe_tick(self.tick_command)
+        self._cpu, self._net, self._time = cpu, net, now
+        return load
+
+
+def lower_priority(pid=0):
+    """프로세스의 CPU/디스크 우선순위를 낮춤. 이후 실행하는 rclone도 그대로 물려받는다."""
+    if hasattr(os, "setpriority"):
+        try:
+            os.setpriority(os.PRIO_PROCESS, pid, max(NICE, os.getpriority(os.PRIO_PROCESS, pid)))
+        except OSError:
+            pass
+    ionice = shutil.which("ionice")
+    if ionice:
+        subprocess.run([ionice, "-c", str(IONICE_CLASS), "-n", str(IONICE_LEVEL), "-p", str(pid or os.getpid())],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+class LoadScheduler:
+    """Rclone(scheduler=...)로 넘기면 모든 전송에 적용되는 대역폭 조절기
+
+    adaptive가 아니면 부하는 보지 않고 시간대 일정만 적용한다.
+    net_limit(바이트/초)을 주면 호스트 전체 송신량도 한계로 본다.
+    """
+
+    def __init__(self, timetable=None, adaptive=True, max_tick=MAX_TICK, tick_command=None,
+                 cpu_limit=CPU_LIMIT, iowait_limit=IOWAIT_LIMIT, net_limit=None, interval=SAMPLE_INTERVAL):
+        self.timetable = parse_timetable(timetable) if isinstance(timetable, str) else timetable
+        self.adaptive = adaptive
+        self.max_tick = max_tick
+        self.cpu_limit = cpu_limit
+        self.iowait_limit = iowait_limit
+        self.net_limit = net_limit
+        self.interval = interval
+        self.sampler = LoadSampler(tick_command if adaptive else None)
+        # 현재 적용한 대역폭 (None: 제한 없음). rclone을 여러 번 실행해도 이어서 사용
+        self.limit = None
+        self.speed = 0.0
+        self.calm = 0
+        self._client = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def reasons(self, load):
+        """한계를 넘은 항목 목록"""
+        reasons = []
+        if load.cpu is not None and load.cpu > self.cpu_limit:
+            reasons.append(f"CPU {load.cpu:.0f}%")
+        if load.iowait is not None and load.iowait > self.iowait_limit:
+            reasons.append(f"iowait {load.iowait:.0f}%")
+        if self.net_limit and load.tx_rate is not None and load.tx_rate > self.net_limit:
+            reasons.append(f"송신 {load.tx_rate / 1024 / 1024:.2f} MB/s")
+        if load.tick is not None and load.tick > self.max_tick:
+            reasons.append(f"틱 {load.tick:.1f}ms")
+        return reasons
+
+    def decide(self, load, cap):
+        """다음 대역폭 (None: 제한 없음)"""
+        target = self.limit
+        if self.adaptive and load is not None:
+            if self.reasons(load):
+                self.calm = 0
+                # 실제 속도가 제한보다 낮으면 실제 속도 기준으로 줄여야 바로 효과가 있음
+                known = [rate for rate in (self.speed, self.limit, cap) if rate]
+                if known:
+                    target = max(MIN_RATE, min(known) * DECREASE)
+            elif self.limit is not None:
+                self.calm += 1
+                if self.calm >= CALM_SAMPLES:
+                    self.calm = 0
+                    target = self.limit * INCREASE
+                    if cap is None and self.speed and target > self.speed * UNLIMIT_FACTOR:
+                        target = None
+        if cap is not None:
+            target = cap if target is None else min(target, cap)
+        return target
+
+    def prepare(self, flags):
+        """rclone 시작 전: rc 서버 옵션과 시작 대역폭을 붙이고, 부하가 높으면 동시 전송 수를 줄인 flags"""
+        load = self.sampler.sample() if self.adaptive else None
+        busy = load is not None and self.reasons(load)
+        self.limit = self.decide(load, cap_at(self.timetable))
+        flags = list(flags)
+        if busy:
+            flags = [halve(flag) for flag in flags]
+            console.warning(f"부하가 높아 동시 전송 수를 줄입니다. ({load.describe()})")
+        password = secrets.token_hex(16)
+        self._client = RcloneDaemon(f"127.0.0.1:{free_port()}", "yunisync", password)
+        # 인증 정보는 명령줄 대신 environment()로 넘김
+        flags += ["--rc", f"--rc-addr={self._client.addr}"]
+        if self.limit is not None:
+            flags.append(f"--bwlimit={format_rate(self.limit)}")
+        self.speed = 0.0
+        return flags
+
+    def environment(self):
+        """prepare() 뒤 rclone에 넘길 환경 변수 (rc 인증 정보)"""
+        return rc_env(self._client.user, self._client.password)
+
+    def begin(self):
+        """rclone 시작 후: 측정/조절 스레드 시작"""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def end(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._client = None
+
+    def on_event(self, event):
+        """rclone JSON 통계에서 현재 전송 속도를 받음"""
+        stats = event.get("stats")
+        if stats:
+            self.speed = float(stats.get("speed") or 0.0)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            load = self.sampler.sample() if self.adaptive else None
+            target = self.decide(load, cap_at(self.timetable))
+            if not changed(self.limit, target):
+                continue
+            try:
+                self._client.call("core/bwlimit", timeout=5, rate=format_rate(target))
+            except RcloneError:
+                # rc 서버가 아직 준비되지 않았거나 rclone이 끝나는 중
+                continue
+            reasons = self.reasons(load) if load is not None else []
+            detail = f" ({', '.join(reasons)})" if reasons else ""
+            console.info(f"대역폭 조정: {describe_rate(self.limit)} -> {describe_rate(target)}{detail}")
+            self.limit = target
+
+
+def halve(flag):
+    for name in ("--transfers=", "--checkers="):
+        if flag.startswith(name):
+            return f"{name}{max(1, int(flag[len(name):]) // 2)}"
+    return flag
+
+
+def changed(old, new):
+    """5% 넘게 바뀌었는지 (제한 없음 <-> 제한 포함)"""
+    if old is None or new is None:
+        return old is not new
+    return abs(new - old) > old * 0.05
+
+
+def from_env(throttle=False, timetable=None, max_tick=None, tick_command=None):
+    """명령줄/환경 변수 값으로 LoadScheduler 생성. 둘 다 없으면 None"""
+    timetable = timetable or os.environ.get("YUNISYNC_BWLIMIT_SCHEDULE") or None
+    if not throttle and not timetable:
+        return None
+    if max_tick is None:
+        max_tick = float(os.environ.get("YUNISYNC_MAX_TICK") or MAX_TICK)
+    net_limit = os.environ.get("YUNISYNC_NET_LIMIT")
+    scheduler = LoadScheduler(timetable, adaptive=throttle, max_tick=max_tick,
+                              tick_command=tick_command or os.environ.get("YUNISYNC_TICK_COMMAND") or None,
+                              net_limit=parse_rate(net_limit) if net_limit else None)
+    if throttle:
+        lower_priority()
+    return scheduler
@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+"""
+청크 저장소 기반 스냅샷
+파일을 내용 기반 청크로 나눠 googledrive:yuniserver/.yunisync/chunks 아래에 해시 이름으로
+한 번만 저장하고, 스냅샷마다 파일별 청크 목록(레시피)을 .yunisync/snapshots에 기록한다.
+업로드는 새 청크만, 다운로드는 로컬에 없는 청크만 전송하므로 전송량이 변경량에 비례한다.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from . import config, console
+from .chunks import chunk_id, chunk_path, iter_chunks, split_file
+from .journal import Journal
+from .manifest import Manifest, publish, remote_slug, state_dir
+from .pipeline import RestorePipeline, is_copied
+from .rclone import RcloneError, join, transfer_flags
+from .upload import refresh_manifest
+
+FORMAT_VERSION = 1
+
+CHUNK_DIR = "chunks"
+SNAPSHOT_DIR = "snapshots"
+LATEST = "LATEST"
+# prune가 청크를 지울 때마다 바꾸는 세대 표시. 로컬의 알려진 청크 목록은 같은 세대일 때만 믿는다.
+PRUNED = "PRUNED"
+
+# 새 청크를 임시 폴더에 이만큼 모으면 먼저 올리고 비운다 (작은 VM 디스크에서도 첫 업로드가 가능하도록)
+STAGING_LIMIT = 256 * 1024 * 1024
+
+
+def meta_remote(remote):
+    return join(remote, config.META_DIR)
+
+
+def cache_dir(source, remote):
+    """remote별 로컬 캐시 폴더 (마지막 레시피, 알려진 청크 목록, 임시 청크)"""
+    return os.path.join(state_dir(source), "snapshot", remote_slug(remote))
+
+
+class Recipe:
+    """스냅샷 레시피: 경로 -> {size, mtime_ns, mode, md5, chunks: [[청크 ID, 길이], ...]}"""
+
+    def __init__(self, name, files=None, created=None):
+        self.name = name
+        self.files = files if files is not None else {}
+        self.created = created or time.strftime("%Y-%m-%d %H:%M:%S")
+
+    @property
+    def total_bytes(self):
+        return sum(f["size"] for f in self.files.values())
+
+    def chunk_ids(self):
+        return {cid for f in self.files.values() for cid, _ in f["chunks"]}
+
+    def dumps(self):
+        data = {"version": FORMAT_VERSION, "name": self.name, "created": self.created, "files": self.files}
+        return gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def loads(cls, blob):
+        data = json.loads(gzip.decompress(blob).decode("utf-8"))
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 레시피 버전: {data.get('version')}")
+        return cls(data["name"], data["files"], data.get("created"))
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with open(path, "rb") as f:
+                return cls.loads(f.read())
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path + ".tmp", "wb") as f:
+            f.write(self.dumps())
+        os.replace(path + ".tmp", path)
+
+
+def fetch_recipe(rclone, remote, name=None):
+    """원격 레시피 읽기 (name이 없으면 최신). 스냅샷이 없으면 None"""
+    meta = meta_remote(remote)
+    try:
+        if name is None:
+            name = rclone.cat(join(meta, f"{SNAPSHOT_DIR}/{LATEST}")).decode("utf-8").strip()
+        return Recipe.loads(rclone.cat(join(meta, f"{SNAPSHOT_DIR}/{name}.json.gz")))
+    except RcloneError:
+        return None
+
+
+def list_snapshots(rclone, remote):
+    try:
+        names = rclone.lsf(join(meta_remote(remote), SNAPSHOT_DIR), files_only=True)
+    except RcloneError:
+        return []
+    return sorted(n[:-len(".json.gz")] for n in names if n.endswith(".json.gz"))
+
+
+def list_remote_chunks(rclone, remote):
+    try:
+        paths = rclone.lsf(join(meta_remote(remote), CHUNK_DIR), recursive=True, files_only=True)
+    except RcloneError:
+        return set()
+    return {p.rsplit("/", 1)[-1] for p in paths}
+
+
+def fetch_generation(rclone, remote):
+    """원격의 prune 세대 표시 (prune한 적이 없으면 빈 문자열)"""
+    try:
+        return rclone.cat(join(meta_remote(remote), f"{SNAPSHOT_DIR}/{PRUNED}")).decode("utf-8").strip()
+    except RcloneError:
+        return ""
+
+
+def load_known(path, generation=None):
+    """알려진 청크 목록. generation이 주어지면 기록할 때의 세대와 다르면 None (다시 조회해야 함)"""
+    try:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            lines = [line.strip() for line in f if line.strip()]
+    except (OSError, EOFError):
+        return None
+    saved = lines[0][1:] if lines and lines[0].startswith("#") else ""
+    if generation is not None and saved != generation:
+        return None
+    return {line for line in lines if not line.startswith("#")}
+
+
+def save_known(path, known, generation=""):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with gzip.open(path + ".tmp", "wt", encoding="utf-8") as f:
+        f.write(f"#{generation}\n")
+        for cid in sorted(known):
+            f.write(cid + "\n")
+    os.replace(path + ".tmp", path)
+
+
+class PushStats:
+    def __init__(self):
+        self.files = 0
+        self.chunked_files = 0
+        self.new_chunks = 0
+        self.new_bytes = 0
+        self.total_bytes = 0
+
+
+def push(rclone, source=config.SERVER_DIR, remote=config.REMOTE, rescan=False, read_root=None):
+    """스냅샷 업로드. 내용이 바뀐 파일만 청크로 나누고, 원격에 없는 청크만 전송한다.
+    read_root가 있으면 파일은 그 폴더(시점 고정 복사본)에서 읽고, 레시피/청크 캐시는 source 기준으로 둔다."""
+    read_root = read_root or source
+    manifest = refresh_manifest(source, read_root)
+    cache = cache_dir(source, remote)
+    recipe_path = os.path.join(cache, "recipe.json.gz")
+    known_path = os.path.join(cache, "known_chunks.txt.gz")
+
+    previous = Recipe.load(recipe_path) or fetch_recipe(rclone, remote)
+    # 다른 호스트에서 prune했으면 캐시에 있는 청크가 지워졌을 수 있으므로 원격 목록을 다시 조회
+    generation = fetch_generation(rclone, remote)
+    known = None if rescan else load_known(known_path, generation)
+    if known is None:
+        console.info("원격 청크 목록 확인 중...")
+        known = list_remote_chunks(rclone, remote)
+    # 중단된 업로드에서 이미 올라간 청크 (청크는 내용 이름이므로 그대로 재사용)
+    journal = Journal.open(source, "snapshot-push", remote, resume=True)
+    uploaded = {os.path.basename(key) for key in journal.done}
+    if uploaded - known:
+        console.info(f"이전 실행에서 올린 청크 {len(uploaded - known)}개를 건너뜁니다.")
+        known = known | uploaded
+
+    staging = os.path.join(cache, "staging")
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+    meta = meta_remote(remote)
+
+    stats = PushStats()
+    staged = set()
+    files = {}
+
+    def flush():
+        """모아 둔 새 청크를 올리고 임시 폴더 비우기"""
+        rclone.transfer("copy", staging, join(meta, CHUNK_DIR),
+                        transfer_flags() + ["--no-check-dest", "--no-traverse"], on_event=journal.on_event)
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+    try:
+        pending_bytes = stage_files(manifest, read_root, previous, known, staged, staging, files, stats, flush)
+        if pending_bytes:
+            flush()
+    except BaseException:
+        journal.close()
+        raise
+
+    console.info(f"새 청크: {stats.new_chunks}개 ({stats.new_bytes / 1024 / 1024:.1f} MB), "
+                 f"전체 데이터: {stats.total_bytes / 1024 / 1024:.1f} MB")
+
+    # 청크가 모두 올라간 뒤 레시피와 LATEST를 기록해야 불완전한 스냅샷이 보이지 않음
+    recipe = Recipe(time.strftime("%Y%m%d_%H%M%S"), files)
+    rclone.rcat(join(meta, f"{SNAPSHOT_DIR}/{recipe.name}.json.gz"), recipe.dumps())
+    rclone.rcat(join(meta, f"{SNAPSHOT_DIR}/{LATEST}"), recipe.name.encode("utf-8"))
+    entries = {path: [f["size"], f["mtime_ns"], f["md5"]] for path, f in files.items()}
+    publish(rclone, Manifest(entries, manifest.created_ns), remote, layout="snapshot")
+
+    recipe.save(recipe_path)
+    save_known(known_path, known | staged, generation)
+    journal.finish()
+    shutil.rmtree(staging, ignore_errors=True)
+    console.success(f"스냅샷 기록: {recipe.name}")
+    return recipe, stats
+
+
+def stage_files(manifest, read_root, previous, known, staged, staging, files, stats, flush):
+    """바뀐 파일을 청크로 나눠 새 청크를 staging에 쓴다. STAGING_LIMIT을 넘을 때마다 flush()로 올린다.
+    files에 레시피 항목을 채우고, 아직 올리지 않은 바이트 수를 반환한다."""
+    pending_bytes = 0
+    for path in sorted(manifest.entries):
+        size, mtime_ns, md5 = manifest.entries[path]
+        abs_path = os.path.join(read_root, path)
+        try:
+            mode = os.stat(abs_path).st_mode & 0o777
+        except OSError:
+            continue
+        stats.files += 1
+        old = previous.files.get(path) if previous is not None else None
+        # 이전 레시피의 청크가 원격에 남아 있을 때만 재사용 (다른 호스트의 prune로 지워졌으면 다시 나눔)
+        if (old is not None and old["size"] == size and old["md5"] == md5
+                and all(cid in known or cid in staged for cid, _ in old["chunks"])):
+            files[path] = dict(old, mtime_ns=mtime_ns, mode=mode)
+            stats.total_bytes += size
+            continue
+
+        # 스캔 이후 파일이 바뀌었을 수 있으므로 크기와 MD5는 청크를 읽으면서 다시 계산
+        stats.chunked_files += 1
+        chunk_list = []
+        digest = hashlib.md5()
+        size = 0
+        try:
+            for cid, data in split_file(abs_path):
+                chunk_list.append([cid, len(data)])
+                digest.update(data)
+                size += len(data)
+                if cid in known or cid in staged:
+                    continue
+                staged_path = os.path.join(staging, chunk_path(cid))
+                os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+                with open(staged_path, "wb") as f:
+                    f.write(data)
+                staged.add(cid)
+                stats.new_chunks += 1
+                stats.new_bytes += len(data)
+                pending_bytes += len(data)
+                if pending_bytes >= STAGING_LIMIT:
+                    flush()
+                    pending_bytes = 0
+        except OSError as e:
+            console.warning(f"파일을 읽을 수 없어 건너뜁니다: {path} ({e})")
+            continue
+        files[path] = {"size": size, "mtime_ns": mtime_ns, "mode": mode,
+                       "md5": digest.hexdigest(), "chunks": chunk_list}
+        stats.total_bytes += size
+    return pending_bytes
+
+
+def apply_mode(path, entry):
+    if os.name != "posix":
+        return
+    mode = entry.get("mode", 0o644)
+    if path.endswith(config.EXEC_SUFFIXES):
+        mode |= 0o111
+    os.chmod(path, mode)
+
+
+def assemble(chunk_cache, target, entry):
+    """청크 캐시에서 파일을 재구성 (임시 파일에 쓴 뒤 교체)"""
+    os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+    tmp_path = target + ".yunisync-tmp"
+    digest = hashlib.md5()
+    with open(tmp_path, "wb") as out:
+        for cid, _ in entry["chunks"]:
+            with open(os.path.join(chunk_cache, chunk_path(cid)), "rb") as f:
+                data = f.read()
+            digest.update(data)
+            out.write(data)
+    if digest.hexdigest() != entry["md5"]:
+        os.remove(tmp_path)
+        raise ValueError(f"MD5 불일치: {target}")
+    os.utime(tmp_path, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+    os.replace(tmp_path, target)
+    apply_mode(target, entry)
+
+
+class PullStats:
+    def __init__(self):
+        self.rebuilt = 0
+        self.reused_chunks = 0
+        self.downloaded_chunks = 0
+        self.downloaded_bytes = 0
+        self.deleted = 0
+
+
+def pull(rclone, source=config.SERVER_DIR, remote=config.REMOTE, name=None):
+    """스냅샷 다운로드. 로컬과 내용이 다른 파일만 재구성하고, 기존 파일의 청크를 최대한 재사용한다."""
+    recipe = fetch_recipe(rclone, remote, name)
+    if recipe is None:
+        raise ValueError("원격에 스냅샷이 없습니다.")
+    console.info(f"스냅샷: {recipe.name} (파일 {len(recipe.files)}개, "
+                 f"{recipe.total_bytes / 1024 / 1024:.1f} MB)")
+
+    os.makedirs(source, exist_ok=True)
+    local = refresh_manifest(source)
+    rebuild = []
+    for path, entry in recipe.files.items():
+        current = local.entries.get(path)
+        if current is None or current[0] != entry["size"] or current[2] != entry["md5"]:
+            rebuild.append(path)
+
+    stats = PullStats()
+    chunk_cache = os.path.join(cache_dir(source, remote), "chunk_cache")
+    shutil.rmtree(chunk_cache, ignore_errors=True)
+    os.makedirs(chunk_cache)
+    needed = {cid for path in rebuild for cid, _ in recipe.files[path]["chunks"]}
+
+    # 바뀐 파일의 이전 버전에서 재사용 가능한 청크를 먼저 꺼내둔다
+    for path in rebuild:
+        if path not in local.entries:
+            continue
+        try:
+            with open(os.path.join(source, path), "rb") as f:
+                for data in iter_chunks(f):
+                    cid = chunk_id(data)
+                    cached = os.path.join(chunk_cache, chunk_path(cid))
+                    if cid in needed and not os.path.exists(cached):
+                        os.makedirs(os.path.dirname(cached), exist_ok=True)
+                        with open(cached, "wb") as out:
+                            out.write(data)
+                        stats.reused_chunks += 1
+        except OSError:
+            continue
+
+    sizes = {cid: length for path in rebuild for cid, length in recipe.files[path]["chunks"]}
+    missing = sorted(cid for cid in needed if not os.path.exists(os.path.join(chunk_cache, chunk_path(cid))))
+
+    # 필요한 청크가 모두 도착한 파일부터 바로 재구성
+    pipeline = RestorePipeline(source)
+    waiting = {}
+    remaining = {}
+    missing_set = set(missing)
+    for path in rebuild:
+        ids = {cid for cid, _ in recipe.files[path]["chunks"] if cid in missing_set}
+        if not ids:
+            pipeline.submit(assemble, chunk_cache, os.path.join(source, path), recipe.files[path])
+            continue
+        remaining[path] = ids
+        for cid in ids:
+            waiting.setdefault(cid, []).append(path)
+
+    def on_event(event):
+        if not is_copied(event):
+            return
+        cid = event["object"].rsplit("/", 1)[-1]
+        for path in waiting.pop(cid, []):
+            remaining[path].discard(cid)
+            if not remaining[path]:
+                del remaining[path]
+                pipeline.submit(assemble, chunk_cache, os.path.join(source, path), recipe.files[path])
+
+    try:
+        if missing:
+            stats.downloaded_chunks = len(missing)
+            stats.downloaded_bytes = sum(sizes[cid] for cid in missing)
+            console.info(f"청크 다운로드: {len(missing)}개 ({stats.downloaded_bytes / 1024 / 1024:.1f} MB)")
+            rclone.stream("copy", join(meta_remote(remote), CHUNK_DIR), chunk_cache,
+                          transfer_flags(), files=[chunk_path(cid) for cid in missing], on_event=on_event)
+        # 로그에서 완료 이벤트를 놓친 파일은 여기서 재구성
+        for path in list(remaining):
+            pipeline.submit(assemble, chunk_cache, os.path.join(source, path), recipe.files[path])
+    finally:
+        applied, problems = pipeline.close()
+    if problems:
+        raise ValueError("파일 재구성 실패: " + ", ".join(problems[:5]))
+    stats.rebuilt = applied
+
+    for path in local.entries:
+        if path not in recipe.files:
+            try:
+                os.remove(os.path.join(source, path))
+                stats.deleted += 1
+            except OSError:
+                pass
+
+    shutil.rmtree(chunk_cache, ignore_errors=True)
+    console.success(f"재구성 {stats.rebuilt}개, 재사용 청크 {stats.reused_chunks}개, 삭제 {stats.deleted}개")
+    return recipe, stats
+
+
+def restore_paths(rclone, source, remote, recipe, paths):
+    """레시피의 일부 파일만 재구성 (선택 복원). 필요한 청크만 받고 재구성한 파일 수 반환"""
+    chunk_cache = os.path.join(cache_dir(source, remote), "chunk_cache")
+    shutil.rmtree(chunk_cache, ignore_errors=True)
+    os.makedirs(chunk_cache)
+    needed = sorted({cid for path in paths for cid, _ in recipe.files[path]["chunks"]})
+    if needed:
+        rclone.transfer("copy", join(meta_remote(remote), CHUNK_DIR), chunk_cache, transfer_flags(),
+                        files=[chunk_path(cid) for cid in needed])
+    pipeline = RestorePipeline(source)
+    try:
+        for path in paths:
+            pipeline.submit(assemble, chunk_cache, os.path.join(source, path), recipe.files[path])
+    finally:
+        applied, problems = pipeline.close()
+    shutil.rmtree(chunk_cache, ignore_errors=True)
+    if problems:
+        raise ValueError("파일 재구성 실패: " + ", ".join(problems[:5]))
+    return applied
+
+
+def prune(rclone, source=config.SERVER_DIR, remote=config.REMOTE, keep=3):
+    """최근 keep개 스냅샷만 남기고, 어느 스냅샷에서도 쓰지 않는 청크를 삭제"""
+    names = list_snapshots(rclone, remote)
+    if len(names) <= keep:
+        console.info(f"스냅샷 {len(names)}개 - 정리할 항목이 없습니다.")
+        return 0, 0
+    kept, dropped = names[-keep:], names[:-keep]
+    referenced = set()
+    for name in kept:
+        recipe = fetch_recipe(rclone, remote, name)
+        if recipe is None:
+            raise ValueError(f"레시피를 읽을 수 없어 정리를 중단합니다: {name}")
+        referenced |= recipe.chunk_ids()
+
+    meta = meta_remote(remote)
+    unused = sorted(list_remote_chunks(rclone, remote) - referenced)
+    # 지우기 전에 세대를 바꿔 두면 중간에 끊겨도 다른 호스트의 push가 캐시를 버리고 다시 조회한다
+    old_generation = fetch_generation(rclone, remote)
+    generation = f"{time.strftime('%Y%m%d_%H%M%S')}-{os.urandom(4).hex()}"
+    rclone.rcat(join(meta, f"{SNAPSHOT_DIR}/{PRUNED}"), generation.encode("utf-8"))
+    rclone.delete_files(join(meta, SNAPSHOT_DIR), [f"{name}.json.gz" for name in dropped])
+    rclone.delete_files(join(meta, CHUNK_DIR), [chunk_path(cid) for cid in unused])
+
+    known_path = os.path.join(cache_dir(source, remote), "known_chunks.txt.gz")
+    known = load_known(known_path, old_generation)
+    if known is not None:
+        save_known(known_path, known - set(unused), generation)
+    console.success(f"스냅샷 {len(dropped)}개, 청크 {len(unused)}개 삭제")
+    return len(dropped), len(unused)
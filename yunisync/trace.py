@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+"""
+단계별 시간 측정 (추적)
+사전 확인, 원격 목록 조회, 검사, 전송, 후처리, 검증 등 단계마다 걸린 시간과 파일/바이트 수를 기록한다.
+
+- 켜져 있지 않으면 span()은 아무것도 기록하지 않는 객체를 돌려주므로 비용이 거의 없다.
+- write_trace()는 Chrome 추적 형식(JSON)으로 저장한다. chrome://tracing 또는 https://ui.perfetto.dev 에서 열 수 있다.
+  파일이 이미 있으면 이어서 기록하므로 스크립트가 실행하는 여러 명령(백업, 다운로드 등)이 한 타임라인에 모인다.
+- summary()는 단계별 합계 표를 만든다. 같은 이름의 단계는 합산하고, 안쪽 단계는 들여 쓴다.
+- Profiler는 cProfile로 파이썬 코드의 함수별 시간을 기록한다. (메인 스레드만)
+"""
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+
+_enabled = False
+_spans = []
+_lock = threading.Lock()
+_local = threading.local()
+# perf_counter 값을 실제 시각(마이크로초)으로 바꾸는 기준 (프로세스가 달라도 같은 타임라인)
+_origin = time.perf_counter()
+_wall_origin = time.time()
+
+
+def default_trace_path():
+    """YUNISYNC_TRACE 환경 변수 (스크립트의 --trace 옵션이 설정)"""
+    return os.environ.get("YUNISYNC_TRACE") or None
+
+
+def default_profile_path():
+    """YUNISYNC_PROFILE 환경 변수"""
+    return os.environ.get("YUNISYNC_PROFILE") or None
+
+
+def enable():
+    global _enabled, _origin, _wall_origin
+    with _lock:
+        _spans.clear()
+    _origin, _wall_origin = time.perf_counter(), time.time()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+class Span:
+    """기록 중인 단계. with 문으로 쓰고, add()로 파일/바이트 등 개수를 더한다."""
+
+    __slots__ = ("name", "start", "end", "counters", "depth", "tid")
+
+    def __init__(self, name, counters):
+        self.name = name
+        self.counters = dict(counters)
+        self.start = self.end = None
+        self.depth = 0
+        self.tid = threading.get_ident()
+
+    def add(self, **counters):
+        for key, value in counters.items():
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, **values):
+        self.counters.update(values)
+
+    def __enter__(self):
+        stack = _stack()
+        self.depth = len(stack)
+        stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        stack = _stack()
+        if stack and stack[-1] is self:
+            stack.pop()
+        if exc_type is not None:
+            self.counters["error"] = exc_type.__name__
+        with _lock:
+            _spans.append(self)
+        return False
+
+    @property
+    def seconds(self):
+        return (self.end or time.perf_counter()) - self.start
+
+
+class _NullSpan:
+    """추적이 꺼져 있을 때의 단계"""
+
+    def add(self, **counters):
+        pass
+
+    def set(self, **values):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_SPAN = _NullSpan()
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def span(name, **counters):
+    """단계 기록 시작 (with span("transfer", files=3): ...)"""
+    if not _enabled:
+        return NULL_SPAN
+    return Span(name, counters)
+
+
+def record(name, start, end, **counters):
+    """이미 지난 구간을 단계로 기록 (start/end는 time.perf_counter() 값)"""
+    if not _enabled:
+        return
+    item = Span(name, counters)
+    item.start, item.end = start, end
+    item.depth = len(_stack())
+    with _lock:
+        _spans.append(item)
+
+
+def spans():
+    with _lock:
+        return list(_spans)
+
+
+def write_trace(path):
+    """Chrome 추적 형식으로 저장 (기존 파일의 기록 뒤에 추가)"""
+    pid = os.getpid()
+    events = load_events(path)
+    for item in sorted(spans(), key=lambda s: s.start):
+        events.append({
+            "name": item.name,
+            "cat": item.name.split(".")[0],
+            "ph": "X",
+            "ts": round((item.start - _origin + _wall_origin) * 1e6, 1),
+            "dur": round((item.end - item.start) * 1e6, 1),
+            "pid": pid,
+            "tid": item.tid,
+            "args": item.counters,
+        })
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+def load_events(path):
+    """기존 추적 파일의 이벤트 목록 (없거나 깨졌으면 빈 목록)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return list(json.load(f)["traceEvents"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return []
+
+
+def format_count(key, value):
+    if key == "bytes":
+        return f"{value / 1024 / 1024:.1f} MB"
+    return str(value)
+
+
+def summary(wall=None):
+    """단계별 합계 표 (줄 목록). wall은 전체 시간 (없으면 가장 바깥 단계들의 합)"""
+    groups = {}
+    for item in sorted(spans(), key=lambda s: s.start):
+        group = groups.get(item.name)
+        if group is None:
+            group = groups[item.name] = {"depth": item.depth, "count": 0, "seconds": 0.0, "counters": {}}
+        group["depth"] = min(group["depth"], item.depth)
+        group["count"] += 1
+        group["seconds"] += item.end - item.start
+        for key, value in item.counters.items():
+            if isinstance(value, (int, float)):
+                group["counters"][key] = group["counters"].get(key, 0) + value
+    if not groups:
+        return []
+    if wall is None:
+        wall = sum(g["seconds"] for g in groups.values() if g["depth"] == 0) or 1.0
+    width = max(len(name) + 2 * g["depth"] for name, g in groups.items())
+    # 한글은 두 칸을 차지하므로 머리글은 그만큼 덜 채움
+    lines = [f"{'단계':<{width - 2}} {'횟수':>3} {'시간(초)':>7} {'비율':>4}  개수"]
+    for name, g in groups.items():
+        label = "  " * g["depth"] + name
+        counters = g["counters"]
+        detail = ", ".join(f"{key} {format_count(key, value)}" for key, value in counters.items())
+        if counters.get("bytes") and g["seconds"] > 0:
+            detail += f" ({counters['bytes'] / g['seconds'] / 1024 / 1024:.1f} MB/s)"
+        lines.append(f"{label:<{width}} {g['count']:>5} {g['seconds']:>9.2f} {g['seconds'] * 100 / wall:>5.1f}%  {detail}")
+    return lines
+
+
+class Profiler:
+    """cProfile 기록기. stop()에서 통계 파일을 저장하고 누적 시간 상위 함수 목록을 돌려준다."""
+
+    def __init__(self, path):
+        self.path = path
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self, limit=15):
+        self.profile.disable()
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        self.profile.dump_stats(self.path)
+        out = io.StringIO()
+        pstats.Stats(self.profile, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
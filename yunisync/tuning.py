@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+"""
+전송 동시성 자동 조정
+트리의 파일 크기 분포를 보고 작은 파일 / 큰 파일 단계로 나눠 서로 다른 설정으로 sync한다.
+- 작은 파일: 파일당 요청 비용이 크므로 transfers/checkers를 높게
+- 큰 파일: 동시 전송 수는 낮게, 대신 업로드 청크와 버퍼를 크게
+
+각 단계에서 측정한 처리량(작은 파일은 파일/초, 큰 파일은 바이트/초)을 호스트/원격별로
+.yunisync/tuning.json에 저장하고, 다음 실행은 그 값에서 시작해 한 단계씩 올리거나 내려 본다.
+(rclone은 실행 중에 동시성을 바꿀 수 없으므로 조정은 단계/실행 단위로 이뤄진다)
+"""
+
+import json
+import os
+import socket
+
+from . import config, console
+from .manifest import state_dir, walk
+from .rclone import transfer_flags
+
+SMALL_LIMIT = 1024 * 1024
+MIN_TRANSFERS = 1
+MAX_TRANSFERS = 48
+STEP = 1.5
+# 이보다 적게 옮긴 단계는 측정값으로 쓰지 않음
+MIN_SAMPLE_FILES = 50
+MIN_SAMPLE_BYTES = 64 * 1024 * 1024
+# 처리량이 최고 기록의 이 비율 이상이면 같은 방향으로 계속 조정
+KEEP_RATIO = 0.95
+
+MiB = 1024 * 1024
+
+
+class SizeProfile:
+    """작은 파일 / 큰 파일 개수와 바이트 수"""
+
+    def __init__(self):
+        self.small_files = 0
+        self.small_bytes = 0
+        self.large_files = 0
+        self.large_bytes = 0
+        self.largest = 0
+
+    def add(self, size):
+        if size < SMALL_LIMIT:
+            self.small_files += 1
+            self.small_bytes += size
+        else:
+            self.large_files += 1
+            self.large_bytes += size
+        self.largest = max(self.largest, size)
+
+    def describe(self):
+        return (f"작은 파일 {self.small_files}개 ({self.small_bytes / MiB:.1f} MB), "
+                f"큰 파일 {self.large_files}개 ({self.large_bytes / MiB:.1f} MB)")
+
+
+def local_profile(root):
+    profile = SizeProfile()
+    for rel, st in walk(root):
+        profile.add(st.st_size)
+    return profile
+
+
+def remote_profile(rclone, remote):
+    profile = SizeProfile()
+    result = rclone.run(["lsjson", remote, "-R", "--files-only", "--no-mimetype", "--no-modtime"])
+    for item in json.loads(result.stdout.decode("utf-8") or "[]"):
+        if not item.get("Path", "").startswith(".yunisync/"):
+            profile.add(item.get("Size", 0))
+    return profile
+
+
+def available_memory():
+    """사용 가능한 메모리 (바이트). 알 수 없으면 None"""
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def clamp(value, low=MIN_TRANSFERS, high=MAX_TRANSFERS):
+    return max(low, min(high, int(round(value))))
+
+
+class TuningStore:
+    """호스트/원격/방향별 학습 기록 (.yunisync/tuning.json)"""
+
+    def __init__(self, source, remote, direction):
+        self.path = os.path.join(state_dir(source), "tuning.json")
+        self.key = f"{socket.gethostname()}|{remote}|{direction}"
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.data = json.load(f)
+        except (OSError, ValueError):
+            self.data = {}
+
+    def get(self, kind):
+        return self.data.get(self.key, {}).get(kind)
+
+    def put(self, kind, record):
+        self.data.setdefault(self.key, {})[kind] = record
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, self.path)
+
+    def reset(self):
+        if self.data.pop(self.key, None) is not None:
+            with open(self.path, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=2, ensure_ascii=False)
+
+
+def initial_transfers(kind, profile):
+    """기록이 없을 때 크기 분포로 정하는 시작값"""
+    if kind == "small":
+        # 파일이 많을수록 높게 (Drive 요청 제한을 고려해 16개에서 시작)
+        return 16 if profile.small_files >= 1000 else 8
+    # 큰 파일은 파일 수만큼, 최대 4개
+    return clamp(profile.large_files, 1, 4)
+
+
+def next_transfers(record, initial):
+    """이전 기록으로 이번 실행의 transfers 결정 (언덕 오르기)
+    나아지는 동안 같은 방향으로 STEP배씩, 나빠지면 최고 기록에서 반대 방향, 양쪽 다 나빠지면 최고 기록에 고정"""
+    if not record:
+        return initial
+    best, last = record["best"], record.get("last")
+    direction = record.get("direction", 1)
+    if last is None or direction == 0:
+        return best["transfers"]
+    if last["rate"] >= best["rate"] * KEEP_RATIO:
+        base = last["transfers"]
+    elif record.get("reversed"):
+        record["direction"] = 0
+        return best["transfers"]
+    else:
+        base = best["transfers"]
+        direction = record["direction"] = -direction
+        record["reversed"] = True
+    return clamp(base * STEP if direction > 0 else base / STEP)
+
+
+def large_buffers(profile, transfers):
+    """큰 파일 단계의 업로드 청크/버퍼 크기 (MB). 메모리의 1/4을 넘지 않게 제한"""
+    average = profile.large_bytes / profile.large_files if profile.large_files else 0
+    chunk = 64 if average >= 256 * MiB else 32
+    buffer = 32
+    memory = available_memory()
+    if memory:
+        while chunk > 8 and (chunk + buffer) * MiB * transfers > memory / 4:
+            chunk //= 2
+            buffer = max(8, buffer // 2)
+    return chunk, buffer
+
+
+class Pass:
+    """sync 한 단계 (필터와 동시성 설정)"""
+
+    def __init__(self, kind, transfers, checkers, filters, extra=()):
+        self.kind = kind
+        self.transfers = transfers
+        self.checkers = checkers
+        self.filters = list(filters)
+        self.extra = list(extra)
+
+    def flags(self):
+        return transfer_flags(transfers=self.transfers, checkers=self.checkers) + self.filters + self.extra
+
+    def describe(self):
+        text = f"transfers={self.transfers}, checkers={self.checkers}"
+        if self.extra:
+            text += ", " + ", ".join(flag.lstrip("-") for flag in self.extra)
+        return text
+
+
+def plan(profile, store):
+    """크기 분포와 기록으로 sync 단계 목록 생성"""
+    passes = []
+    if profile.small_files:
+        transfers = next_transfers(store.get("small"), initial_transfers("small", profile))
+        passes.append(Pass("small", transfers, transfers * 2, [f"--max-size={SMALL_LIMIT - 1}B"]))
+    if profile.large_files:
+        transfers = next_transfers(store.get("large"), initial_transfers("large", profile))
+        chunk, buffer = large_buffers(profile, transfers)
+        passes.append(Pass("large", transfers, max(4, transfers * 2), [f"--min-size={SMALL_LIMIT}B"],
+                           [f"--drive-chunk-size={chunk}M", f"--buffer-size={buffer}M"]))
+    if not passes:
+        # 빈 트리: 원격 정리만 하면 되므로 기본 설정 한 단계
+        passes.append(Pass("small", config.TRANSFERS, config.CHECKERS, []))
+    elif len(passes) == 1:
+        # 한 종류뿐이면 크기 필터 없이 실행 (원격에만 남은 다른 크기 파일도 정리되도록)
+        passes[0].filters = []
+    return passes
+
+
+def record_result(store, kind, transfers, rate):
+    """측정한 처리량을 기록하고 최고 기록 갱신"""
+    record = store.get(kind) or {"best": {"transfers": transfers, "rate": rate}, "direction": 1}
+    if record.get("direction") == 0 and transfers == record["best"]["transfers"]:
+        # 고정된 설정은 최근 측정값으로 갱신 (회선 상태 변화 반영)
+        record["best"]["rate"] = rate
+    elif rate > record["best"]["rate"]:
+        record["best"] = {"transfers": transfers, "rate": rate}
+    record["last"] = {"transfers": transfers, "rate": rate}
+    store.put(kind, record)
+
+
+def auto_sync(rclone, src, dst, base_flags, profile, store, on_event=None):
+    """크기별 단계로 나눠 sync하고 각 단계의 처리량을 기록. on_event는 rclone JSON 로그를 함께 받는다."""
+    console.info(f"자동 조정: {profile.describe()}")
+    for p in plan(profile, store):
+        console.info(f"[{p.kind}] {p.describe()}")
+        last = {}
+
+        def collect(event):
+            last.update(event.get("stats") or {})
+            if on_event is not None:
+                on_event(event)
+
+        rclone.stream("sync", src, dst, p.flags() + list(base_flags), on_event=collect)
+        files, moved, seconds = last.get("transfers", 0), last.get("bytes", 0), last.get("elapsedTime", 0)
+        if not seconds:
+            continue
+        if p.kind == "small" and files >= MIN_SAMPLE_FILES:
+            rate = files / seconds
+            console.info(f"[{p.kind}] {rate:.1f}개/s")
+        elif p.kind == "large" and moved >= MIN_SAMPLE_BYTES:
+            rate = moved / seconds
+            console.info(f"[{p.kind}] {rate / MiB:.1f} MB/s")
+        else:
+            continue
+        record_result(store, p.kind, p.transfers, rate)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+증분 업로드
+로컬 매니페스트와 마지막 업로드 상태를 비교해 바뀐 파일만 rclone에 넘긴다.
+원격 전체 목록 조회와 checker 비교 과정을 건너뛴다.
+"""
+
+from . import config, console
+from .journal import Journal
+from .manifest import Manifest, diff, fetch_remote, manifest_path, publish, scan, synced_path
+from .rclone import exclude_flags, transfer_flags
+
+
+def refresh_manifest(source, read_root=None):
+    """로컬 매니페스트를 증분 갱신하고 저장.
+    read_root는 실제로 읽을 폴더 (시점 고정 복사본). 매니페스트는 그대로 source 기준 위치에 저장한다."""
+    path = manifest_path(source)
+    current, stats = scan(read_root or source, Manifest.load(path))
+    current.save(path)
+    console.info(f"매니페스트 갱신: 파일 {stats.files}개, 새로 해시 {stats.hashed}개 "
+                 f"({stats.hashed_bytes / 1024 / 1024:.1f} MB), {stats.seconds:.1f}초")
+    return current
+
+
+def skip_done(changed, current, journal):
+    """중단된 실행에서 이미 보낸 파일(그 뒤로 바뀌지 않은 것)을 제외"""
+    pending = [path for path in changed if not journal.is_done(path, *current.entries[path][:2])]
+    if len(pending) < len(changed):
+        console.info(f"이전 실행에서 보낸 파일 {len(changed) - len(pending)}개를 건너뜁니다.")
+    return pending
+
+
+def incremental_upload(rclone, source=config.SERVER_DIR, remote=config.REMOTE, full=False, dry_run=False,
+                       resume=False, current=None, transfers=None, read_root=None):
+    """변경분만 업로드. 기준 상태가 없거나 full이면 전체 sync 후 기준 상태를 기록한다.
+    resume이면 중단된 실행의 작업 기록에서 이미 보낸 파일을 건너뛴다.
+    current는 이미 스캔한 로컬 매니페스트 (여러 원격에 올릴 때 한 번만 스캔), transfers는 동시 전송 수.
+    read_root가 있으면 파일은 그 폴더(시점 고정 복사본)에서 읽고, 기준 상태와 작업 기록은 source 기준으로 둔다."""
+    read_root = read_root or source
+    if current is None:
+        current = refresh_manifest(source, read_root)
+    baseline_path = synced_path(source, remote)
+    baseline = None if full else Manifest.load(baseline_path)
+
+    if baseline is None:
+        console.info("기준 매니페스트가 없어 전체 동기화를 실행합니다.")
+        if dry_run:
+            return len(current), 0
+        journal = Journal.open(source, "upload", remote, resume=resume, root=read_root)
+        try:
+            rclone.transfer("sync", read_root, remote, transfer_flags(transfers=transfers) + exclude_flags(),
+                            on_event=journal.on_event)
+        except BaseException:
+            journal.close()
+            raise
+        current.save(baseline_path)
+        publish(rclone, current, remote)
+        journal.finish()
+        return len(current), 0
+
+    changed, deleted = diff(current, baseline)
+    console.info(f"변경된 파일: {len(changed)}개, 삭제된 파일: {len(deleted)}개")
+    if dry_run:
+        for path in changed:
+            print(f"  + {path}")
+        for path in deleted:
+            print(f"  - {path}")
+        return len(changed), len(deleted)
+
+    journal = Journal.open(source, "upload", remote, resume=resume, root=read_root)
+    try:
+        changed = skip_done(changed, current, journal)
+        if changed:
+            rclone.transfer("copy", read_root, remote,
+                            transfer_flags(transfers=transfers) + ["--no-check-dest"], files=changed,
+                            on_event=journal.on_event)
+        if deleted:
+            rclone.delete_files(remote, deleted)
+    except BaseException:
+        journal.close()
+        raise
+    current.save(baseline_path)
+    publish(rclone, current, remote)
+    journal.finish()
+    return len(changed), len(deleted)
+
+
+def resume_sync(rclone, source=config.SERVER_DIR, remote=config.REMOTE):
+    """중단된 sync 업로드 이어하기.
+    원격 매니페스트(마지막 업로드 상태)와 작업 기록으로 남은 파일만 보내므로 원격 목록을 조회하지 않는다."""
+    journal = Journal.open(source, "sync-up", remote, resume=True, root=source)
+    try:
+        current = refresh_manifest(source)
+        baseline = fetch_remote(rclone, remote)
+        if baseline is None or baseline.layout != "files":
+            console.info("원격 매니페스트가 없어 전체 sync로 이어갑니다. (이미 올라간 파일은 rclone이 건너뜀)")
+            rclone.transfer("sync", source, remote, transfer_flags() + exclude_flags(), on_event=journal.on_event)
+        else:
+            changed, deleted = diff(current, baseline)
+            # 중단된 실행에서 올렸다가 그 뒤 로컬에서 지운 파일
+            deleted += sorted(path for path in journal.done
+                              if path not in current.entries and path not in baseline.entries)
+            changed = skip_done(changed, current, journal)
+            console.info(f"남은 파일: {len(changed)}개, 삭제할 파일: {len(deleted)}개")
+            if changed:
+                # 기록 직전에 끊긴 파일도 있으므로 원격 확인은 유지 (같으면 rclone이 건너뜀)
+                rclone.transfer("copy", source, remote, transfer_flags(), files=changed, on_event=journal.on_event)
+            rclone.delete_files(remote, deleted)
+    except BaseException:
+        journal.close()
+        raise
+    publish(rclone, current, remote)
+    journal.finish()
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+병렬 무결성 검증
+로컬 트리의 MD5를 여러 프로세스로 계산해 업로드 때 기록한 원격 매니페스트와 비교한다.
+
+- 크기/수정 시각이 로컬 매니페스트(.yunisync/manifest.json.gz)와 같은 파일은 다시 읽지 않는다.
+- 큰 파일은 mmap, 작은 파일은 큰 버퍼로 읽고, 작은 파일은 묶어서 프로세스에 넘겨 전달 비용을 줄인다.
+- 큰 파일부터 나눠 주므로 마지막에 큰 파일 하나만 남아 코어가 노는 시간이 짧다.
+결과는 로컬 매니페스트로 저장되므로 이후의 증분 업로드/스캔도 다시 해시하지 않는다.
+"""
+
+import hashlib
+import mmap
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from . import config, console, trace
+from .manifest import RACY_WINDOW_NS, Manifest, fetch_remote, manifest_path, walk
+
+READ_SIZE = 8 * 1024 * 1024
+# 이 크기 이상은 mmap으로 읽음 (페이지 캐시에서 바로 해시, 복사 없음)
+MMAP_MIN = 64 * 1024 * 1024
+# 작은 파일을 한 작업으로 묶는 기준
+BATCH_FILES = 256
+BATCH_BYTES = 64 * 1024 * 1024
+# 해시할 양이 이보다 적으면 프로세스를 띄우지 않고 바로 계산
+INLINE_BYTES = 32 * 1024 * 1024
+
+
+def hash_file(path, size):
+    md5 = hashlib.md5()
+    with open(path, "rb") as f:
+        if size >= MMAP_MIN:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if hasattr(mm, "madvise"):
+                    mm.madvise(mmap.MADV_SEQUENTIAL)
+                view = memoryview(mm)
+                try:
+                    for offset in range(0, len(mm), READ_SIZE):
+                        md5.update(view[offset:offset + READ_SIZE])
+                finally:
+                    view.release()
+        else:
+            buffer = bytearray(min(READ_SIZE, max(size, 1)))
+            view = memoryview(buffer)
+            while True:
+                count = f.readinto(buffer)
+                if not count:
+                    break
+                md5.update(view[:count])
+    return md5.hexdigest()
+
+
+def hash_batch(root, paths):
+    """작업 프로세스: [(경로, 크기, 수정 시각, MD5 또는 None)] 반환 (읽는 중 사라진 파일은 None)"""
+    results = []
+    for rel in paths:
+        path = os.path.join(root, rel)
+        try:
+            st = os.stat(path)
+            digest = hash_file(path, st.st_size)
+        except OSError:
+            results.append((rel, 0, 0, None))
+            continue
+        results.append((rel, st.st_size, st.st_mtime_ns, digest))
+    return results
+
+
+class HashStats:
+    def __init__(self):
+        self.files = 0
+        self.cached = 0
+        self.hashed = 0
+        self.hashed_bytes = 0
+        self.workers = 0
+        self.seconds = 0.0
+
+    def describe(self):
+        rate = self.hashed_bytes / self.seconds / 1024 / 1024 if self.seconds else 0
+        return (f"파일 {self.files}개 (캐시 {self.cached}개, 해시 {self.hashed}개 "
+                f"{self.hashed_bytes / 1024 / 1024:.1f} MB), {self.seconds:.1f}초, "
+                f"{rate:.0f} MB/s, 프로세스 {self.workers or 1}개")
+
+
+def make_batches(pending):
+    """(경로, 크기) 목록을 큰 파일부터 작업 단위로 나눔"""
+    pending = sorted(pending, key=lambda item: item[1], reverse=True)
+    batches = []
+    current, current_bytes = [], 0
+    for rel, size in pending:
+        if size >= BATCH_BYTES:
+            batches.append([rel])
+            continue
+        current.append(rel)
+        current_bytes += size
+        if len(current) >= BATCH_FILES or current_bytes >= BATCH_BYTES:
+            batches.append(current)
+            current, current_bytes = [], 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+def hash_tree(root, previous=None, workers=None, excludes=None):
+    """root 전체를 해시해 매니페스트 생성. previous와 크기/수정 시각이 같은 파일은 재사용 -> (Manifest, HashStats)"""
+    started = time.time()
+    created_ns = time.time_ns()
+    old = previous.entries if previous is not None else {}
+    racy_limit = previous.created_ns - RACY_WINDOW_NS if previous is not None else 0
+    stats = HashStats()
+    entries = {}
+    pending = []
+    for rel, st in walk(root, excludes):
+        stats.files += 1
+        entry = old.get(rel)
+        if (entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns
+                and st.st_mtime_ns < racy_limit):
+            entries[rel] = entry
+            stats.cached += 1
+            continue
+        pending.append((rel, st.st_size))
+
+    def collect(results):
+        for rel, size, mtime_ns, digest in results:
+            if digest is None:
+                continue
+            entries[rel] = [size, mtime_ns, digest]
+            stats.hashed += 1
+            stats.hashed_bytes += size
+
+    batches = make_batches(pending)
+    workers = min(workers or os.cpu_count() or 1, len(batches))
+    if sum(size for rel, size in pending) < INLINE_BYTES or workers < 2:
+        for batch in batches:
+            collect(hash_batch(root, batch))
+    else:
+        stats.workers = workers
+        with ProcessPoolExecutor(max_workers=stats.workers) as pool:
+            futures = [pool.submit(hash_batch, root, batch) for batch in batches]
+            for future in as_completed(futures):
+                collect(future.result())
+
+    stats.seconds = time.time() - started
+    return Manifest(entries, created_ns), stats
+
+
+def compare(local, expected):
+    """로컬 매니페스트와 원격 매니페스트 비교. 문제 목록 반환"""
+    problems = []
+    for rel, entry in sorted(expected.entries.items()):
+        current = local.entries.get(rel)
+        if current is None:
+            problems.append(f"{rel}: 받지 못한 파일")
+        elif current[0] != entry[0]:
+            problems.append(f"{rel}: 크기 불일치 ({current[0]} != {entry[0]})")
+        elif entry[2] and current[2] != entry[2]:
+            problems.append(f"{rel}: MD5 불일치")
+    for rel in sorted(local.entries):
+        if rel not in expected.entries:
+            problems.append(f"{rel}: 원격 매니페스트에 없는 파일")
+    return problems
+
+
+def verify(rclone, source=config.SERVER_DIR, remote=config.REMOTE, workers=None, rehash=False, expected=None):
+    """원격 매니페스트와 로컬 트리의 MD5 비교 -> (문제 목록, HashStats)
+    rehash면 로컬 매니페스트의 해시를 믿지 않고 모든 파일을 다시 읽는다."""
+    if expected is None:
+        expected = fetch_remote(rclone, remote)
+    if expected is None:
+        raise ValueError("원격 매니페스트가 없어 검증할 수 없습니다. (yunisync publish로 먼저 기록)")
+    path = manifest_path(source)
+    previous = None if rehash else Manifest.load(path)
+    console.info(f"무결성 검증 중 (원격 기록 {len(expected)}개, 업로드 방식: {expected.layout})...")
+    with trace.span("verify.hash") as span:
+        local, stats = hash_tree(source, previous, workers)
+        span.set(files=stats.files, hashed=stats.hashed, bytes=stats.hashed_bytes)
+    local.save(path)
+    console.info(f"해시: {stats.describe()}")
+    return compare(local, expected), stats
@@ -0,0 +1,569 @@
+# -*- coding: utf-8 -*-
+"""
+감시 모드 (연속 복제)
+원본 서버에서 yuniserver의 변경을 감시해 몇 초 단위로 원격에 올리고, 대상 서버는 같은 변경을 받아 적용한다.
+서버 이전 때 마지막 전환(서버 중지 -> 남은 변경 반영 -> 새 서버 시작)에서 옮길 양이 몇 초 분량으로 줄어든다.
+
+- 원본 (watch): Linux는 inotify, 그 외에는 주기적인 stat 비교로 바뀐 경로를 모으고,
+  마지막 변경 후 debounce초 동안 조용하거나 첫 변경 후 max_delay초가 지나면 한 묶음으로 올린다.
+  묶음마다 원격 .yunisync/changes/에 변경 기록(바뀐 파일, 삭제된 파일)을 남긴다.
+- 대상 (pull): 마지막으로 적용한 기록 번호 이후의 기록만 읽어 해당 파일만 받고, 삭제된 파일은 지운다.
+  기록이 정리되어 중간이 비었거나 처음 실행이면 전체 동기화 후 이어서 적용한다.
+
+감시 중에 다른 방식으로 업로드하면 변경 기록이 남지 않으므로, 전환 전에는 감시 모드만 사용한다.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import gzip
+import json
+import os
+import select
+import socket
+import struct
+import sys
+import time
+
+from . import config, console
+from .manifest import (Manifest, diff, file_md5, is_excluded, publish, remote_slug, state_dir,
+                       synced_path, walk)
+from .pipeline import RestorePipeline, stream_download
+from .rclone import RcloneError, exclude_flags, join, transfer_flags
+from .upload import refresh_manifest
+
+FORMAT_VERSION = 1
+CHANGES_DIR = "changes"
+
+DEBOUNCE = 2.0
+MAX_DELAY = 10.0
+POLL_INTERVAL = 5.0
+PULL_INTERVAL = 5.0
+# 전송이 실패한 묶음을 다시 시도하기까지 기다리는 시간
+RETRY_DELAY = 30.0
+# 원격 매니페스트는 묶음마다가 아니라 이 간격(초)으로 갱신 (종료할 때는 항상 갱신)
+PUBLISH_INTERVAL = 60.0
+# 원격에 남길 변경 기록 수 (PRUNE_EVERY 묶음마다 정리)
+KEEP_CHANGES = 1000
+PRUNE_EVERY = 100
+
+# inotify 이벤트 (linux/inotify.h)
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_ONLYDIR | IN_DONT_FOLLOW)
+EVENT_HEADER = struct.Struct("iIII")
+
+
+def changes_remote(remote):
+    return join(remote, f"{config.META_DIR}/{CHANGES_DIR}")
+
+
+def change_name(seq):
+    return f"{seq:010d}.json.gz"
+
+
+def list_changes(rclone, remote):
+    """원격 변경 기록 번호 목록 (오름차순)"""
+    try:
+        names = rclone.lsf(changes_remote(remote), files_only=True)
+    except RcloneError:
+        return []
+    return sorted(int(n[:-len(".json.gz")]) for n in names
+                  if n.endswith(".json.gz") and n[:-len(".json.gz")].isdigit())
+
+
+class ChangeSet:
+    """변경 기록 한 건
+
+    changed: 경로 -> [크기, 수정 시각(ns), MD5]
+    full: 원격 전체를 다시 맞춘 기록 (대상은 이 기록을 만나면 전체 동기화)
+    """
+
+    def __init__(self, seq, changed=None, deleted=None, full=False, created=None):
+        self.seq = seq
+        self.changed = changed or {}
+        self.deleted = list(deleted or [])
+        self.full = full
+        self.created = created or time.time()
+
+    def dumps(self):
+        data = {
+            "version": FORMAT_VERSION,
+            "seq": self.seq,
+            "created": self.created,
+            "host": socket.gethostname(),
+            "full": self.full,
+            "changed": self.changed,
+            "deleted": self.deleted,
+        }
+        return gzip.compress(json.dumps(data, separators=(",", ":")).encode("utf-8"))
+
+    @classmethod
+    def loads(cls, blob):
+        data = json.loads(gzip.decompress(blob).decode("utf-8"))
+        if data.get("version") != FORMAT_VERSION:
+            raise ValueError(f"지원하지 않는 변경 기록 버전: {data.get('version')}")
+        return cls(data["seq"], data["changed"], data["deleted"], data.get("full", False), data.get("created"))
+
+
+class InotifyWatcher:
+    """inotify로 하위 폴더까지 감시 (Linux 전용, ctypes로 libc 호출)"""
+
+    name = "inotify"
+
+    def __init__(self, root, excludes=None):
+        self.root = root
+        self.excludes = config.EXCLUDES if excludes is None else excludes
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 실패")
+        self.dirs = {}
+        self.overflow = False
+        try:
+            self.add_tree("")
+        except OSError:
+            self.close()
+            raise
+
+    def add_dir(self, rel):
+        path = os.path.join(self.root, rel) if rel else self.root
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                raise OSError(err, "inotify 감시 개수 한도 초과 (sysctl fs.inotify.max_user_watches 확인)")
+            # 감시를 거는 사이 삭제된 폴더
+            return False
+        self.dirs[wd] = rel
+        return True
+
+    def add_tree(self, rel):
+        """rel 아래 모든 폴더에 감시를 걸고, 안에 이미 있던 파일 목록 반환 (새로 생긴 폴더용)"""
+        found = set()
+        stack = [rel]
+        while stack:
+            rel_dir = stack.pop()
+            if not self.add_dir(rel_dir):
+                continue
+            abs_dir = os.path.join(self.root, rel_dir) if rel_dir else self.root
+            try:
+                entries = list(os.scandir(abs_dir))
+            except OSError:
+                continue
+            for entry in entries:
+                child = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                if entry.is_symlink():
+                    continue
+                if entry.is_dir():
+                    if child != config.META_DIR:
+                        stack.append(child)
+                elif not is_excluded(entry.name, self.excludes):
+                    found.add(child)
+        return found
+
+    def resync(self):
+        """이벤트가 넘친 뒤 감시를 다시 건다. 넘치는 동안 생긴 폴더는 IN_CREATE를 놓쳐 감시가 없고,
+        옮겨지거나 지워진 폴더의 감시 정보도 맞지 않을 수 있다. (같은 폴더는 같은 wd를 돌려받음)"""
+        previous = self.dirs
+        self.dirs = {}
+        self.add_tree("")
+        for wd in previous:
+            if wd not in self.dirs:
+                self.libc.inotify_rm_watch(self.fd, wd)
+
+    def forget_tree(self, rel):
+        """옮겨진 폴더의 감시 해제 (새 위치는 IN_MOVED_TO에서 다시 등록)"""
+        for wd, rel_dir in list(self.dirs.items()):
+            if rel_dir == rel or rel_dir.startswith(rel + "/"):
+                self.libc.inotify_rm_watch(self.fd, wd)
+                del self.dirs[wd]
+
+    def read(self, timeout):
+        """timeout초까지 기다려 (바뀐 파일 경로, 사라진 폴더 경로) 반환"""
+        files, gone = set(), set()
+        ready, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not ready:
+            return files, gone
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return files, gone
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            raw = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length]
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                self.overflow = True
+                continue
+            if mask & IN_IGNORED:
+                self.dirs.pop(wd, None)
+                continue
+            rel_dir = self.dirs.get(wd)
+            name = os.fsdecode(raw.rstrip(b"\0"))
+            if rel_dir is None or not name:
+                continue
+            rel = f"{rel_dir}/{name}" if rel_dir else name
+            if mask & IN_ISDIR:
+                if rel == config.META_DIR:
+                    continue
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    files |= self.add_tree(rel)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self.forget_tree(rel)
+                    gone.add(rel)
+            elif not is_excluded(name, self.excludes):
+                files.add(rel)
+        return files, gone
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+class PollingWatcher:
+    """interval초마다 전체 stat을 비교 (inotify를 쓸 수 없을 때)"""
+
+    name = "polling"
+
+    def __init__(self, root, excludes=None, interval=POLL_INTERVAL):
+        self.root = root
+        self.excludes = excludes
+        self.interval = interval
+        self.overflow = False
+        self.state = self.snapshot()
+        self.next_poll = time.monotonic() + interval
+
+    def snapshot(self):
+        return {rel: (st.st_size, st.st_mtime_ns) for rel, st in walk(self.root, self.excludes)}
+
+    def resync(self):
+        # 매번 전체를 비교하므로 다시 맞출 감시 정보가 없음
+        pass
+
+    def read(self, timeout):
+        files = set()
+        wait = self.next_poll - time.monotonic()
+        if wait > timeout:
+            time.sleep(max(0.0, timeout))
+            return files, set()
+        time.sleep(max(0.0, wait))
+        current = self.snapshot()
+        self.next_poll = time.monotonic() + self.interval
+        for rel, stat in current.items():
+            if self.state.get(rel) != stat:
+                files.add(rel)
+        files.update(rel for rel in self.state if rel not in current)
+        self.state = current
+        return files, set()
+
+    def close(self):
+        pass
+
+
+def open_watcher(root, poll=False, interval=POLL_INTERVAL):
+    """Linux면 inotify, 안 되면 polling 감시기"""
+    if not poll and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            console.warning(f"inotify를 사용할 수 없어 주기적 확인으로 감시합니다. ({e})")
+    return PollingWatcher(root, interval=interval)
+
+
+class Replicator:
+    """바뀐 경로를 원격에 반영하고 변경 기록/기준 상태를 갱신"""
+
+    def __init__(self, rclone, source=config.SERVER_DIR, remote=config.REMOTE):
+        self.rclone = rclone
+        self.source = source
+        self.remote = remote
+        self.baseline_path = synced_path(source, remote)
+        self.baseline = Manifest.load(self.baseline_path)
+        changes = list_changes(rclone, remote)
+        self.seq = changes[-1] if changes else 0
+        self.pushed = 0
+        self.dirty = False
+        self.published = time.monotonic()
+
+    def catch_up(self):
+        """전체 스캔으로 기준 상태와의 차이를 반영 (시작할 때, inotify 이벤트가 넘쳤을 때)"""
+        current = refresh_manifest(self.source)
+        if self.baseline is None:
+            console.info("기준 매니페스트가 없어 전체 동기화를 실행합니다.")
+            self.rclone.transfer("sync", self.source, self.remote, transfer_flags(progress=False) + exclude_flags())
+            self.baseline = current
+            self.record(ChangeSet(self.seq + 1, full=True))
+            return
+        changed, deleted = diff(current, self.baseline)
+        console.info(f"밀린 변경: 파일 {len(changed)}개, 삭제 {len(deleted)}개")
+        if changed or deleted:
+            self.push({path: current.entries[path] for path in changed}, deleted)
+        else:
+            # 내용이 같아 올리지 않은 파일의 수정 시각만 갱신
+            self.baseline = current
+            self.baseline.save(self.baseline_path)
+
+    def resolve(self, files, gone):
+        """이벤트 경로를 (바뀐 파일 -> 항목, 삭제된 파일) 로 정리. 내용이 같은 파일은 제외"""
+        files = set(files)
+        for rel_dir in gone:
+            prefix = rel_dir + "/"
+            files.update(path for path in self.baseline.entries if path.startswith(prefix))
+        changed, deleted = {}, []
+        for rel in sorted(files):
+            path = os.path.join(self.source, rel)
+            try:
+                st = os.stat(path)
+            except OSError:
+                if rel in self.baseline.entries:
+                    deleted.append(rel)
+                continue
+            if not os.path.isfile(path):
+                continue
+            entry = self.baseline.entries.get(rel)
+            if entry is not None and entry[0] == st.st_size and entry[1] == st.st_mtime_ns:
+                continue
+            try:
+                digest = file_md5(path)
+            except OSError:
+                continue
+            if entry is not None and entry[0] == st.st_size and entry[2] == digest:
+                entry[1] = st.st_mtime_ns
+                continue
+            changed[rel] = [st.st_size, st.st_mtime_ns, digest]
+        return changed, deleted
+
+    def flush(self, files, gone):
+        """한 묶음 반영. 올린 것이 있으면 True"""
+        changed, deleted = self.resolve(files, gone)
+        if not changed and not deleted:
+            return False
+        self.push(changed, deleted)
+        return True
+
+    def push(self, changed, deleted):
+        started = time.time()
+        if changed:
+            self.rclone.transfer("copy", self.source, self.remote,
+                                 transfer_flags(progress=False) + ["--no-check-dest"], files=sorted(changed))
+        if deleted:
+            self.rclone.delete_files(self.remote, deleted)
+        self.baseline.entries.update(changed)
+        for path in deleted:
+            self.baseline.entries.pop(path, None)
+        self.record(ChangeSet(self.seq + 1, changed, deleted))
+        size = sum(entry[0] for entry in changed.values())
+        console.success(f"#{self.seq}: 전송 {len(changed)}개 ({size / 1024 / 1024:.1f} MB), "
+                        f"삭제 {len(deleted)}개, {time.time() - started:.1f}초")
+
+    def record(self, change):
+        """변경 기록을 원격에 남기고 기준 상태 저장"""
+        self.rclone.rcat(join(changes_remote(self.remote), change_name(change.seq)), change.dumps())
+        self.seq = change.seq
+        self.baseline.created_ns = time.time_ns()
+        self.baseline.save(self.baseline_path)
+        self.dirty = True
+        self.pushed += 1
+        if self.pushed % PRUNE_EVERY == 0:
+            self.prune()
+
+    def prune(self):
+        old = [change_name(seq) for seq in list_changes(self.rclone, self.remote) if seq <= self.seq - KEEP_CHANGES]
+        if old:
+            self.rclone.delete_files(changes_remote(self.remote), old)
+
+    def maybe_publish(self, force=False):
+        """원격 매니페스트 갱신 (PUBLISH_INTERVAL마다, force면 바로)"""
+        if not self.dirty:
+            return
+        if not force and time.monotonic() - self.published < PUBLISH_INTERVAL:
+            return
+        publish(self.rclone, self.baseline, self.remote)
+        self.dirty = False
+        self.published = time.monotonic()
+
+
+def watch(rclone, source=config.SERVER_DIR, remote=config.REMOTE, debounce=DEBOUNCE, max_delay=MAX_DELAY,
+          poll=False, poll_interval=POLL_INTERVAL):
+    """Ctrl+C로 멈출 때까지 변경을 감시해 원격에 반영. 멈출 때 남은 변경을 올리고 매니페스트를 갱신한다."""
+    # 스캔 중에 생긴 변경도 놓치지 않도록 감시를 먼저 시작
+    watcher = open_watcher(source, poll, poll_interval)
+    console.info(f"감시 방식: {watcher.name}")
+    replicator = Replicator(rclone, source, remote)
+    files, gone = set(), set()
+    first = last = None
+    hold_until = 0.0
+    try:
+        replicator.catch_up()
+        replicator.maybe_publish(force=True)
+        console.success(f"{source} 감시 중 (묶음 대기 {debounce:g}초, 최대 {max_delay:g}초). 끝내려면 Ctrl+C")
+        while True:
+            due = None
+            if first is not None:
+                due = max(min(last + debounce, first + max_delay), hold_until)
+            # 매니페스트 갱신 시점도 확인하도록 최대 1초씩 기다림
+            timeout = 1.0 if due is None else min(1.0, due - time.monotonic())
+            new_files, new_gone = watcher.read(timeout)
+            now = time.monotonic()
+            if new_files or new_gone:
+                files |= new_files
+                gone |= new_gone
+                last = now
+                first = first or now
+            if watcher.overflow:
+                console.warning("감시 이벤트가 넘쳐 전체 스캔으로 다시 맞춥니다.")
+                watcher.overflow = False
+                # 새 폴더 감시를 먼저 걸어야 스캔 이후의 변경도 이벤트로 들어옴
+                watcher.resync()
+                replicator.catch_up()
+                files, gone = set(), set()
+                first = last = None
+            if first is not None and now >= max(min(last + debounce, first + max_delay), hold_until):
+                try:
+                    replicator.flush(files, gone)
+                    files, gone = set(), set()
+                    first = last = None
+                    hold_until = 0.0
+                except RcloneError as e:
+                    console.error(f"{e} ({RETRY_DELAY:g}초 후 다시 시도)")
+                    hold_until = now + RETRY_DELAY
+            try:
+                replicator.maybe_publish()
+            except RcloneError as e:
+                console.warning(f"원격 매니페스트 갱신 실패: {e}")
+    except KeyboardInterrupt:
+        if replicator.baseline is None:
+            raise
+        console.info("감시 종료: 남은 변경을 반영합니다...")
+        new_files, new_gone = watcher.read(0)
+        replicator.flush(files | new_files, gone | new_gone)
+        replicator.maybe_publish(force=True)
+        console.success(f"남은 변경 반영 완료 (마지막 기록 #{replicator.seq})")
+    finally:
+        watcher.close()
+    return replicator.seq
+
+
+class PullState:
+    """대상 쪽에서 마지막으로 적용한 변경 기록 번호 (.yunisync/pulled/<원격>.json)"""
+
+    def __init__(self, source, remote):
+        self.path = os.path.join(state_dir(source), "pulled", f"{remote_slug(remote)}.json")
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.seq = json.load(f)["seq"]
+        except (OSError, ValueError, KeyError):
+            self.seq = None
+
+    def save(self, seq):
+        self.seq = seq
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "time": time.time()}, f)
+        os.replace(self.path + ".tmp", self.path)
+
+
+def fetch_change(rclone, remote, seq):
+    return ChangeSet.loads(rclone.cat(join(changes_remote(remote), change_name(seq))))
+
+
+def merge(changes):
+    """여러 기록을 하나로 합침 (나중 기록이 우선) -> (받을 파일, 지울 파일)"""
+    changed, deleted = {}, set()
+    for change in changes:
+        for path, entry in change.changed.items():
+            changed[path] = entry
+            deleted.discard(path)
+        for path in change.deleted:
+            deleted.add(path)
+            changed.pop(path, None)
+    return changed, sorted(deleted)
+
+
+def apply_changes(rclone, remote, source, changed, deleted):
+    """받을 파일만 내려받고(실행 권한 처리 포함) 지울 파일 삭제"""
+    if changed:
+        pipeline = RestorePipeline(source, targets=sorted(changed))
+        try:
+            rclone.stream("copy", remote, source, transfer_flags(progress=False), files=sorted(changed),
+                          on_event=pipeline.on_event)
+        finally:
+            pipeline.close()
+    removed = 0
+    for rel in deleted:
+        try:
+            os.remove(os.path.join(source, rel))
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+
+def pull_once(rclone, source, remote, state):
+    """새 변경 기록을 모두 적용. 적용한 기록 수 반환"""
+    seqs = list_changes(rclone, remote)
+    latest = seqs[-1] if seqs else 0
+    last = state.seq
+    if last is None or latest < last or (seqs and seqs[0] > last + 1):
+        if last is None:
+            console.info("처음 실행이므로 전체 동기화 후 변경 기록을 이어서 적용합니다.")
+        else:
+            console.warning(f"변경 기록이 이어지지 않아 전체 동기화합니다. (적용: #{last}, 원격: #{seqs[0] if seqs else 0}~#{latest})")
+        # 동기화 중에 새로 생긴 기록은 다음 적용에서 다시 반영 (같은 변경을 두 번 받아도 결과는 같음)
+        stream_download(rclone, remote, source)
+        state.save(latest)
+        return 0
+
+    pending = [seq for seq in seqs if seq > last]
+    if not pending:
+        return 0
+    changes = [fetch_change(rclone, remote, seq) for seq in pending]
+    fulls = [i for i, change in enumerate(changes) if change.full]
+    if fulls:
+        console.info(f"#{changes[fulls[-1]].seq}: 원본이 전체 동기화를 해서 전체 동기화합니다.")
+        stream_download(rclone, remote, source)
+        changes = changes[fulls[-1] + 1:]
+    changed, deleted = merge(changes)
+    started = time.time()
+    removed = apply_changes(rclone, remote, source, changed, deleted)
+    state.save(pending[-1])
+    if changed or deleted:
+        size = sum(entry[0] for entry in changed.values())
+        console.success(f"#{pending[0]}~#{pending[-1]}: 받음 {len(changed)}개 ({size / 1024 / 1024:.1f} MB), "
+                        f"삭제 {removed}개, {time.time() - started:.1f}초")
+    return len(pending)
+
+
+def pull(rclone, source=config.SERVER_DIR, remote=config.REMOTE, interval=PULL_INTERVAL, once=False):
+    """원본의 변경 기록을 따라 적용. once면 한 번만 적용하고 끝냄 (최종 전환용)"""
+    state = PullState(source, remote)
+    if once:
+        pull_once(rclone, source, remote, state)
+        console.success(f"적용 완료 (마지막 기록 #{state.seq})")
+        return state.seq
+    console.info(f"원격 변경 기록을 {interval:g}초마다 확인합니다. 끝내려면 Ctrl+C")
+    try:
+        while True:
+            try:
+                pull_once(rclone, source, remote, state)
+            except RcloneError as e:
+                console.error(f"{e} ({interval:g}초 후 다시 시도)")
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        console.info(f"적용 중지 (마지막 기록 #{state.seq})")
+    return state.seq